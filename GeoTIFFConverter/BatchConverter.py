@@ -0,0 +1,221 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .Coordinate import Coordinate
+from .Instrumentation import Instrumentation
+
+logger = logging.getLogger(__name__)
+
+class BatchConverter:
+    """
+    A class converting collections of GeoTIFF tiles in parallel, resumably.
+
+    Every tile is converted in a process of a pool and written to its own output file. Completed
+    tiles are appended to a manifest (one json record per line), so a run that is interrupted
+    resumes with the tiles that are missing. The manifest also records the origin of every tile,
+    which the optional merge stage uses to place the tiles relative to each other, and a hash
+    of the format and parameters, so a run with other settings converts the tiles again.
+    """
+
+    POINT_FORMATS = ("pcd", "ply")
+    MESH_FORMATS = ("obj", "glb")
+
+    def __init__(self, output_dir, format="ply", workers=None, manifest=None, **params):
+        """
+        Initialize a BatchConverter object.
+
+        Args:
+        output_dir (str): The directory the converted tiles are written to.
+        format (str, optional): The output format, "pcd" or "ply" for point clouds and "obj" or
+        "glb" for meshes. Defaults to "ply".
+        workers (int, optional): The number of worker processes. Defaults to None, which uses every core.
+        manifest (str, optional): The path of the manifest. Defaults to manifest.jsonl in output_dir.
+        **params: Parameters passed to TiffPc.fromTiffFile or TiffMesh.fromTiffFile, e.g. resolution.
+        """
+
+        assert format in BatchConverter.POINT_FORMATS + BatchConverter.MESH_FORMATS, f"Unsupported format {format}"
+        self.output_dir = output_dir
+        self.format = format
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.manifest = manifest if manifest is not None else os.path.join(output_dir, "manifest.jsonl")
+        self.params = params
+        self.settings = hashlib.sha1(json.dumps({"format": format, "params": params}, sort_keys=True,
+                                                default=str).encode()).hexdigest()[:16]
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def readTileList(path):
+        """
+        Read the tile paths of a collection from a text file with one path per line.
+
+        Args:
+        path (str): The path of the file. Empty lines and lines starting with # are skipped.
+
+        Returns:
+        list: The tile paths. Relative paths are resolved against the directory of the file.
+        """
+
+        base = os.path.dirname(os.path.abspath(path))
+        with open(path) as file:
+            lines = [line.strip() for line in file]
+        return [os.path.join(base, line) for line in lines if line != "" and not line.startswith("#")]
+
+    def run(self, paths, merge=None, progress=None):
+        """
+        Convert tiles, skipping those the manifest records as completed.
+
+        Args:
+        paths (list): The paths of the GeoTIFF tiles.
+        merge (str, optional): A path the merged geometry of all tiles is written to. Defaults to None.
+        progress (callable, optional): A callback progress(count, total) that is called whenever a
+        tile is completed. Defaults to None.
+
+        Returns:
+        list: The manifest records of the given tiles, in their order. Tiles that failed are
+        recorded with the status "failed" and retried by the next run. The merge stage is skipped
+        if any tile failed.
+        """
+
+        keep_arrays = merge is not None
+        done = self.completed()
+        records = {p: done[p] for p in paths if p in done and (not keep_arrays or "arrays" in done[p])}
+        todo = [p for p in paths if p not in records]
+        logger.info("Converting %d tiles, %d already completed", len(todo), len(records))
+
+        count = len(records)
+        with open(self.manifest, "a+b") as manifest, ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Terminate a line left partially written by a crashed run
+            if manifest.tell() > 0:
+                manifest.seek(-1, os.SEEK_END)
+                if manifest.read(1) != b"\n":
+                    manifest.write(b"\n")
+            futures = {executor.submit(BatchConverter._convert, p, self._output_path(p), self.format,
+                                       keep_arrays, self.params): p for p in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {"tile": path, "status": "failed", "error": repr(e)}
+                    logger.warning("Converting %s failed: %r", path, e)
+                record["settings"] = self.settings
+
+                # Flush every record, so it survives a crash of the run
+                manifest.write((json.dumps(record) + "\n").encode())
+                manifest.flush()
+                os.fsync(manifest.fileno())
+                records[path] = record
+                Instrumentation.count("batch.tiles")
+
+                count += 1
+                if progress is not None:
+                    progress(count, len(paths))
+
+        records = [records[p] for p in paths]
+        failed = [r for r in records if r["status"] != "done"]
+        if merge is not None and len(failed) > 0:
+            logger.error("Skipping the merge, %d tiles failed to convert", len(failed))
+        elif merge is not None:
+            self.merge(records, merge)
+        return records
+
+    def completed(self):
+        """
+        Read the tiles the manifest records as completed.
+
+        Returns:
+        dict: The latest record of every completed tile whose output still exists, by tile path.
+        Tiles converted with another format or other parameters are not completed.
+        """
+
+        records = {}
+        if not os.path.exists(self.manifest):
+            return records
+        with open(self.manifest) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # Partially written by a crashed run
+                records[record["tile"]] = record
+        return {p: r for p, r in records.items() if r["status"] == "done" and r.get("settings") == self.settings
+                and os.path.exists(r["output"])
+                and ("arrays" not in r or os.path.exists(r["arrays"]))}
+
+    def merge(self, records, path):
+        """
+        Merge converted tiles into a single geometry.
+
+        Args:
+        records (list): The manifest records of the tiles, holding their geometry arrays.
+        path (str): The path the merged geometry is written to.
+
+        Returns:
+        TiffSolid: The merged geometry, relative to the origin of the first tile.
+        """
+
+        cls = BatchConverter._solid_class(self.format)
+        solids = []
+        for record in records:
+            with np.load(record["arrays"]) as arrays:
+                origin = Coordinate(tuple(record["world_origin"]), record["proj_string"])
+                solids.append(cls._from_arrays(dict(arrays), origin, record["origin_height"]))
+
+        merged = cls.union_many(solids)
+        merged.save(path)
+        return merged
+
+    def _output_path(self, path):
+        """
+        The output path of a tile, unique even for tiles with the same file name.
+        """
+
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.output_dir, f"{name}_{digest}.{self.format}")
+
+    @staticmethod
+    def _solid_class(format):
+        from .Solids import TiffPc, TiffMesh
+        return TiffPc if format in BatchConverter.POINT_FORMATS else TiffMesh
+
+    @staticmethod
+    def _convert(path, output, format, keep_arrays, params):
+        """
+        Convert a single tile, run in a worker process.
+
+        Returns:
+        dict: The manifest record of the tile.
+        """
+
+        from .TiffFile import TiffFile
+
+        start = time.perf_counter()
+        cls = BatchConverter._solid_class(format)
+        with TiffFile(path) as tiff:
+            solid = cls.fromTiffFile(tiff, **params)
+
+        # Write to a temporary file first, so a crash never leaves a partial output behind
+        root, extension = os.path.splitext(output)
+        tmp = f"{root}.tmp{extension}"
+        solid.save(tmp)
+        os.replace(tmp, output)
+
+        origin = solid.world_origin
+        record = {"tile": path, "status": "done", "output": output,
+                  "world_origin": [float(origin.x), float(origin.y)], "proj_string": str(origin.proj_string),
+                  "origin_height": float(solid.origin_height)}
+        if keep_arrays:
+            arrays = f"{output}.npz"
+            np.savez(f"{root}.tmp.npz", **solid._get_arrays())
+            os.replace(f"{root}.tmp.npz", arrays)
+            record["arrays"] = arrays
+        record["seconds"] = time.perf_counter() - start
+        return record
@@ -1,17 +1,20 @@
 # Author: Sven Pfiffner
 # Created: November 2023
 
-from geopy.geocoders import Nominatim
-import numpy as np
-from owslib.wms import WebMapService
-from io import BytesIO
-from PIL import Image
+import threading
+from .TileImagery import TileImagery
+from .Geocoder import Geocoder
 
 class Cartographer:
     """
     A class that provides static methods to perform various cartography tasks.
     """
 
+    imagery = None # Shared imagery layer, see get_imagery
+    geocoder = None # Shared reverse geocoder, see get_geocoder
+    _imagery_lock = threading.Lock()
+    _geocoder_lock = threading.Lock()
+
     @staticmethod
     def coord_to_address(coord):
         """
@@ -23,37 +26,72 @@ class Cartographer:
         Returns:
         str: The address at the given coordinate.
         """
-        assert coord.proj_string == "epsg:4326", "Coordinate must be in latlong format"
-        geolocator = Nominatim(user_agent="geo_tiff_converter")
-        location = geolocator.reverse((coord.x, coord.y))
-        return location.address
+        return Cartographer.get_geocoder().reverse(coord)
+
+    @staticmethod
+    def coords_to_addresses(coords):
+        """
+        Retrieve the addresses of many coordinates.
+
+        Args:
+        coords (list or CoordinateArray): Coordinates in the epsg:4326 projection
+
+        Returns:
+        list: The addresses at the given coordinates, in the order of the coordinates.
+
+        Note:
+        Addresses are served from the cache of Cartographer.geocoder where possible, the remaining
+        coordinates are requested at the geocoder's rate limit.
+        """
+        return Cartographer.get_geocoder().reverse_many(coords)
+
+    @staticmethod
+    def get_geocoder():
+        """
+        Retrieve the reverse geocoder shared by all cartography tasks, creating it on first use.
+
+        Returns:
+        Geocoder: The shared geocoder.
+        """
+        with Cartographer._geocoder_lock:
+            if Cartographer.geocoder is None:
+                Cartographer.geocoder = Geocoder()
+            return Cartographer.geocoder
     
     @staticmethod
-    def get_bbox_img(bbox):
+    def get_imagery():
+        """
+        Retrieve the imagery layer shared by all cartography tasks, creating it on first use.
+
+        Returns:
+        TileImagery: The shared imagery layer.
+        """
+        with Cartographer._imagery_lock:
+            if Cartographer.imagery is None:
+                Cartographer.imagery = TileImagery()
+            return Cartographer.imagery
+
+    @staticmethod
+    def get_bbox_img(bbox, size=(1200, 600)):
         """
         Retrieve an aerial image of the area defined by a bounding box.
 
         Args:
         bbox (tuple): A tuple containing two instances of the Coordinate class that make up the bounding box.
+        size (tuple, optional): The (width, height) of the image in pixels. Defaults to (1200, 600).
 
         Returns:
-        np.array: Aerial image of the specified area as an RGB numpy array.
+        np.array: Aerial image of the specified area as an RGBA numpy array.
+
+        Note:
+        The imagery is assembled from the tiles of Cartographer.imagery, which are cached on disk.
+        Set Cartographer.imagery to use a different TileImagery, e.g. with a custom fetch backend.
         """
         coord1, coord2 = bbox
         assert coord1.proj_string == coord2.proj_string, "Coordinate projections don't match"
+        coord1, coord2 = coord1.as_latlong(), coord2.as_latlong()
 
-        # Connect to GIBS WMS Service
-        wms = WebMapService('https://gibs.earthdata.nasa.gov/wms/epsg4326/best/wms.cgi?', version='1.1.1')
-
-        # Configure request for BlueMarble_NextGeneration
-        resp = wms.getmap(layers=['BlueMarble_NextGeneration'],  # Layers
-                 srs="epsg:4326",  # Map projection
-                 bbox=(coord1.x, coord1.y, coord2.x, coord2.y),  # Bounds
-                 size=(1200, 600),  # Image size
-                 time='2021-09-21',  # Time of data
-                 format='image/png',  # Image format
-                 transparent=True)  # Nodata transparency
-        
-        img = Image.open(BytesIO(resp.read()))
-
-        return np.array(img)
\ No newline at end of file
+        # Latlong coordinates are given as (lat, lon)
+        lon = sorted((coord1.y, coord2.y))
+        lat = sorted((coord1.x, coord2.x))
+        return Cartographer.get_imagery().get_image((lon[0], lat[0], lon[1], lat[1]), size)
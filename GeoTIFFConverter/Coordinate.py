@@ -1,6 +1,8 @@
 # Author: Sven Pfiffner
 # Created: November 2023
 
+import threading
+from collections import OrderedDict
 import pyproj
 import numpy as np
 
@@ -9,6 +11,10 @@ class Coordinate:
     A class representing geographic coordinates with projection information.
     """
 
+    # Transformers are expensive to build and not thread-safe, so they are cached per thread
+    _transformers = threading.local()
+    max_transformers = 64 # The number of transformers every thread keeps, least recently used are dropped
+
     def __init__(self, coord_elems, proj_string):
         """
         Initialize a Coordinate object.
@@ -36,10 +42,10 @@ class Coordinate:
 
         if self.proj_string == target_proj_string:
             # The system is already in target projection, no conversion necessary
-            return self.coord_elems
+            return Coordinate(self.coord_elems, target_proj_string)
         
         # Perform conversion with pyproj
-        transformer = pyproj.Transformer.from_crs(self.proj_string, target_proj_string)
+        transformer = Coordinate.get_transformer(self.proj_string, target_proj_string)
         x, y = transformer.transform(self.x, self.y)
 
         return Coordinate((x,y), target_proj_string)
@@ -65,6 +71,36 @@ class Coordinate:
         return np.array([[self.x], [self.y]])
     
     
+    @staticmethod
+    def get_transformer(source_proj, target_proj, always_xy=False):
+        """
+        Retrieve a cached pyproj transformer between two projections.
+
+        Args:
+        source_proj (str or CRS): The source projection.
+        target_proj (str or CRS): The target projection.
+        always_xy (bool, optional): Whether to use the (x, y) axis order regardless of the
+        projections' axis order. Defaults to False.
+
+        Returns:
+        pyproj.Transformer: The transformer, shared by all conversions of the calling thread.
+
+        Note:
+        Every thread keeps the max_transformers most recently used transformers.
+        """
+
+        cache = Coordinate._transformers.__dict__.setdefault("cache", OrderedDict())
+        key = (str(source_proj), str(target_proj), always_xy)
+        transformer = cache.get(key)
+        if transformer is None:
+            transformer = pyproj.Transformer.from_crs(source_proj, target_proj, always_xy=always_xy)
+            cache[key] = transformer
+            while len(cache) > Coordinate.max_transformers:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return transformer
+
     @staticmethod
     def get_midpoint(coord1, coord2):
         """
@@ -81,3 +117,92 @@ class Coordinate:
         assert coord1.proj_string == coord2.proj_string, "Projections don't match"
         x, y = (coord1.x + coord2.x) / 2, (coord1.y + coord2.y) / 2
         return Coordinate((x,y), coord1.proj_string)
+
+
+class CoordinateArray:
+    """
+    A class representing many geographic coordinates of the same projection as NumPy arrays.
+    """
+
+    def __init__(self, x, y, proj_string):
+        """
+        Initialize a CoordinateArray object.
+
+        Args:
+        x (array_like): The first coordinate elements.
+        y (array_like): The second coordinate elements.
+        proj_string (str): The projection string (e.g., 'epsg:4326').
+        """
+
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        assert self.x.shape == self.y.shape, "Coordinate element arrays must have the same shape"
+        self.proj_string = proj_string
+
+    @staticmethod
+    def fromCoordinates(coords):
+        """
+        Create a CoordinateArray from a sequence of coordinates.
+
+        Args:
+        coords (list): Non-empty list of Coordinate instances sharing the same projection.
+
+        Returns:
+        CoordinateArray: The coordinates as a CoordinateArray.
+        """
+
+        assert len(coords) > 0, "At least one coordinate is required"
+        proj_string = coords[0].proj_string
+        assert all(c.proj_string == proj_string for c in coords), "Projections don't match"
+        return CoordinateArray([c.x for c in coords], [c.y for c in coords], proj_string)
+
+    def convert(self, target_proj_string):
+        """
+        Convert all coordinates to a different projection in a single transformation.
+
+        Args:
+        target_proj_string (str): The target projection string.
+
+        Returns:
+        CoordinateArray: The converted coordinates in the target projection.
+        """
+
+        if self.proj_string == target_proj_string:
+            # The system is already in target projection, no conversion necessary
+            return CoordinateArray(self.x, self.y, target_proj_string)
+
+        transformer = Coordinate.get_transformer(self.proj_string, target_proj_string)
+        x, y = transformer.transform(self.x, self.y)
+        return CoordinateArray(x, y, target_proj_string)
+
+    def as_latlong(self):
+        """
+        Convert the coordinates to the 'epsg:4326' (lat-long) projection.
+
+        Returns:
+        CoordinateArray: The coordinates in 'epsg:4326' projection.
+        """
+
+        return self.convert("epsg:4326")
+
+    def to_numpy(self):
+        """
+        Convert the coordinates to a NumPy array.
+
+        Returns:
+        np.array: A (2, N) NumPy array with one column per coordinate.
+        """
+
+        return np.stack((self.x.ravel(), self.y.ravel()))
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        """
+        Retrieve a single Coordinate for integer indices, or a CoordinateArray otherwise.
+        """
+
+        if np.ndim(self.x[index]) == 0:
+            return Coordinate((float(self.x[index]), float(self.y[index])), self.proj_string)
+        return CoordinateArray(self.x[index], self.y[index], self.proj_string)
@@ -0,0 +1,144 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import rasterio
+from .Instrumentation import Instrumentation
+
+class DatasetPool:
+    """
+    A least-recently-used pool of open rasterio datasets.
+
+    The pool keeps at most max_open datasets open. When a further dataset is opened,
+    the least recently used datasets are closed and transparently reopened once they
+    are accessed again. This bounds the number of file descriptors and the GDAL block
+    cache held by large TiffFile collections.
+    """
+
+    def __init__(self, max_open=256):
+        """
+        Initialize a DatasetPool object.
+
+        Args:
+        max_open (int, optional): The maximum number of datasets kept open. Defaults to 256.
+        """
+
+        self.max_open = max_open
+        self._datasets = OrderedDict() # Maps owner keys to open datasets, least recently used first
+        self._pins = {} # Maps owner keys to the number of ongoing accesses
+        self._closing = set() # Keys of pinned datasets that are closed once they are unpinned
+        self._lock = threading.RLock()
+
+    def get(self, key, path):
+        """
+        Retrieve the open dataset of an owner, opening it if necessary.
+
+        Args:
+        key (hashable): The key identifying the owner of the dataset.
+        path (str): The path the dataset is opened from.
+
+        Returns:
+        rasterio.DatasetReader: The open dataset.
+
+        Note:
+        The returned dataset is not protected from eviction. Use pinned to hold on to it.
+        """
+
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None or dataset.closed:
+                dataset = rasterio.open(path)
+                self._datasets[key] = dataset
+                Instrumentation.count("pool.opened")
+            self._datasets.move_to_end(key)
+            self._evict(keep=key)
+            return dataset
+
+    @contextmanager
+    def pinned(self, key, path):
+        """
+        Context manager providing an open dataset that is not evicted while in use.
+
+        Args:
+        key (hashable): The key identifying the owner of the dataset.
+        path (str): The path the dataset is opened from.
+
+        Yields:
+        rasterio.DatasetReader: The open dataset.
+        """
+
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+            try:
+                dataset = self.get(key, path)
+            except BaseException:
+                self._unpin(key)
+                raise
+        try:
+            yield dataset
+        finally:
+            with self._lock:
+                self._unpin(key)
+                self._evict()
+
+    def close(self, key):
+        """
+        Close the dataset of an owner, if it is open.
+
+        Args:
+        key (hashable): The key identifying the owner of the dataset.
+
+        Note:
+        A dataset that is in use is closed once its last access ends.
+        """
+
+        with self._lock:
+            if key in self._pins:
+                self._closing.add(key)
+                return
+            dataset = self._datasets.pop(key, None)
+            if dataset is not None:
+                dataset.close()
+
+    def resize(self, max_open):
+        """
+        Change the maximum number of open datasets, closing datasets if necessary.
+
+        Args:
+        max_open (int): The new maximum number of datasets kept open.
+        """
+
+        with self._lock:
+            self.max_open = max_open
+            self._evict()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def __contains__(self, key):
+        return key in self._datasets
+
+    def _unpin(self, key):
+        self._pins[key] -= 1
+        if self._pins[key] == 0:
+            del self._pins[key]
+            if key in self._closing:
+                self._closing.discard(key)
+                self.close(key)
+
+    def _evict(self, keep=None):
+        """
+        Close least recently used datasets that are not pinned until the pool fits its limit.
+
+        Args:
+        keep (hashable, optional): The key of a dataset that must stay open. Defaults to None.
+        """
+
+        for key in list(self._datasets):
+            if len(self._datasets) <= self.max_open:
+                break
+            if key not in self._pins and key != keep:
+                self._datasets.pop(key).close()
+                Instrumentation.count("pool.evicted")
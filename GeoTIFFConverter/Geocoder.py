@@ -0,0 +1,148 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import json
+import time
+import threading
+import tempfile
+from geopy.geocoders import Nominatim
+from .Instrumentation import Instrumentation
+
+class Geocoder:
+    """
+    A memoized, rate-limited reverse geocoder.
+
+    Addresses are cached by coordinates rounded to a fixed number of decimals, so nearby
+    coordinates share a single request. The cache is persisted as a JSON file. Requests
+    for uncached coordinates are spaced by a minimum interval to respect the usage
+    policy of the geocoding service (Nominatim allows one request per second).
+    """
+
+    def __init__(self, reverse=None, cache_path=None, precision=4, min_interval=1.0,
+                 user_agent="geo_tiff_converter"):
+        """
+        Initialize a Geocoder object.
+
+        Args:
+        reverse (callable, optional): A backend reverse(lat, lon) returning the address at a position,
+        or None if there is none. If none is given, a single Nominatim geolocator is used. Defaults to None.
+        cache_path (str, optional): The JSON file the cache is persisted in. If none is given, a file in
+        the user's cache directory is used. Defaults to None.
+        precision (int, optional): The number of decimals coordinates are rounded to. 4 decimals
+        correspond to roughly 10 m. Defaults to 4.
+        min_interval (float, optional): The minimum time between two requests in seconds. Defaults to 1.0.
+        user_agent (str, optional): The user agent of the Nominatim geolocator. Defaults to "geo_tiff_converter".
+        """
+
+        self.precision = precision
+        self.min_interval = min_interval
+        self._reverse = reverse
+        self._user_agent = user_agent
+        self._geolocator = None
+        self._lock = threading.Lock()
+        self._last_request = None
+
+        if cache_path is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+            cache_path = os.path.join(cache_home, "geo_tiff_converter", "addresses.json")
+        self.cache_path = cache_path
+
+        self._cache = {}
+        if os.path.exists(cache_path):
+            with open(cache_path) as file:
+                self._cache = json.load(file)
+
+    def reverse(self, coord):
+        """
+        Retrieve the address of a coordinate.
+
+        Args:
+        coord (Coordinate): A coordinate in the epsg:4326 projection.
+
+        Returns:
+        str: The address at the given coordinate, or None if there is none.
+        """
+
+        return self.reverse_many([coord])[0]
+
+    def reverse_many(self, coords):
+        """
+        Retrieve the addresses of many coordinates.
+
+        Args:
+        coords (list or CoordinateArray): Coordinates in the epsg:4326 projection.
+
+        Returns:
+        list: The addresses at the given coordinates, in the order of the coordinates.
+
+        Note:
+        Cached coordinates are served without requests. Every distinct uncached coordinate is
+        requested once, respecting min_interval. The addresses found are persisted even if a
+        request fails partway through. Coordinates without an address are not cached, so they
+        are requested again by later calls.
+        """
+
+        keys = []
+        for i in range(len(coords)):
+            coord = coords[i]
+            assert coord.proj_string == "epsg:4326", "Coordinate must be in latlong format"
+            keys.append(self._key(coord.x, coord.y))
+
+        with self._lock:
+            missing = list(dict.fromkeys(k for k in keys if k not in self._cache))
+            Instrumentation.count("geocoder.requests", len(missing))
+            found = 0
+            try:
+                for key in missing:
+                    lat, lon = (float(v) for v in key.split(","))
+                    self._wait()
+                    address = self._request(lat, lon)
+                    if address is not None:
+                        self._cache[key] = address
+                        found += 1
+            finally:
+                if found > 0:
+                    self._save()
+            return [self._cache.get(k) for k in keys]
+
+    def _key(self, lat, lon):
+        return f"{lat:.{self.precision}f},{lon:.{self.precision}f}"
+
+    def _wait(self):
+        """
+        Block until the next request is allowed.
+        """
+
+        now = time.monotonic()
+        if self._last_request is not None:
+            delay = self._last_request + self.min_interval - now
+            if delay > 0:
+                time.sleep(delay)
+                now += delay
+        self._last_request = now
+
+    def _request(self, lat, lon):
+        """
+        Request the address of a position from the backend.
+        """
+
+        if self._reverse is not None:
+            return self._reverse(lat, lon)
+
+        if self._geolocator is None:
+            self._geolocator = Nominatim(user_agent=self._user_agent)
+        location = self._geolocator.reverse((lat, lon))
+        return location.address if location is not None else None
+
+    def _save(self):
+        """
+        Persist the cache, replacing the cache file atomically.
+        """
+
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(self._cache, file)
+        os.replace(tmp, self.cache_path)
@@ -0,0 +1,148 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+logger = logging.getLogger("GeoTIFFConverter.instrumentation")
+
+class Instrumentation:
+    """
+    A class that provides static methods to measure the stages of the conversion pipeline.
+
+    Stages are measured in spans, which record their wall time, the peak resident memory of the
+    process and any counts the stage reports, e.g. the number of points or triangles. Finished
+    spans are passed to all registered listeners and logged at DEBUG level to the
+    "GeoTIFFConverter.instrumentation" logger. Counters accumulate events such as opened datasets
+    or fetched tiles. Without listeners or a configured logger, nothing is reported.
+    """
+
+    counters = {} # Accumulated counter values by name
+    _listeners = []
+    _lock = threading.Lock()
+    _stack = threading.local() # The names of the open spans of every thread
+
+    @staticmethod
+    @contextmanager
+    def span(name, **attrs):
+        """
+        Context manager measuring a stage.
+
+        Args:
+        name (str): The name of the stage, e.g. "pc.normals".
+        **attrs: Attributes describing the stage, e.g. the number of input points.
+
+        Yields:
+        dict: The record of the span. Stages add their counts to it, e.g. record["triangles"] = n.
+
+        Note:
+        On exit, the record holds the keys name, parent (the name of the enclosing span or None),
+        seconds, peak_rss_mb (the peak resident memory of the process) and rss_growth_mb (how much
+        the peak grew during the span), next to the attributes and counts. Spans that raise are
+        reported with the key error.
+        """
+
+        stack = Instrumentation._stack.__dict__.setdefault("names", [])
+        record = {"name": name, "parent": stack[-1] if len(stack) > 0 else None}
+        record.update(attrs)
+
+        stack.append(name)
+        peak_before = Instrumentation.peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            peak = Instrumentation.peak_rss_mb()
+            record["peak_rss_mb"] = peak
+            record["rss_growth_mb"] = peak - peak_before if peak is not None else None
+            stack.pop()
+            Instrumentation._emit(record)
+
+    @staticmethod
+    def count(name, value=1):
+        """
+        Increase a counter.
+
+        Args:
+        name (str): The name of the counter, e.g. "pool.opened".
+        value (int, optional): The amount to add. Defaults to 1.
+        """
+
+        with Instrumentation._lock:
+            Instrumentation.counters[name] = Instrumentation.counters.get(name, 0) + value
+
+    @staticmethod
+    def add_listener(listener):
+        """
+        Register a listener that is called with the record of every finished span.
+
+        Args:
+        listener (callable): A callback listener(record).
+        """
+
+        with Instrumentation._lock:
+            Instrumentation._listeners.append(listener)
+
+    @staticmethod
+    def remove_listener(listener):
+        """
+        Remove a listener registered with add_listener.
+
+        Args:
+        listener (callable): The listener to remove.
+        """
+
+        with Instrumentation._lock:
+            Instrumentation._listeners.remove(listener)
+
+    @staticmethod
+    @contextmanager
+    def record():
+        """
+        Context manager collecting the records of all spans finished while it is active.
+
+        Yields:
+        list: The records, in the order the spans finished.
+        """
+
+        records = []
+        Instrumentation.add_listener(records.append)
+        try:
+            yield records
+        finally:
+            Instrumentation.remove_listener(records.append)
+
+    @staticmethod
+    def peak_rss_mb():
+        """
+        The peak resident memory of the process in MiB, or None where it can't be determined.
+        """
+
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+    @staticmethod
+    def _emit(record):
+        """
+        Pass a finished span to the listeners and the logger.
+        """
+
+        for listener in list(Instrumentation._listeners):
+            listener(record)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s", record)
@@ -3,6 +3,7 @@
 
 import open3d as o3d
 import numpy as np
+from .Instrumentation import Instrumentation
 
 class MeshUtil:
     """
@@ -41,16 +42,20 @@ class MeshUtil:
         pcd.points = o3d.utility.Vector3dVector(xyz)
 
         if downsample_voxel_size > 0:
-            print("Point-cloud downsampled")
-            pcd = pcd.voxel_down_sample(voxel_size=downsample_voxel_size)
+            with Instrumentation.span("pc.downsample", points=len(pcd.points)) as span:
+                pcd = pcd.voxel_down_sample(voxel_size=downsample_voxel_size)
+                span["downsampled_points"] = len(pcd.points)
 
         # Estimate normals
-        pcd.estimate_normals()
-        pcd.orient_normals_consistent_tangent_plane(100)
+        with Instrumentation.span("pc.normals", mode="knn", points=len(pcd.points)):
+            pcd.estimate_normals()
+        with Instrumentation.span("pc.orient", tangent_plane=True, points=len(pcd.points)):
+            pcd.orient_normals_consistent_tangent_plane(100)
 
         # Run Poisson surface reconstruction    
-        with o3d.utility.VerbosityContextManager(o3d.utility.VerbosityLevel.Debug) as cm:
+        with Instrumentation.span("mesh.poisson", points=len(pcd.points)) as span:
             mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=9)
+            span["vertices"], span["triangles"] = len(mesh.vertices), len(mesh.triangles)
 
         if add_base:
             mesh = MeshUtil.add_base_to_mesh(mesh)
@@ -58,4 +63,6 @@ class MeshUtil:
         # Save
         R = mesh.get_rotation_matrix_from_xyz((-np.pi / 2, 0, 0))
         mesh.rotate(R, center=(0, 0, 0))
-        o3d.io.write_triangle_mesh(path, mesh)
\ No newline at end of file
+        with Instrumentation.span("mesh.save", path=path, vertices=len(mesh.vertices),
+                                  triangles=len(mesh.triangles)):
+            o3d.io.write_triangle_mesh(path, mesh)
\ No newline at end of file
@@ -0,0 +1,235 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from matplotlib import pyplot as plt
+from rasterio.windows import Window
+from .TiffFile import TiffFile
+from .StreamingHistogram import StreamingHistogram
+from .Instrumentation import Instrumentation
+
+class RasterStatistics:
+    """
+    Statistics of the elevation, slope and aspect of GeoTIFF files, computed out of core.
+
+    The rasters are read window by window, aligned to their native blocks, so the memory used is
+    bounded by the window size and the number of workers instead of the raster size. Every window
+    is summarized into mergeable StreamingHistograms, and the summaries of all windows of all
+    files are merged into the statistics of the whole collection. Windows are read with a halo of
+    one pixel, so the slope and aspect match those computed over the whole raster at once.
+    """
+
+    FIELDS = ("elevation", "slope", "aspect")
+
+    def __init__(self, max_bins=16384):
+        """
+        Initialize an empty RasterStatistics object. Use fromTiffFiles to compute statistics.
+
+        Args:
+        max_bins (int, optional): The maximum number of histogram bins of every field. Defaults to 16384.
+        """
+
+        self.elevation = StreamingHistogram(max_bins)
+        self.slope = StreamingHistogram(max_bins) # In degrees from the horizontal
+        self.aspect = StreamingHistogram(max_bins) # The downslope direction in degrees clockwise from north
+
+    @staticmethod
+    def fromTiffFiles(tiffs, band=1, resolution=None, window_size=None, workers=None, max_bins=16384):
+        """
+        Compute the statistics of a collection of GeoTIFF files.
+
+        Args:
+        tiffs (list): A list of TiffFile instances.
+        band (int, optional): The (1-based) band holding the elevation. Defaults to 1.
+        resolution (float, optional): The target ground resolution, see TiffFile.get_decimation. If
+        none is given, the native resolution is used. Defaults to None.
+        window_size (tuple, optional): The (rows, cols) size of a window, see TiffFile.iter_windows.
+        If none is given, the native blocks are used. Defaults to None.
+        workers (int, optional): The number of windows processed concurrently, across all files.
+        Defaults to None, which uses the default of ThreadPoolExecutor.
+        max_bins (int, optional): The maximum number of histogram bins of every field. Defaults to 16384.
+
+        Returns:
+        RasterStatistics: The statistics of all valid pixels of the files.
+
+        Note:
+        Every pixel counts once, regardless of its ground area. The slope and aspect are only
+        meaningful for projected coordinate systems with the same unit as the elevation. Pixels
+        next to nodata have no slope, and flat pixels have no aspect.
+        """
+
+        tasks = [(tiff, window) for tiff in tiffs for window in tiff.get_windows(band, window_size, resolution)]
+        stats = RasterStatistics(max_bins)
+
+        with Instrumentation.span("stats.compute", files=len(tiffs), windows=len(tasks)) as span:
+            # Every worker reads through datasets of its own, so reads of the same file run in parallel
+            local = threading.local()
+
+            def summarize(task):
+                tiff, window = task
+                handles = local.__dict__.setdefault("handles", {})
+                if tiff._key not in handles:
+                    header = {key: getattr(tiff, key) for key in TiffFile.HEADER_KEYS}
+                    handles[tiff._key] = TiffFile(tiff.path, header=header)
+                return RasterStatistics._summarize(handles[tiff._key], window, band, resolution, max_bins)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for window_stats in executor.map(summarize, tasks):
+                    stats.merge(window_stats)
+            span["pixels"] = stats.elevation.count
+
+        return stats
+
+    def merge(self, other):
+        """
+        Merge the statistics of other pixels into these statistics.
+
+        Args:
+        other (RasterStatistics): The statistics of the other pixels.
+
+        Returns:
+        RasterStatistics: The statistics themselves.
+        """
+
+        for field in RasterStatistics.FIELDS:
+            getattr(self, field).merge(getattr(other, field))
+        return self
+
+    def summary(self, quantiles=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        """
+        Summarize the statistics of every field.
+
+        Args:
+        quantiles (tuple, optional): The quantiles reported. Defaults to percentiles 1, 5, 25, 50, 75, 95 and 99.
+
+        Returns:
+        dict: For every field, a dict with the count, min, max, mean, std and the quantiles by
+        their value, e.g. summary["elevation"][0.5] for the median.
+        """
+
+        summary = {}
+        for field in RasterStatistics.FIELDS:
+            h = getattr(self, field)
+            summary[field] = {"count": h.count, "min": h.min, "max": h.max, "mean": h.mean, "std": h.std}
+            if h.count > 0:
+                summary[field].update(zip(quantiles, h.quantile(quantiles).tolist()))
+        return summary
+
+    def plot_elevation(self, bins=100):
+        """
+        Plot the histogram of the elevation, marking the median and the 5th and 95th percentiles.
+
+        Args:
+        bins (int, optional): The number of bins. Defaults to 100.
+
+        Returns:
+        plt.figure: The Matplotlib figure object.
+        """
+
+        fig, ax = plt.subplots()
+        RasterStatistics._plot_histogram(ax, self.elevation, bins, "Elevation")
+        if self.elevation.count > 0:
+            for q, style in ((0.05, ":"), (0.5, "--"), (0.95, ":")):
+                ax.axvline(self.elevation.quantile(q), color="black", linestyle=style, label=f"{q:.0%} percentile")
+            ax.legend()
+        ax.set_title("Elevation distribution")
+        return fig
+
+    def plot_hypsometry(self):
+        """
+        Plot the hypsometric curve, the share of the area above every elevation.
+
+        Returns:
+        plt.figure: The Matplotlib figure object.
+        """
+
+        fig, ax = plt.subplots()
+        if self.elevation.count > 0:
+            counts, edges = self.elevation.histogram()
+            above = 1 - np.concatenate(([0], np.cumsum(counts))) / self.elevation.count
+            ax.plot(above * 100, np.clip(edges, self.elevation.min, self.elevation.max))
+        ax.set_xlabel("Area above (%)")
+        ax.set_ylabel("Elevation")
+        ax.set_title("Hypsometric curve")
+        return fig
+
+    def plot_slope(self, bins=90):
+        """
+        Plot the histogram of the slope.
+
+        Args:
+        bins (int, optional): The number of bins between 0 and 90 degrees. Defaults to 90.
+
+        Returns:
+        plt.figure: The Matplotlib figure object.
+        """
+
+        fig, ax = plt.subplots()
+        RasterStatistics._plot_histogram(ax, self.slope, bins, "Slope (degrees)", range=(0, 90))
+        ax.set_title("Slope distribution")
+        return fig
+
+    def plot_aspect(self, bins=36):
+        """
+        Plot the distribution of the aspect as a rose diagram.
+
+        Args:
+        bins (int, optional): The number of direction sectors. Defaults to 36.
+
+        Returns:
+        plt.figure: The Matplotlib figure object.
+        """
+
+        fig, ax = plt.subplots(subplot_kw={"projection": "polar"})
+        ax.set_theta_zero_location("N")
+        ax.set_theta_direction(-1)
+        counts, edges = self.aspect.histogram(bins, range=(0, 360))
+        ax.bar(np.radians(edges[:-1]), counts, width=np.radians(360 / bins), align="edge")
+        ax.set_title("Aspect distribution")
+        return fig
+
+    @staticmethod
+    def _plot_histogram(ax, histogram, bins, label, range=None):
+        counts, edges = histogram.histogram(bins, range=range)
+        ax.stairs(counts, edges, fill=True)
+        ax.set_xlabel(label)
+        ax.set_ylabel("Pixels")
+
+    @staticmethod
+    def _summarize(tiff, window, band, resolution, max_bins):
+        """
+        Compute the statistics of a single window.
+
+        Returns:
+        RasterStatistics: The statistics of the valid pixels of the window.
+        """
+
+        # Read one pixel of context on every side, where the raster extends
+        rows, cols = tiff.get_shape(resolution)
+        row0, col0 = max(window.row_off - 1, 0), max(window.col_off - 1, 0)
+        row1, col1 = min(window.row_off + window.height + 1, rows), min(window.col_off + window.width + 1, cols)
+        data = tiff.read_window(Window(col0, row0, col1 - col0, row1 - row0), band=band, resolution=resolution)
+
+        from .Solids import TiffPc
+
+        heights = np.where(TiffPc.validHeights(data, tiff.nodata), data.astype(np.float64), np.nan)
+
+        # Gradients in elevation per ground unit, towards east and north
+        dec_rows, dec_cols = tiff.get_decimation(resolution)
+        gx = np.gradient(heights, axis=1) / (tiff.transform.a * dec_cols) if heights.shape[1] > 1 \
+            else np.zeros_like(heights)
+        gy = np.gradient(heights, axis=0) / (tiff.transform.e * dec_rows) if heights.shape[0] > 1 \
+            else np.zeros_like(heights)
+
+        core = (slice(window.row_off - row0, window.row_off - row0 + window.height),
+                slice(window.col_off - col0, window.col_off - col0 + window.width))
+        heights, gx, gy = heights[core], gx[core], gy[core]
+
+        stats = RasterStatistics(max_bins)
+        stats.elevation.add(heights)
+        stats.slope.add(np.degrees(np.arctan(np.hypot(gx, gy))))
+        sloped = (gx != 0) | (gy != 0)
+        stats.aspect.add(np.degrees(np.arctan2(-gx[sloped], -gy[sloped])) % 360)
+        return stats
@@ -0,0 +1,353 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import glob
+import hashlib
+import json
+import math
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.windows import Window
+from .TiffPc import TiffPc
+from .TiffMesh import TiffMesh
+from ..TiffFile import TiffFile
+from ..TileCatalog import TileCatalog
+from ..Coordinate import Coordinate
+from ..Instrumentation import Instrumentation
+
+class MosaicStore:
+    """
+    A persistent mosaic of GeoTIFF tiles, stored as chunks of geometry on disk.
+
+    The mosaic is laid out on a fixed grid of cells in a single coordinate reference system and
+    resolution, which is split into square chunks. Neighbouring chunks share one border row or
+    column, so the vertices of a seam are built by both chunks and welded by their cell when the
+    mosaic is exported. Adding, replacing or removing tiles only rebuilds the chunks the old and
+    new footprints of the changed tiles touch, from all tiles covering them. The tiles are tracked
+    in a TileCatalog inside the store directory.
+
+    Point clouds get gradient normals, read with a halo of one cell around every chunk. On the outer
+    border of the mosaic the halo holds no data, so the normals there point up.
+    """
+
+    _KEY_BIAS = 1 << 30 # Keeps the cell keys of negative rows and columns positive
+
+    def __init__(self, directory, solid="mesh", method="grid", max_error=1.0, resolution=None, crs=None,
+                 chunk_size=257, workers=None, hash_content=False):
+        """
+        Initialize a MosaicStore object, opening the store in the directory if there is one.
+
+        Args:
+        directory (str): The directory the store is kept in. It is created if it does not exist.
+        solid (str, optional): The geometry of the store, "mesh" or "pc". Defaults to "mesh".
+        method (str, optional): The meshing method of the chunks, "grid" or "adaptive", see
+        TiffMesh.triangulateGrid. Defaults to "grid".
+        max_error (float, optional): The maximum vertical error of the "adaptive" method. Defaults to 1.0
+        resolution (float, optional): The ground resolution of the cell grid. If none is given, the
+        resolution of the first added tile is used. Defaults to None.
+        crs (str or CRS, optional): The coordinate reference system of the cell grid. If none is
+        given, the one of the first added tile is used. Defaults to None.
+        chunk_size (int, optional): The number of rows and columns of a chunk, including the border
+        shared with the next chunk. Sizes of 2^k + 1 suit the "adaptive" method best. Defaults to 257.
+        workers (int, optional): The number of chunks built concurrently. Defaults to None, which uses
+        the default of ThreadPoolExecutor.
+        hash_content (bool, optional): Wether tiles are also compared by a hash of their content, see
+        update. Otherwise a tile counts as changed only if its modification time or size changed.
+        Defaults to False.
+
+        Note:
+        The settings of an existing store are kept, the given ones only apply to new stores.
+        """
+
+        assert solid in ("mesh", "pc"), f"Unknown solid {solid}"
+        self.directory = directory
+        self.workers = workers
+        self.hash_content = hash_content
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "chunks"), exist_ok=True)
+
+        self.settings = {"solid": solid, "method": method, "max_error": max_error, "resolution": resolution,
+                         "crs": CRS.from_user_input(crs).to_wkt() if crs is not None else None,
+                         "origin": None, "chunk_size": chunk_size}
+        self.settings = self._load_json("store.json", self.settings)
+
+    def add(self, tiffs):
+        """
+        Add tiles to the mosaic, or replace tiles whose file changed.
+
+        Args:
+        tiffs (list): TiffFiles or paths of the tiles. Tiles are identified by their path.
+
+        Returns:
+        list: The (row, col) indices of the rebuilt chunks.
+
+        Note:
+        See update for how replaced tiles are detected.
+        """
+
+        return self.update(add=[t.path if isinstance(t, TiffFile) else t for t in tiffs])
+
+    def remove(self, tiffs):
+        """
+        Remove tiles from the mosaic.
+
+        Args:
+        tiffs (list): TiffFiles or paths of the tiles.
+
+        Returns:
+        list: The (row, col) indices of the rebuilt chunks.
+        """
+
+        return self.update(remove=[t.path if isinstance(t, TiffFile) else t for t in tiffs])
+
+    def update(self, add=(), remove=()):
+        """
+        Update the tiles of the mosaic and rebuild the chunks they touch.
+
+        Args:
+        add (list, optional): The paths of tiles to add. Tiles already in the store are replaced if
+        their file changed. Defaults to ().
+        remove (list, optional): The paths of tiles to remove. Defaults to ().
+
+        Returns:
+        list: The (row, col) indices of the rebuilt chunks.
+
+        Note:
+        Passing neither tiles to add nor to remove rescans the tiles of the store, replacing the
+        ones whose file changed on disk.
+
+        Tiles are identified by their modification time and size. A tile rewritten with the same
+        size within the timestamp granularity of the file system is missed, unless the store hashes
+        the content of the tiles (hash_content), which reads the tiles to add, or every tile of the
+        store if neither tiles to add nor to remove are given. Tiles without a recorded hash count
+        as changed.
+
+        The catalog, settings and hashes of the store are only saved after all chunks are built. If
+        an update fails, the store keeps the tiles it had before, and repeating the update rebuilds
+        the chunks it touches.
+        """
+
+        with self._lock, Instrumentation.span("mosaic.update", added=len(add), removed=len(remove)) as span:
+            previous = self._catalog()
+            old = self._footprints(previous)
+            removed = {os.path.abspath(r) for r in remove}
+            paths = [p for p in old if p not in removed]
+            paths += [p for p in dict.fromkeys(os.path.abspath(a) for a in add) if p not in old]
+
+            # Tiles whose content changed, even if their modification time and size did not
+            hashes = self._load_json("hashes.json", {})
+            hashes = {p: h for p, h in hashes.items() if p in paths}
+            rewritten = []
+            if self.hash_content:
+                hashed = [os.path.abspath(a) for a in add] if len(add) + len(remove) > 0 else paths
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    for p, h in zip(hashed, executor.map(MosaicStore._hash_file, hashed)):
+                        if p in old and hashes.get(p) != h:
+                            rewritten.append(p)
+                        hashes[p] = h
+
+            if len(paths) > 0 and self.settings["crs"] is None:
+                self._init_grid(TiffFile(paths[0], lazy=True))
+            catalog = TileCatalog.fromPaths(paths, crs=self.settings["crs"] or "EPSG:4326", rescan=rewritten,
+                                            previous=previous)
+            new = self._footprints(catalog)
+
+            # Chunks touched by the old or the new footprint of every changed tile
+            changed = [p for p in set(old) | set(new) if old.get(p) != new.get(p) or p in rewritten]
+            if not self.hash_content:
+                hashes = {p: h for p, h in hashes.items() if p not in changed}
+            chunks = set()
+            for p in changed:
+                for footprint in (old.get(p), new.get(p)):
+                    if footprint is not None:
+                        chunks.update(self._chunks_of(footprint[0]))
+
+            chunks = sorted(chunks)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(lambda chunk: self._build_chunk(catalog, chunk), chunks))
+
+            # Only record the update once every chunk is built, so an interrupted update is repeated
+            catalog.save(self._catalog_path())
+            self._save_json("store.json", self.settings)
+            self._save_json("hashes.json", hashes)
+
+            span["chunks"] = len(chunks)
+            Instrumentation.count("mosaic.chunks", len(chunks))
+            return chunks
+
+    def export(self, path=None):
+        """
+        Merge the chunks of the mosaic into a single solid.
+
+        Args:
+        path (str, optional): A path the merged solid is saved to. Defaults to None.
+
+        Returns:
+        TiffSolid: The TiffMesh or TiffPc of the whole mosaic, with the origin of the cell grid.
+        """
+
+        files = sorted(glob.glob(os.path.join(self.directory, "chunks", "*.npz")))
+        assert len(files) > 0, "The store does not contain any geometry"
+
+        with Instrumentation.span("mosaic.export", chunks=len(files)) as span:
+            parts = []
+            for file in files:
+                with np.load(file) as chunk:
+                    parts.append({key: chunk[key] for key in chunk.files})
+
+            if self.settings["solid"] == "mesh":
+                vertices, triangles = TiffMesh.weld([(p["keys"], p["points"], p["triangles"]) for p in parts])
+            else:
+                # Every border cell is stored by both chunks sharing it
+                _, first = np.unique(np.concatenate([p["keys"] for p in parts]), return_index=True)
+                vertices = np.concatenate([p["points"] for p in parts])[first]
+                normals = np.concatenate([p["normals"] for p in parts])[first]
+
+            origin_height = vertices[:, 1].min()
+            vertices[:, 1] -= origin_height
+            world_origin = Coordinate(tuple(self.settings["origin"]), CRS.from_user_input(self.settings["crs"]))
+            if self.settings["solid"] == "mesh":
+                solid = TiffMesh.fromArrays(vertices, triangles, world_origin, origin_height)
+            else:
+                solid = TiffPc._from_arrays({"points": vertices, "normals": normals}, world_origin, origin_height)
+            span["points"] = len(vertices)
+
+        if path is not None:
+            solid.save(path)
+        return solid
+
+    def _init_grid(self, tiff):
+        """
+        Derive the missing grid settings from the first tile.
+        """
+
+        crs = self.settings["crs"] or tiff.crs.to_wkt()
+        left, _, _, top = tiff.get_bounds(crs)
+        self.settings["crs"] = crs
+        self.settings["resolution"] = self.settings["resolution"] or abs(tiff.transform.a)
+        self.settings["origin"] = [left, top]
+
+    def _load_json(self, name, default):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return default
+        with open(path) as file:
+            return json.load(file)
+
+    def _save_json(self, name, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp, os.path.join(self.directory, name))
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _catalog_path(self):
+        return os.path.join(self.directory, "catalog.npz")
+
+    def _catalog(self):
+        """
+        The catalog of the tiles in the store, or None for an empty store.
+        """
+
+        return TileCatalog.load(self._catalog_path()) if os.path.exists(self._catalog_path()) else None
+
+    def _footprints(self, catalog):
+        """
+        The footprint and file identity of every tile of a catalog, by path.
+        """
+
+        if catalog is None:
+            return {}
+        tiles = catalog._tiles
+        return {str(p): (tuple(f), int(m), int(s)) for p, f, m, s in
+                zip(tiles["path"], catalog._footprints, tiles["mtime"], tiles["size"])}
+
+    def _chunks_of(self, footprint):
+        """
+        The chunks whose cells, or the halo of one cell around them, overlap a footprint.
+        """
+
+        res, (x0, y0) = self.settings["resolution"], self.settings["origin"]
+        step = self.settings["chunk_size"] - 1
+        left, bottom, right, top = footprint
+        col0, col1 = math.floor((left - x0) / res), math.ceil((right - x0) / res) - 1
+        row0, row1 = math.floor((y0 - top) / res), math.ceil((y0 - bottom) / res) - 1
+
+        # Chunk i covers the rows i * step - 1 to i * step + step + 1, including its halo
+        rows = range(math.ceil((row0 - step - 1) / step), math.floor((row1 + 1) / step) + 1)
+        cols = range(math.ceil((col0 - step - 1) / step), math.floor((col1 + 1) / step) + 1)
+        return [(i, j) for i in rows for j in cols]
+
+    def _chunk_path(self, chunk):
+        return os.path.join(self.directory, "chunks", f"{chunk[0]}_{chunk[1]}.npz")
+
+    def _build_chunk(self, catalog, chunk):
+        """
+        Build the geometry of a chunk from all tiles covering it and store it.
+        """
+
+        res, (x0, y0) = self.settings["resolution"], self.settings["origin"]
+        size = self.settings["chunk_size"]
+        row0, col0 = chunk[0] * (size - 1), chunk[1] * (size - 1)
+
+        # Read the chunk with a halo of one cell, so normals at its border match the neighbours'
+        bounds = (x0 + (col0 - 1) * res, y0 - (row0 + size + 1) * res,
+                  x0 + (col0 + size + 1) * res, y0 - (row0 - 1) * res)
+        tiffs = catalog.query(bounds)
+        if len(tiffs) == 0:
+            if os.path.exists(self._chunk_path(chunk)):
+                os.remove(self._chunk_path(chunk))
+            return
+
+        mosaic = TiffFile.mosaic(tiffs, bounds=bounds, res=(res, res), crs=catalog.crs)
+        data = mosaic.to_numpy(band=1)
+
+        # Rounding the bounds to pixels may leave the mosaic a row or column off, starting at the top left
+        shape = (size + 2, size + 2)
+        data = data[:shape[0], :shape[1]]
+        if data.shape != shape:
+            data = np.pad(data, [(0, shape[0] - data.shape[0]), (0, shape[1] - data.shape[1])],
+                          constant_values=mosaic.nodata)
+
+        # Local coordinates relative to the origin of the cell grid
+        transform = Affine(res, 0, (col0 - 1) * res, 0, -res, -(row0 - 1) * res)
+        grid = np.empty(data.shape + (3,))
+        TiffPc._window_points(Window(0, 0, data.shape[1], data.shape[0]), data, transform, grid)
+        valid = TiffPc.validHeights(grid[:, :, 1], mosaic.nodata)
+
+        core = (slice(1, -1), slice(1, -1))
+        arrays = {}
+        if self.settings["solid"] == "mesh":
+            rows, cols, arrays["triangles"] = TiffMesh.triangulateGrid(
+                grid[core][:, :, 1], valid[core], self.settings["method"], self.settings["max_error"],
+                np.pad(np.zeros((size - 2, size - 2), dtype=bool), 1, constant_values=True))
+        else:
+            points = grid.reshape((-1, 3))
+            normals = TiffPc.gradientNormals(points, valid.reshape(-1), data.shape, transform)
+            rows, cols = np.nonzero(valid[core])
+            arrays["normals"] = normals.reshape(grid.shape)[core][rows, cols]
+
+        arrays["points"] = grid[core][rows, cols]
+        arrays["keys"] = ((rows + row0 + MosaicStore._KEY_BIAS).astype(np.int64) << 32) \
+            + (cols + col0 + MosaicStore._KEY_BIAS)
+
+        if len(arrays["points"]) == 0:
+            if os.path.exists(self._chunk_path(chunk)):
+                os.remove(self._chunk_path(chunk))
+            return
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.directory, "chunks"), suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(tmp, self._chunk_path(chunk))
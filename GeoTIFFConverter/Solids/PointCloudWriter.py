@@ -0,0 +1,109 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import numpy as np
+
+class PointCloudWriter:
+    """
+    A class that writes point clouds to binary PLY or PCD files incrementally.
+
+    Points are appended chunk by chunk, so the memory used for writing is bounded by the
+    size of a chunk instead of the size of the point cloud. The header is written up front
+    with a placeholder for the number of points, which is filled in once the writer is closed.
+    """
+
+    _COUNT_WIDTH = 20 # Characters reserved for the number of points in the header
+
+    def __init__(self, path, normals=False, dtype=np.float32):
+        """
+        Initialize a PointCloudWriter object and write the file header.
+
+        Args:
+        path (str): The path of the point cloud. Its extension (.ply or .pcd) selects the format.
+        normals (bool, optional): Wether point normals are written. Defaults to False.
+        dtype (np.dtype, optional): The floating point type the values are stored in, np.float32
+        or np.float64. Defaults to np.float32.
+        """
+
+        self.path = path
+        self.format = os.path.splitext(path)[1].lower()
+        assert self.format in (".ply", ".pcd"), f"Unsupported point cloud format {self.format}"
+        self.normals = normals
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        assert self.dtype.kind == "f" and self.dtype.itemsize in (4, 8), "Values must be stored as float32 or float64"
+        self.count = 0
+
+        self._file = open(path, "wb")
+        self._count_offsets = []
+        self._write_header()
+
+    def write(self, points, normals=None):
+        """
+        Append a chunk of points.
+
+        Args:
+        points (np.ndarray): A (N, 3) array of point positions.
+        normals (np.ndarray, optional): A (N, 3) array of point normals, required if the writer
+        was created with normals. Defaults to None.
+        """
+
+        assert (normals is not None) == self.normals, "Normals must be given if and only if the writer stores normals"
+        columns = 6 if self.normals else 3
+        chunk = np.empty((len(points), columns), dtype=self.dtype)
+        chunk[:, :3] = points
+        if self.normals:
+            chunk[:, 3:] = normals
+
+        self._file.write(chunk.tobytes())
+        self.count += len(points)
+
+    def close(self):
+        """
+        Fill in the number of points in the header and close the file.
+        """
+
+        if self._file.closed:
+            return
+        count = f"{self.count:<{PointCloudWriter._COUNT_WIDTH}d}".encode()
+        for offset in self._count_offsets:
+            self._file.seek(offset)
+            self._file.write(count)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _write_header(self):
+        """
+        Write the header of the file, recording the positions of the point count placeholders.
+        """
+
+        names = ["x", "y", "z"]
+        if self.normals:
+            names += ["nx", "ny", "nz"] if self.format == ".ply" else ["normal_x", "normal_y", "normal_z"]
+        placeholder = " " * PointCloudWriter._COUNT_WIDTH
+
+        if self.format == ".ply":
+            kind = "float" if self.dtype.itemsize == 4 else "double"
+            lines = ["ply", "format binary_little_endian 1.0", f"element vertex {placeholder}"]
+            lines += [f"property {kind} {name}" for name in names]
+            lines += ["end_header"]
+            count_lines = [2]
+        else:
+            size = " ".join([str(self.dtype.itemsize)] * len(names))
+            lines = ["VERSION .7", "FIELDS " + " ".join(names), f"SIZE {size}",
+                     "TYPE " + " ".join(["F"] * len(names)), "COUNT " + " ".join(["1"] * len(names)),
+                     f"WIDTH {placeholder}", "HEIGHT 1", "VIEWPOINT 0 0 0 1 0 0 0",
+                     f"POINTS {placeholder}", "DATA binary"]
+            count_lines = [5, 8]
+
+        offset = 0
+        for i, line in enumerate(lines):
+            if i in count_lines:
+                self._count_offsets.append(offset + len(line) - len(placeholder))
+            offset += len(line) + 1
+        self._file.write(("\n".join(lines) + "\n").encode("ascii"))
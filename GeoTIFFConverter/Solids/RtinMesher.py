@@ -0,0 +1,242 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import math
+import numpy as np
+
+class RtinMesher:
+    """
+    A class that provides static methods to triangulate elevation grids adaptively
+    using a right-triangulated irregular network (RTIN).
+
+    The grid is embedded in a square of (2^k + 1) x (2^k + 1) cells, which is recursively
+    split into right triangles. A triangle is only split if interpolating over it would
+    deviate from any grid cell it covers by more than the allowed vertical error, so flat
+    areas are covered by few large triangles while ridges keep their detail. Errors are
+    propagated from child to parent triangles, which guarantees a crack-free mesh.
+    """
+
+    @staticmethod
+    def triangulate(heights, valid, max_error, locked=None):
+        """
+        Triangulate an elevation grid up to a maximum vertical error.
+
+        Args:
+        heights (np.ndarray): A (rows, cols) array of elevations.
+        valid (np.ndarray): A (rows, cols) boolean mask of the cells holding valid elevation data.
+        max_error (float): The maximum vertical error in the units of the elevation data.
+        locked (np.ndarray, optional): A (rows, cols) boolean mask of cells that must become vertices,
+        e.g. the borders shared with neighbouring grids. Defaults to None.
+
+        Returns:
+        tuple: A tuple (cells, triangles, error), where cells is a (K, 2) array with the (row, col)
+        grid position of every vertex, triangles is a (M, 3) array of counter-clockwise (seen from
+        above) indices into cells and error is the largest vertical error of the emitted triangles.
+
+        Note:
+        Triangles touching invalid cells are skipped. Triangles covering both valid and invalid cells
+        are always refined, so the mesh follows the boundary of the valid area exactly. The same holds
+        for triangles covering locked cells, so two grids locked along a shared border triangulate it
+        identically, at full resolution.
+        """
+
+        rows, cols = heights.shape
+        n = 1 << max(1, math.ceil(math.log2(max(rows, cols, 2) - 1)))
+
+        # Embed the grid in a square of 2^k + 1 cells, the padding is treated as invalid
+        H = np.zeros((n + 1, n + 1))
+        H[:rows, :cols] = np.where(valid, heights, 0)
+        invalid = np.ones((n + 1, n + 1), dtype=bool)
+        invalid[:rows, :cols] = ~valid
+
+        # Summed area table to count invalid cells within a bounding box
+        sat = np.zeros((n + 2, n + 2), dtype=np.int64)
+        sat[1:, 1:] = invalid.cumsum(axis=0).cumsum(axis=1)
+        lock_sat = None
+        if locked is not None:
+            lock = np.zeros((n + 1, n + 1), dtype=bool)
+            lock[:rows, :cols] = locked
+            lock_sat = np.zeros((n + 2, n + 2), dtype=np.int64)
+            lock_sat[1:, 1:] = lock.cumsum(axis=0).cumsum(axis=1)
+
+        errors = RtinMesher._compute_errors(H, sat, n, lock_sat)
+        return RtinMesher._extract(errors, invalid, n, max_error)
+
+    @staticmethod
+    def _compute_errors(H, sat, n, lock_sat=None):
+        """
+        Compute the approximation error of every triangle pair sharing a hypotenuse, bottom-up.
+
+        Args:
+        H (np.ndarray): The (n + 1, n + 1) padded elevation grid.
+        sat (np.ndarray): The (n + 2, n + 2) summed area table of invalid cells.
+        n (int): The size of the root square.
+        lock_sat (np.ndarray, optional): The (n + 2, n + 2) summed area table of locked cells. Defaults to None.
+
+        Returns:
+        np.ndarray: A (n + 1, n + 1) array of errors, indexed by hypotenuse midpoint.
+        """
+
+        errors = np.zeros_like(H)
+
+        s = 2
+        while s <= n:
+            h, q = s // 2, s // 4
+
+            # Triangles with an axis-aligned hypotenuse of length s, shared by two neighbouring triangles.
+            # Their children have the diagonals of the adjacent squares of size s/2 as hypotenuse.
+            my, mx = RtinMesher._lattice(np.arange(0, n + 1, s), np.arange(h, n, s))
+            horizontal = (my, mx, (0, -h), (0, h), ((h, 0), (-h, 0)))
+            my, mx = RtinMesher._lattice(np.arange(h, n, s), np.arange(0, n + 1, s))
+            vertical = (my, mx, (-h, 0), (h, 0), ((0, h), (0, -h)))
+            children = [(dy, dx) for dy in (-q, q) for dx in (-q, q)] if q > 0 else []
+            RtinMesher._update_errors(errors, H, sat, n, h, (horizontal, vertical), children, lock_sat)
+
+            # Triangles with the diagonal of a square of size s as hypotenuse. Diagonals alternate
+            # in a checkerboard pattern, all passing through the center of their parent square.
+            # Their children have the edges of the square as hypotenuse.
+            my, mx = RtinMesher._lattice(np.arange(h, n, s), np.arange(h, n, s))
+            main = ((my // s + mx // s) % 2) == 0
+            diagonal = (my[main], mx[main], (-h, -h), (h, h), ((-h, h), (h, -h)))
+            anti_diagonal = (my[~main], mx[~main], (-h, h), (h, -h), ((-h, -h), (h, h)))
+            children = [(0, -h), (0, h), (-h, 0), (h, 0)]
+            RtinMesher._update_errors(errors, H, sat, n, h, (diagonal, anti_diagonal), children, lock_sat)
+
+            s *= 2
+
+        return errors
+
+    @staticmethod
+    def _lattice(ys, xs):
+        """
+        Flattened (y, x) coordinates of all combinations of ys and xs.
+        """
+
+        my, mx = np.meshgrid(ys, xs, indexing="ij")
+        return my.ravel(), mx.ravel()
+
+    @staticmethod
+    def _update_errors(errors, H, sat, n, h, groups, children, lock_sat=None):
+        """
+        Compute the errors of one level of triangle pairs and propagate the errors of their children.
+
+        Args:
+        errors (np.ndarray): The error grid, updated in place.
+        H (np.ndarray): The padded elevation grid.
+        sat (np.ndarray): The summed area table of invalid cells.
+        n (int): The size of the root square.
+        h (int): Half the length of the hypotenuses.
+        groups (tuple): (my, mx, e1, e2, apexes) tuples of congruent triangle pairs, holding the
+        hypotenuse midpoints, the endpoint offsets and the offsets of both right-angle vertices.
+        children (list): The offsets of the children's hypotenuse midpoints.
+        lock_sat (np.ndarray, optional): The summed area table of locked cells. Defaults to None.
+        """
+
+        for my, mx, e1, e2, apexes in groups:
+            error = np.zeros(len(my))
+            for apex in apexes:
+                error = np.maximum(error, RtinMesher._deviation(H, n, my, mx, (e1, e2, apex)))
+
+            # Triangles partially covering invalid cells are always split
+            y0, y1 = np.maximum(my - h, 0), np.minimum(my + h, n)
+            x0, x1 = np.maximum(mx - h, 0), np.minimum(mx + h, n)
+            count = sat[y1 + 1, x1 + 1] - sat[y0, x1 + 1] - sat[y1 + 1, x0] + sat[y0, x0]
+            area = (y1 - y0 + 1) * (x1 - x0 + 1)
+            error[(count > 0) & (count < area)] = np.inf
+            if lock_sat is not None:
+                # Triangles covering locked cells are split down to single cells
+                locked = lock_sat[y1 + 1, x1 + 1] - lock_sat[y0, x1 + 1] - lock_sat[y1 + 1, x0] + lock_sat[y0, x0]
+                error[locked > 0] = np.inf
+            error[count == area] = 0
+
+            for dy, dx in children:
+                cy, cx = my + dy, mx + dx
+                inside = (cy >= 0) & (cy <= n) & (cx >= 0) & (cx <= n)
+                error[inside] = np.maximum(error[inside], errors[cy[inside], cx[inside]])
+
+            errors[my, mx] = error
+
+    @staticmethod
+    def _deviation(H, n, my, mx, corners, batch_cells=1 << 22):
+        """
+        Compute the largest vertical deviation between congruent triangles and the grid they cover.
+
+        Args:
+        H (np.ndarray): The padded elevation grid.
+        n (int): The size of the root square.
+        my (np.ndarray): The y coordinates of the triangles' reference points.
+        mx (np.ndarray): The x coordinates of the triangles' reference points.
+        corners (tuple): The three (dy, dx) corner offsets relative to the reference point.
+        batch_cells (int, optional): The number of grid cells gathered at once. Defaults to 2^22
+
+        Returns:
+        np.ndarray: The deviation of every triangle, 0 for triangles outside the grid.
+        """
+
+        corners = np.array(corners)
+        inside = np.ones(len(my), dtype=bool)
+        for dy, dx in corners:
+            inside &= (my + dy >= 0) & (my + dy <= n) & (mx + dx >= 0) & (mx + dx <= n)
+
+        # Barycentric weights of all cells covered by the triangle
+        oy, ox = RtinMesher._lattice(np.arange(corners[:, 0].min(), corners[:, 0].max() + 1),
+                                     np.arange(corners[:, 1].min(), corners[:, 1].max() + 1))
+        T = np.array([corners[1] - corners[0], corners[2] - corners[0]]).T
+        uv = np.linalg.solve(T, np.stack((oy - corners[0, 0], ox - corners[0, 1])))
+        covered = (uv >= -1e-9).all(axis=0) & (uv.sum(axis=0) <= 1 + 1e-9)
+        oy, ox, uv = oy[covered], ox[covered], uv[:, covered]
+        weights = np.stack((1 - uv.sum(axis=0), uv[0], uv[1]), axis=1)
+
+        deviation = np.zeros(len(my))
+        idx = np.flatnonzero(inside)
+        step = max(1, batch_cells // len(oy))
+        for i in range(0, len(idx), step):
+            j = idx[i:i + step]
+            vertex_heights = np.stack([H[my[j] + dy, mx[j] + dx] for dy, dx in corners], axis=1)
+            cells = H[my[j, np.newaxis] + oy, mx[j, np.newaxis] + ox]
+            deviation[j] = np.abs(vertex_heights @ weights.T - cells).max(axis=1)
+
+        return deviation
+
+    @staticmethod
+    def _extract(errors, invalid, n, max_error):
+        """
+        Extract the triangles of the RTIN, top-down, splitting wherever the error is too large.
+
+        Returns:
+        tuple: (cells, triangles, error), see RtinMesher.triangulate.
+        """
+
+        # Triangles are stored as (ax, ay, bx, by, cx, cy), with c the right-angle vertex
+        active = np.array([[0, 0, n, n, n, 0],
+                           [n, n, 0, 0, 0, n]], dtype=np.int64)
+        emitted = []
+        achieved = 0.0
+        while len(active) > 0:
+            ax, ay, bx, by, cx, cy = active.T
+            mx, my = (ax + bx) // 2, (ay + by) // 2
+
+            leaf = np.abs(ax - cx) + np.abs(ay - cy) <= 1
+            error = np.where(leaf, 0, errors[my, mx])
+            split = error > max_error
+
+            done = active[~split]
+            keep = ~(invalid[done[:, 1], done[:, 0]] | invalid[done[:, 3], done[:, 2]]
+                     | invalid[done[:, 5], done[:, 4]])
+            if keep.any():
+                achieved = max(achieved, float(error[~split][keep].max()))
+            emitted.append(done[keep])
+
+            ax, ay, bx, by, cx, cy = active[split].T
+            mx, my = (ax + bx) // 2, (ay + by) // 2
+            active = np.concatenate((np.stack((cx, cy, ax, ay, mx, my), axis=1),
+                                     np.stack((bx, by, cx, cy, mx, my), axis=1)))
+
+        triangles = np.concatenate(emitted)
+
+        # Linear grid index of every corner, reordered (a, c, b) to wind counter-clockwise
+        corners = triangles[:, [1, 5, 3]] * (n + 1) + triangles[:, [0, 4, 2]]
+        unique, inverse = np.unique(corners, return_inverse=True)
+        cells = np.stack(np.divmod(unique, n + 1), axis=1)
+
+        return cells, inverse.reshape((-1, 3)).astype(np.int32), achieved
@@ -0,0 +1,218 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import json
+import shutil
+import hashlib
+import inspect
+import tempfile
+import threading
+import numpy as np
+from ..Coordinate import Coordinate
+
+class SolidCache:
+    """
+    A persistent cache of solids built from GeoTIFF files.
+
+    Solids are keyed by their source and every parameter of the method that built them. The
+    source of a solid built from a TiffFile is identified by the file's path, modification time
+    and size, or by a hash of its content. Every entry is stored in its own directory holding
+    the geometry arrays as .npy files, which are memory-mapped (copy-on-write) when loaded,
+    and the origin metadata as json. Once the entries exceed max_bytes, the least recently
+    used entries are removed.
+    """
+
+    _VERSION = 1 # Bumped whenever the stored layout or the built geometry changes
+
+    def __init__(self, directory, max_bytes=4 * 1024 ** 3, hash_content=False):
+        """
+        Initialize a SolidCache object.
+
+        Args:
+        directory (str): The directory the entries are stored in. It is created if it does not exist.
+        max_bytes (int, optional): The maximum total size of the entries. Defaults to 4 GiB.
+        hash_content (bool, optional): Wether source files are identified by a hash of their content
+        instead of their modification time and size. Defaults to False.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def fromTiffFile(self, cls, tiff, **params):
+        """
+        Retrieve the solid of a TiffFile from the cache, building and storing it on a miss.
+
+        Args:
+        cls (type): The solid class, TiffPc or TiffMesh.
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        **params: The parameters passed to cls.fromTiffFile.
+
+        Returns:
+        TiffSolid: The solid, as built by cls.fromTiffFile(tiff, **params).
+
+        Note:
+        TiffFiles that are not backed by a regular file, such as in-memory mosaics, are not cached.
+        """
+
+        source = self._file_identity(tiff.path)
+        if source is None:
+            return cls.fromTiffFile(tiff, **params)
+        key = self._key(cls, cls.fromTiffFile, source, params)
+        return self._get_or_build(key, cls, lambda: cls.fromTiffFile(tiff, **params))
+
+    def fromTiffPc(self, cls, tiff_pc, **params):
+        """
+        Retrieve the solid built from a point cloud, building and storing it on a miss.
+
+        Args:
+        cls (type): The solid class, e.g. TiffMesh.
+        tiff_pc (TiffPc): The point cloud.
+        **params: The parameters passed to cls.fromTiffPc.
+
+        Returns:
+        TiffSolid: The solid, as built by cls.fromTiffPc(tiff_pc, **params).
+
+        Note:
+        The point cloud is identified by a hash of its geometry and origin.
+        """
+
+        digest = hashlib.sha256()
+        for name, array in sorted(tiff_pc._get_arrays().items()):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+        origin = tiff_pc.world_origin
+        digest.update(f"{origin.x!r},{origin.y!r},{origin.proj_string},{tiff_pc.origin_height!r}".encode())
+
+        key = self._key(cls, cls.fromTiffPc, digest.hexdigest(), params)
+        return self._get_or_build(key, cls, lambda: cls.fromTiffPc(tiff_pc, **params))
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+
+        with self._lock:
+            for name in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    @property
+    def size(self):
+        """
+        The total size of the entries in bytes.
+        """
+
+        return sum(size for _, _, size in self._entries())
+
+    def _file_identity(self, path):
+        """
+        Identify the content of a source file.
+
+        Returns:
+        str: The identity of the file, or None if the path is not a regular file.
+        """
+
+        if not os.path.isfile(path):
+            return None
+        if self.hash_content:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+        stat = os.stat(path)
+        return f"{os.path.realpath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def _key(self, cls, builder, source, params):
+        """
+        Compute the key of an entry from its source and all build parameters, including defaults.
+        """
+
+        bound = inspect.signature(builder).bind_partial(**params)
+        bound.apply_defaults()
+        arguments = {k: v for k, v in bound.arguments.items() if k not in ("tiff", "tiff_pc")}
+        description = json.dumps({"version": SolidCache._VERSION, "class": cls.__name__,
+                                  "builder": builder.__name__, "source": source, "params": arguments},
+                                 sort_keys=True, default=str)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _get_or_build(self, key, cls, build):
+        """
+        Load an entry, or build the solid and store it.
+        """
+
+        entry = os.path.join(self.directory, key)
+        meta_path = os.path.join(entry, "meta.json")
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            os.utime(meta_path)
+        except FileNotFoundError:
+            meta = None
+
+        if meta is not None:
+            arrays = {name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="c") for name in meta["arrays"]}
+            world_origin = Coordinate(tuple(meta["world_origin"]), meta["proj_string"])
+            return cls._from_arrays(arrays, world_origin, meta["origin_height"])
+
+        solid = build()
+        self._store(entry, solid)
+        return solid
+
+    def _store(self, entry, solid):
+        """
+        Store a solid as a new entry, evicting least recently used entries if necessary.
+        """
+
+        # Write to a temporary directory first, so readers never see partial entries
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp")
+        arrays = solid._get_arrays()
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        origin = solid.world_origin
+        meta = {"arrays": list(arrays), "world_origin": [float(origin.x), float(origin.y)],
+                "proj_string": str(origin.proj_string), "origin_height": float(solid.origin_height)}
+        with open(os.path.join(tmp, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+        with self._lock:
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # Stored concurrently by another process
+                shutil.rmtree(tmp, ignore_errors=True)
+            self._evict(keep=os.path.basename(entry))
+
+    def _entries(self):
+        """
+        List the stored entries.
+
+        Returns:
+        list: (last use, name, size) tuples, least recently used first.
+        """
+
+        entries = []
+        for item in os.scandir(self.directory):
+            meta_path = os.path.join(item.path, "meta.json")
+            if not item.is_dir() or not os.path.exists(meta_path):
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(item.path))
+            entries.append((os.stat(meta_path).st_mtime, item.name, size))
+        return sorted(entries)
+
+    def _evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits its size limit.
+        """
+
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            if name != keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                total -= size
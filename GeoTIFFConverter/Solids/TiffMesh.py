@@ -1,9 +1,13 @@
 # Author: Sven Pfiffner
 # Created: November 2023
 
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from rasterio.windows import Window
 from .TiffSolid import TiffSolid
 from .TiffPc import TiffPc
+from .RtinMesher import RtinMesher
+from ..Instrumentation import Instrumentation
 import open3d as o3d
 
 class TiffMesh(TiffSolid):
@@ -11,23 +15,398 @@ class TiffMesh(TiffSolid):
     A class representing meshes of tiff data, implementing the TiffSolid interface.
     """
 
+    _position_keys = ("vertices",)
+    _normal_keys = ("vertex_normals",)
+    _index_keys = {"triangles": "vertices"}
+
     @staticmethod
-    def fromTiffFile(tiff) -> 'TiffMesh':
+    def fromTiffFile(tiff, window_size=None, method="poisson", max_error=1.0, resolution=None) -> 'TiffMesh':
+        """
+        Generates a mesh representation from a TiffFile object.
+
+        Args:
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFile. If none is given, the native block
+        layout of the file is used. Defaults to None
+        method (str, optional): The meshing method. Defaults to "poisson".
+        - "poisson": Poisson surface reconstruction of the point cloud.
+        - "grid": Direct triangulation of the raster grid with two triangles per pixel quad.
+          Nodata cells are skipped and no normal estimation or reconstruction is run.
+        - "adaptive": Error-bounded adaptive triangulation of the raster grid, see fromTiffFileAdaptive.
+        max_error (float, optional): The maximum vertical error in metres of the "adaptive" method.
+        Defaults to 1.0
+        resolution (float, optional): The target ground resolution of the mesh. The raster is read
+        decimated, see TiffFile.get_decimation. If none is given, the native resolution is used.
+        Defaults to None
+
+        Returns:
+        TiffMesh: A mesh representation generated from the provided TiffFile.
+        """
+
+        if method == "grid":
+            return TiffMesh._fromGrid(tiff, window_size, resolution)
+        if method == "adaptive":
+            return TiffMesh.fromTiffFileAdaptive(tiff, max_error, window_size, resolution)[0]
+        assert method == "poisson", f"Unknown meshing method {method}"
 
         # Load as TiffPc
-        tiff_pc = TiffPc.fromTiffFile(tiff)
+        tiff_pc = TiffPc.fromTiffFile(tiff, window_size=window_size, resolution=resolution)
 
         # Run Poisson surface reconstruction    
-        mesh, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(tiff_pc.data, depth=9)
+        with Instrumentation.span("mesh.poisson", points=len(tiff_pc.data.points)) as span:
+            mesh, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(tiff_pc.data, depth=9)
+            span["vertices"], span["triangles"] = len(mesh.vertices), len(mesh.triangles)
 
         return TiffMesh(mesh, tiff_pc.world_origin,
                       tiff_pc.origin_height)
 
+    @staticmethod
+    def _fromGrid(tiff, window_size=None, resolution=None) -> 'TiffMesh':
+        """
+        Triangulates the raster grid of a TiffFile directly.
+
+        Args:
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFile. Defaults to None
+        resolution (float, optional): The target ground resolution of the mesh. Defaults to None
+
+        Returns:
+        TiffMesh: A mesh with one vertex per valid pixel.
+        """
+
+        height, width = tiff.get_shape(resolution)
+        points = TiffPc.pointsFromTiffFile(tiff, window_size, resolution=resolution)
+
+        # Mask out nodata cells
+        valid = TiffPc.validMask(points, tiff.nodata)
+
+        with Instrumentation.span("mesh.grid", points=len(points)) as span:
+            triangles = TiffMesh.gridTriangles(valid.reshape((height, width)))
+            vertices = points[valid]
+            span["vertices"], span["triangles"] = len(vertices), len(triangles)
+
+        # Normalize height
+        origin_height = vertices[:, 1].min()
+        vertices[:, 1] -= origin_height
+
+        return TiffMesh.fromArrays(vertices, triangles, tiff.get_bounding_coordinates()[0], origin_height)
+
+    @staticmethod
+    def fromTiffFileAdaptive(tiff, max_error=1.0, window_size=None, resolution=None) -> tuple:
+        """
+        Generates a mesh representation from a TiffFile object using error-bounded adaptive triangulation.
+
+        Args:
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        max_error (float, optional): The maximum vertical error in metres. Defaults to 1.0
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFile. Defaults to None
+        resolution (float, optional): The target ground resolution of the underlying grid. Defaults to None
+
+        Returns:
+        tuple: A tuple (TiffMesh, dict), where the dict reports the "triangle_count", the "vertex_count"
+        and the achieved vertical "error" of the mesh.
+
+        Note:
+        Flat areas are covered by few large triangles while rough terrain keeps its detail, see RtinMesher.
+        """
+
+        height, width = tiff.get_shape(resolution)
+        points = TiffPc.pointsFromTiffFile(tiff, window_size, resolution=resolution)
+        grid = points.reshape((height, width, 3))
+
+        # Mask out nodata cells
+        valid = TiffPc.validMask(points, tiff.nodata).reshape((height, width))
+
+        with Instrumentation.span("mesh.adaptive", points=len(points), max_error=max_error) as span:
+            cells, triangles, error = RtinMesher.triangulate(grid[:, :, 1], valid, max_error)
+            vertices = grid[cells[:, 0], cells[:, 1]]
+            span["vertices"], span["triangles"], span["error"] = len(vertices), len(triangles), error
+
+        # Normalize height
+        origin_height = grid[:, :, 1][valid].min()
+        vertices[:, 1] -= origin_height
+
+        stats = {"triangle_count": len(triangles), "vertex_count": len(vertices), "error": error}
+        return TiffMesh.fromArrays(vertices, triangles, tiff.get_bounding_coordinates()[0], origin_height), stats
+
+    @staticmethod
+    def fromTiffFileTiled(tiff, method="grid", chunk_size=(1025, 1025), overlap=16, max_error=1.0,
+                          resolution=None, workers=None, depth=9) -> 'TiffMesh':
+        """
+        Generates a mesh representation from a TiffFile object chunk by chunk, in parallel.
+
+        Args:
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        method (str, optional): The meshing method of every chunk, "grid", "adaptive" or "poisson",
+        see fromTiffFile. Defaults to "grid".
+        chunk_size (tuple, optional): The (rows, cols) size of a chunk in the grid of the requested
+        resolution. Sizes of 2^k + 1 suit the "adaptive" method best. Defaults to (1025, 1025)
+        overlap (int, optional): The number of cells the "poisson" method reads beyond every chunk
+        border, so the reconstruction is not distorted at the seams. Defaults to 16
+        max_error (float, optional): The maximum vertical error in metres of the "adaptive" method.
+        Defaults to 1.0
+        resolution (float, optional): The target ground resolution of the mesh, see
+        TiffFile.get_decimation. Defaults to None
+        workers (int, optional): The number of chunks meshed concurrently. Defaults to None, which
+        uses the default of ThreadPoolExecutor.
+        depth (int, optional): The octree depth of the "poisson" method per chunk. Defaults to 9
+
+        Returns:
+        TiffMesh: A single mesh of all chunks.
+
+        Note:
+        Neighbouring chunks share their border row or column. The "grid" and "adaptive" methods
+        place vertices on the raster cells, and the adaptive triangulation is locked to full
+        resolution along shared borders, so seam vertices are welded by their global cell index
+        and the mesh is watertight at the seams. The "poisson" method crops every chunk's
+        reconstruction to the chunk, so its seams meet without overlap but are not welded.
+        Only the chunks being meshed are held in memory next to the result. To mesh a
+        collection of tiles, mosaic them first, see TiffFile.mosaic.
+        """
+
+        assert method in ("grid", "adaptive", "poisson"), f"Unknown meshing method {method}"
+        height, width = tiff.get_shape(resolution)
+        transform = tiff.get_local_transform(resolution)
+
+        # Chunks overlap by one row and column, which hold the vertices of the seam
+        step_rows, step_cols = max(chunk_size[0] - 1, 1), max(chunk_size[1] - 1, 1)
+        chunks = [Window(c0, r0, min(chunk_size[1], width - c0), min(chunk_size[0], height - r0))
+                  for r0 in range(0, max(height - 1, 1), step_rows)
+                  for c0 in range(0, max(width - 1, 1), step_cols)]
+
+        def mesh_chunk(window):
+            if method == "poisson":
+                return TiffMesh._poissonChunk(tiff, window, transform, resolution, overlap, depth)
+            return TiffMesh._gridChunk(tiff, window, transform, resolution, method, max_error)
+
+        with Instrumentation.span("mesh.tiled", method=method, chunks=len(chunks)) as span:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                parts = list(executor.map(mesh_chunk, chunks))
+            vertices, triangles = TiffMesh.weld(parts)
+            span["vertices"], span["triangles"] = len(vertices), len(triangles)
+
+        assert len(vertices) > 0, "TiffFile does not contain any valid elevation data"
+
+        # Normalize height
+        origin_height = vertices[:, 1].min()
+        vertices[:, 1] -= origin_height
+
+        return TiffMesh.fromArrays(vertices, triangles, tiff.get_bounding_coordinates()[0], origin_height)
+
+    @staticmethod
+    def weld(parts) -> tuple:
+        """
+        Joins meshed chunks into a single mesh, merging the vertices they share.
+
+        Args:
+        parts (list): (keys, vertices, triangles) tuples of the chunks. keys is a (K,) int64 array with
+        the global cell index (e.g. row * width + col) of every vertex, or a negative value for vertices
+        that are not placed on a cell and are never merged. triangles index the chunk's vertices.
+
+        Returns:
+        tuple: A tuple (vertices, triangles) of the welded mesh, with vertices ordered by cell index.
+        """
+
+        keys, vertices, triangles = [], [], []
+        offset, loose = 0, 0
+        for part_keys, part_vertices, part_triangles in parts:
+            part_keys = part_keys.copy()
+            # Give every vertex off the grid a key of its own, below all cell indices
+            free = part_keys < 0
+            part_keys[free] = -1 - loose - np.arange(np.count_nonzero(free))
+            loose += np.count_nonzero(free)
+
+            keys.append(part_keys)
+            vertices.append(part_vertices)
+            triangles.append(part_triangles.astype(np.int64) + offset)
+            offset += len(part_keys)
+
+        if offset == 0:
+            return np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+
+        # Vertices with the same key are merged into the first of them
+        _, first, inverse = np.unique(np.concatenate(keys), return_index=True, return_inverse=True)
+        vertices = np.concatenate(vertices)[first]
+        triangles = inverse.reshape(-1)[np.concatenate(triangles)].astype(np.int32)
+        return vertices, triangles
+
+    @staticmethod
+    def _gridChunk(tiff, window, transform, resolution, method, max_error) -> tuple:
+        """
+        Triangulates a chunk of the raster grid, see fromTiffFileTiled.
+
+        Returns:
+        tuple: The (keys, vertices, triangles) of the chunk, see weld.
+        """
+
+        height, width = tiff.get_shape(resolution)
+        data = tiff.read_window(window, resolution=resolution)
+        grid = np.empty(data.shape + (3,))
+        TiffPc._window_points(window, data, transform, grid)
+
+        valid = TiffPc.validHeights(grid[:, :, 1], tiff.nodata)
+        if not valid.any():
+            return np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+
+        # Lock the borders shared with neighbouring chunks, so both sides place the same vertices
+        locked = np.zeros(valid.shape, dtype=bool)
+        locked[0, :] |= window.row_off > 0
+        locked[-1, :] |= window.row_off + window.height < height
+        locked[:, 0] |= window.col_off > 0
+        locked[:, -1] |= window.col_off + window.width < width
+        rows, cols, triangles = TiffMesh.triangulateGrid(grid[:, :, 1], valid, method, max_error, locked)
+
+        keys = (rows + window.row_off).astype(np.int64) * width + (cols + window.col_off)
+        return keys, grid[rows, cols], triangles
+
+    @staticmethod
+    def triangulateGrid(heights, valid, method="grid", max_error=1.0, locked=None) -> tuple:
+        """
+        Triangulates a grid of elevation cells.
+
+        Args:
+        heights (np.ndarray): A (rows, cols) array of elevations.
+        valid (np.ndarray): A (rows, cols) boolean mask of the cells holding valid elevation data.
+        method (str, optional): "grid" for two triangles per quad or "adaptive" for an error-bounded
+        triangulation, see RtinMesher. Defaults to "grid".
+        max_error (float, optional): The maximum vertical error of the "adaptive" method. Defaults to 1.0
+        locked (np.ndarray, optional): A boolean mask of cells the "adaptive" method keeps as
+        vertices, see RtinMesher.triangulate. Defaults to None.
+
+        Returns:
+        tuple: A tuple (rows, cols, triangles) with the grid position of every vertex and the
+        (M, 3) counter-clockwise vertex indices of the triangles.
+        """
+
+        if method == "grid":
+            rows, cols = np.nonzero(valid)
+            return rows, cols, TiffMesh.gridTriangles(valid)
+        assert method == "adaptive", f"Unknown meshing method {method}"
+        cells, triangles, _ = RtinMesher.triangulate(heights, valid, max_error, locked)
+        return cells[:, 0], cells[:, 1], triangles
+
+    @staticmethod
+    def _poissonChunk(tiff, window, transform, resolution, overlap, depth) -> tuple:
+        """
+        Reconstructs a chunk of the raster grid with Poisson surface reconstruction, see fromTiffFileTiled.
+
+        Returns:
+        tuple: The (keys, vertices, triangles) of the chunk, see weld.
+        """
+
+        height, width = tiff.get_shape(resolution)
+        r0, c0 = max(window.row_off - overlap, 0), max(window.col_off - overlap, 0)
+        r1 = min(window.row_off + window.height + overlap, height)
+        c1 = min(window.col_off + window.width + overlap, width)
+        outer = Window(c0, r0, c1 - c0, r1 - r0)
+
+        data = tiff.read_window(outer, resolution=resolution)
+        points = np.empty(data.shape + (3,))
+        TiffPc._window_points(outer, data, transform, points)
+        points = points.reshape((-1, 3))
+
+        valid = TiffPc.validHeights(points[:, 1], tiff.nodata)
+        if not valid.any():
+            return np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+
+        pcd = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points[valid]))
+        pcd.normals = o3d.utility.Vector3dVector(TiffPc.gradientNormals(points, valid, data.shape, transform)[valid])
+        mesh, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=depth)
+        vertices, triangles = np.asarray(mesh.vertices), np.asarray(mesh.triangles)
+
+        # Keep the triangles whose centroid lies in the chunk. Chunks end at the pixel centers of the
+        # shared border, the last chunk of a row or column at the edge of the raster.
+        centroids = vertices[triangles].mean(axis=1)
+        col, row = ~transform @ (centroids[:, 0], centroids[:, 2])
+        col0, row0 = window.col_off + 0.5, window.row_off + 0.5
+        col1, row1 = window.col_off + window.width - 0.5, window.row_off + window.height - 0.5
+        col0, row0 = (col0 if window.col_off > 0 else -np.inf), (row0 if window.row_off > 0 else -np.inf)
+        col1 = col1 if window.col_off + window.width < width else np.inf
+        row1 = row1 if window.row_off + window.height < height else np.inf
+        triangles = triangles[(col >= col0) & (col < col1) & (row >= row0) & (row < row1)]
+
+        used, triangles = np.unique(triangles, return_inverse=True)
+        keys = np.full(len(used), -1, dtype=np.int64)
+        return keys, vertices[used], triangles.reshape((-1, 3))
+
+    @staticmethod
+    def fromArrays(vertices, triangles, world_origin, origin_height) -> 'TiffMesh':
+        """
+        Creates a mesh from vertex and triangle arrays, computing its vertex normals.
+
+        Args:
+        vertices (np.ndarray): A (N, 3) array of vertex positions. It is used without copying.
+        triangles (np.ndarray): A (M, 3) array of counter-clockwise vertex indices.
+        world_origin (Coordinate): The real-world 2d coordinate of the origin point.
+        origin_height (float): The real-world height of the origin point.
+
+        Returns:
+        TiffMesh: The created mesh.
+        """
+        triangles = np.ascontiguousarray(triangles, dtype=np.int32)
+        arrays = {"vertices": vertices, "triangles": triangles,
+                  "vertex_normals": TiffMesh.vertexNormals(vertices, triangles)}
+        return TiffMesh._from_arrays(arrays, world_origin, origin_height)
+
+    @staticmethod
+    def vertexNormals(vertices, triangles) -> np.ndarray:
+        """
+        Computes the normals of the vertices of a mesh.
+
+        Args:
+        vertices (np.ndarray): A (N, 3) array of vertex positions.
+        triangles (np.ndarray): A (M, 3) array of counter-clockwise vertex indices.
+
+        Returns:
+        np.ndarray: A (N, 3) array of unit normals, the area weighted mean of the normals of the
+        adjacent triangles. Vertices without triangles get a zero normal.
+        """
+        a, b, c = (vertices[triangles[:, i]] for i in range(3))
+        faces = np.cross(b - a, c - a)
+
+        normals = np.empty((len(vertices), 3))
+        for axis in range(3):
+            normals[:, axis] = sum(np.bincount(triangles[:, i], weights=faces[:, axis], minlength=len(vertices))
+                                   for i in range(3))
+        length = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, length, out=normals, where=length > 0)
+        return normals
+
+    @staticmethod
+    def gridTriangles(valid) -> np.ndarray:
+        """
+        Computes the triangles of a regular grid, two per quad of neighbouring cells.
+
+        Args:
+        valid (np.ndarray): A (rows, cols) boolean mask of the cells that hold a vertex.
+
+        Returns:
+        np.ndarray: A (M, 3) array of counter-clockwise (seen from above) vertex indices. Vertices
+        are numbered in row-major order over the valid cells only. Triangles touching an invalid
+        cell are skipped.
+        """
+
+        index = np.full(valid.shape, -1, dtype=np.int32)
+        index[valid] = np.arange(np.count_nonzero(valid), dtype=np.int32)
+
+        # Corners of every quad: a-b on the upper row, c-d on the lower row
+        a, b = index[:-1, :-1], index[:-1, 1:]
+        c, d = index[1:, :-1], index[1:, 1:]
+
+        triangles = np.concatenate((np.stack((a, b, c), axis=-1).reshape((-1, 3)),
+                                    np.stack((b, d, c), axis=-1).reshape((-1, 3))))
+        return triangles[(triangles >= 0).all(axis=1)]
+
     @staticmethod
     def fromTiffPc(tiff_pc) -> 'TiffMesh':
 
         # Run Poisson surface reconstruction    
-        mesh, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(tiff_pc.data, depth=9)
+        with Instrumentation.span("mesh.poisson", points=len(tiff_pc.data.points)) as span:
+            mesh, _ = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(tiff_pc.data, depth=9)
+            span["vertices"], span["triangles"] = len(mesh.vertices), len(mesh.triangles)
 
         return TiffMesh(mesh, tiff_pc.world_origin,
                       tiff_pc.origin_height)
@@ -40,15 +419,56 @@ class TiffMesh(TiffSolid):
         self.world_origin = world_origin
         self.origin_height = origin_height
 
-    
+    @staticmethod
+    def _legacy_arrays(data) -> dict:
+        """
+        Provides the geometry of an Open3D mesh as named NumPy arrays.
+
+        Returns:
+        dict: Views of the vertices, triangles and vertex normals.
+        """
+        arrays = {"vertices": np.asarray(data.vertices),
+                  "triangles": np.asarray(data.triangles)}
+        if data.has_vertex_normals():
+            arrays["vertex_normals"] = np.asarray(data.vertex_normals)
+        return arrays
+
+    @staticmethod
+    def _to_legacy(arrays) -> o3d.geometry.TriangleMesh:
+        """
+        Creates an Open3D mesh of named NumPy geometry arrays.
+
+        Returns:
+        o3d.geometry.TriangleMesh: The mesh, holding a copy of the arrays.
+        """
+        mesh = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(arrays["vertices"]),
+                                         o3d.utility.Vector3iVector(arrays["triangles"]))
+        if "vertex_normals" in arrays:
+            mesh.vertex_normals = o3d.utility.Vector3dVector(arrays["vertex_normals"])
+        return mesh
+
     def save(self, path: str) -> None:
         """
         Saves the mesh representation to a specified path.
 
         Args:
         path (str): The path where the mesh representation will be saved.
+
+        Note:
+        Meshes held as arrays are written through Open3D tensors sharing their memory.
         """
-        o3d.io.write_triangle_mesh(path, self.data)
+        arrays = self._get_arrays()
+        with Instrumentation.span("mesh.save", path=path, vertices=len(arrays["vertices"]),
+                                  triangles=len(arrays["triangles"])):
+            if self._arrays is not None:
+                mesh = o3d.t.geometry.TriangleMesh()
+                mesh.vertex.positions = TiffSolid._tensor(arrays["vertices"])
+                mesh.triangle.indices = TiffSolid._tensor(arrays["triangles"])
+                if "vertex_normals" in arrays:
+                    mesh.vertex.normals = TiffSolid._tensor(arrays["vertex_normals"])
+                o3d.t.io.write_triangle_mesh(path, mesh)
+            else:
+                o3d.io.write_triangle_mesh(path, self.data)
     
     
     def union(self, other: TiffSolid) -> TiffSolid:
@@ -61,16 +481,11 @@ class TiffMesh(TiffSolid):
         Returns:
         TiffSolid: The result of merging the solids.
         """
-        # Assert matching origin coordinate projection
-        same_proj = self.world_origin.proj_string == other.world_origin.proj_string
-        assert same_proj, "TiffSolids from different coordinate systems can't be combined"
-
-        # Get offset of TiffSolids
-        offset = other.world_origin.to_numpy() - self.world_origin.to_numpy()
-        offset_height = other.origin_height - self.origin_height
-
-        # Apply offset to other tile
-        other.translate((offset[0, 0], offset_height ,offset[1, 0]))
+        vertices = len(self._stored_arrays()["vertices"]) + len(other._stored_arrays()["vertices"])
+        with Instrumentation.span("solid.union", vertices=vertices):
+            # Bring other tile into the coordinate system of this tile and apply its offset
+            other.reproject(self.world_origin.proj_string)
+            other.translate(self._offset_to(other.world_origin, other.origin_height))
 
-        # Merge geometries
-        self.data += other.data
\ No newline at end of file
+            # Merge geometries
+            self._append(other)
\ No newline at end of file
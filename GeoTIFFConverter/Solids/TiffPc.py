@@ -2,16 +2,26 @@
 # Created: November 2023
 
 from .TiffSolid import TiffSolid
+from .PointCloudWriter import PointCloudWriter
+from ..Coordinate import Coordinate
+from ..Instrumentation import Instrumentation
 import open3d as o3d
 import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
 
 class TiffPc(TiffSolid):
     """
     A class representing point clouds of tiff data, implementing the TiffSolid interface.
     """
 
+    _position_keys = ("points",)
+    _normal_keys = ("normals",)
+
     @staticmethod
-    def fromTiffFile(tiff, normal_plane_orient = False, downsample_voxel_size = 0) -> 'TiffPc':
+    def fromTiffFile(tiff, normal_plane_orient = False, downsample_voxel_size = 0, window_size = None,
+                     dtype = np.float64, resolution = None, normal_mode = "knn") -> 'TiffPc':
         """
         Generates a point cloud representation from a TiffFile object.
 
@@ -22,6 +32,17 @@ class TiffPc(TiffSolid):
         Defaults to False
         downsample_voxel_size (int): Strength of the voxel downsampling
         for the points. Defaults to 0
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFile. If none is given, the native block
+        layout of the file is used. Defaults to None
+        dtype (np.dtype, optional): The floating point type of the generated points. Defaults to np.float64
+        resolution (float, optional): The target ground resolution of the points. The raster is read
+        decimated, so a coarse point cloud only reads and builds the points it needs. If none is given,
+        the native resolution is used. Defaults to None
+        normal_mode (str, optional): How the point normals are computed. Defaults to "knn".
+        - "knn": Estimation from the nearest neighbours of every point, oriented as given by normal_plane_orient.
+        - "gradient": Analytic normals from the elevation gradient of the raster. They point upwards
+          by construction, so neither the neighbour search nor the orientation step is needed.
 
         Returns:
         TiffPc: A point cloud representation generated from the provided TiffFile.
@@ -29,45 +50,259 @@ class TiffPc(TiffSolid):
         Note:
         This function extracts elevation data from the TiffFile and generates a point cloud
         by considering the data structure and geospatial information from the TiffFile's metadata.
+        The elevation data is read window by window, so only the point buffer is kept in full.
         """
 
-        # We assume that the elevation is encoded in the first band
-        data = tiff.to_numpy()[0]
+        points = TiffPc.pointsFromTiffFile(tiff, window_size, dtype, resolution)
+        valid = TiffPc.validMask(points, tiff.nodata)
+
+        normals = None
+        if normal_mode == "gradient":
+            with Instrumentation.span("pc.normals", mode="gradient", points=len(points)):
+                normals = TiffPc.gradientNormals(points, valid, tiff.get_shape(resolution),
+                                                 tiff.get_local_transform(resolution))
+        else:
+            assert normal_mode == "knn", f"Unknown normal mode {normal_mode}"
+
+        # Drop nodata cells
+        if not valid.all():
+            points = points[valid]
+            normals = normals[valid] if normals is not None else None
 
         # Normalize height
-        origin_height = data.min()
-        data -= origin_height
+        origin_height = points[:, 1].min()
+        points[:, 1] -= origin_height
+
+        # Retrieve the x,z coordinate of the tiff
+        origin_coord = tiff.get_bounding_coordinates()[0]
+
+        return TiffPc(points, origin_coord,
+                      origin_height, normal_plane_orient=normal_plane_orient,
+                      downsample_voxel_size = downsample_voxel_size, normals = normals)
+
+    @staticmethod
+    def pointsFromTiffFile(tiff, window_size = None, dtype = np.float64, resolution = None) -> np.ndarray:
+        """
+        Generates the points of every pixel of a TiffFile.
+
+        Args:
+        tiff (TiffFile): The TiffFile object containing elevation data.
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFile. Defaults to None
+        dtype (np.dtype, optional): The floating point type of the generated points. Defaults to np.float64
+        resolution (float, optional): The target ground resolution of the points, see
+        TiffFile.get_decimation. Defaults to None
+
+        Returns:
+        np.ndarray: A (height * width, 3) array with the x, elevation, z coordinates of every pixel
+        in row-major raster order, where the shape is given by TiffFile.get_shape.
+        """
+
+        # We assume that the elevation is encoded in the first band
+        height, width = tiff.get_shape(resolution)
+        with Instrumentation.span("pc.points", path=tiff.path, points=height * width):
+            return TiffPc.pointsFromWindows(tiff.iter_windows(band=1, window_size=window_size, resolution=resolution),
+                                            height, width, tiff.get_local_transform(resolution), dtype)
+
+    @staticmethod
+    def gradientNormals(points, valid, shape, transform, chunk_rows = 1024) -> np.ndarray:
+        """
+        Computes the normals of a raster point grid from the elevation gradient.
+
+        Args:
+        points (np.ndarray): A (rows * cols, 3) array of points in row-major raster order,
+        as generated by pointsFromTiffFile.
+        valid (np.ndarray): A boolean mask of the points holding valid elevation data.
+        shape (tuple): The (rows, cols) shape of the grid.
+        transform (Affine): The transformation from pixel positions to local coordinates.
+        chunk_rows (int, optional): The number of rows processed at once. Defaults to 1024
+
+        Returns:
+        np.ndarray: A (rows * cols, 3) array of unit normals with a positive y component.
+        Normals next to nodata cells point straight up.
+        """
+
+        rows, cols = shape
+        heights = points[:, 1].reshape(shape)
+        valid = valid.reshape(shape)
+        normals = np.empty_like(points)
+        grid = normals.reshape((rows, cols, 3))
+
+        # Chain rule from pixel (col, row) derivatives to local (x, z) derivatives
+        a, b, _, d, e, _ = transform[:6]
+        inv = np.linalg.inv(np.array([[a, b], [d, e]]))
+
+        for r0 in range(0, rows, chunk_rows):
+            r1 = min(r0 + chunk_rows, rows)
+
+            # Read one row of context above and below, so the chunks match a gradient over the whole grid
+            h0, h1 = max(r0 - 1, 0), min(r1 + 1, rows)
+            block = np.where(valid[h0:h1], heights[h0:h1], np.nan).astype(np.float64)
+            d_row = np.gradient(block, axis=0) if h1 - h0 > 1 else np.zeros_like(block)
+            d_col = np.gradient(block, axis=1) if cols > 1 else np.zeros_like(block)
+            d_row, d_col = d_row[r0 - h0:r1 - h0], d_col[r0 - h0:r1 - h0]
+
+            d_x = d_col * inv[0, 0] + d_row * inv[1, 0]
+            d_z = d_col * inv[0, 1] + d_row * inv[1, 1]
+            norm = np.sqrt(d_x ** 2 + d_z ** 2 + 1)
+
+            out = grid[r0:r1]
+            out[:, :, 0] = -d_x / norm
+            out[:, :, 1] = 1 / norm
+            out[:, :, 2] = -d_z / norm
+
+            # Fall back to an upwards normal next to nodata cells
+            undefined = np.isnan(norm)
+            out[undefined] = (0, 1, 0)
+
+        return normals
+
+    @staticmethod
+    def validMask(points, nodata) -> np.ndarray:
+        """
+        Computes which points hold valid elevation data.
+
+        Args:
+        points (np.ndarray): A (N, 3) array of points as generated by pointsFromTiffFile.
+        nodata (float): The nodata value of the TiffFile, or None.
+
+        Returns:
+        np.ndarray: A boolean mask of the points with a finite elevation that is not nodata.
+        """
+
+        valid = TiffPc.validHeights(points[:, 1], nodata)
+        assert valid.any(), "TiffFile does not contain any valid elevation data"
+        return valid
+
+    @staticmethod
+    def validHeights(heights, nodata) -> np.ndarray:
+        """
+        Computes which elevations are valid, allowing for none to be.
+
+        Args:
+        heights (np.ndarray): An array of elevations of any shape.
+        nodata (float): The nodata value of the TiffFile, or None.
+
+        Returns:
+        np.ndarray: A boolean mask of the same shape, true for finite elevations that are not nodata.
+        """
+
+        valid = np.isfinite(heights)
+        if nodata is not None:
+            valid &= heights != nodata
+        return valid
+
+    @staticmethod
+    def pointsFromWindows(windows, height, width, transform, dtype = np.float64) -> np.ndarray:
+        """
+        Collects streamed elevation windows into a single point buffer.
+
+        Args:
+        windows (iterable): (rasterio.windows.Window, np.array) pairs as produced by
+        TiffFile.iter_windows.
+        height (int): The number of rows of the underlying raster.
+        width (int): The number of columns of the underlying raster.
+        transform (Affine): The transformation from pixel (col, row) positions to local
+        coordinates, as given by TiffFile.get_local_transform.
+        dtype (np.dtype, optional): The floating point type of the generated points. Defaults to np.float64
+
+        Returns:
+        np.ndarray: A (height * width, 3) array with the x, elevation, z coordinates of every pixel
+        in row-major raster order.
+        """
+
+        points = np.empty((height * width, 3), dtype=dtype)
+        grid = points.reshape((height, width, 3))
+        for window, data in windows:
+            TiffPc._window_points(window, data, transform, grid[window.toslices()])
+
+        return points
+
+    @staticmethod
+    def _window_points(window, data, transform, out) -> None:
+        """
+        Writes the points of a single elevation window into a preallocated buffer.
+
+        Args:
+        window (rasterio.windows.Window): The window the data was read from.
+        data (np.array): The elevation data of the window.
+        transform (Affine): The transformation from pixel positions to local coordinates.
+        out (np.ndarray): A (rows, cols, 3) buffer the points are written to.
+        """
+
+        rows, cols = data.shape
+
+        # Points are placed at the pixel centers
+        col = np.arange(window.col_off, window.col_off + cols) + 0.5
+        row = np.arange(window.row_off, window.row_off + rows) + 0.5
 
-        # Create point cloud
         # NOTE: The renderer uses OpenGL, which is a right-handed system.
         # thus -> +x-axis (right), +y-axis (up), +z-axis(backwards)
+        # Broadcast row and column terms straight into the buffer, without full-size temporaries
+        a, b, c, d, e, f = transform[:6]
+        np.add((a * col)[np.newaxis, :], (b * row + c)[:, np.newaxis], out=out[:, :, 0])
+        out[:, :, 1] = data
+        np.add((d * col)[np.newaxis, :], (e * row + f)[:, np.newaxis], out=out[:, :, 2])
+
+    @staticmethod
+    def exportStream(tiffs, path, window_size = None, resolution = None, dtype = np.float32) -> Coordinate:
+        """
+        Exports the point cloud of many TiffFiles to a binary PLY or PCD file, window by window.
+
+        Args:
+        tiffs (list): The TiffFile objects containing elevation data.
+        path (str): The path of the point cloud. Its extension (.ply or .pcd) selects the format.
+        window_size (tuple, optional): The (rows, cols) size of the windows in which the
+        elevation data is streamed from the TiffFiles. Defaults to None
+        resolution (float, optional): The target ground resolution of the points, see
+        TiffFile.get_decimation. Defaults to None
+        dtype (np.dtype, optional): The floating point type the points are stored in. Defaults to np.float32
+
+        Returns:
+        Coordinate: The real-world origin of the exported points, the bottom-left corner of the first TiffFile.
 
-        x = np.linspace(0, ((data.shape[0] - 1) / 2), num = data.shape[0]).reshape((1, -1))
+        Note:
+        Only a single window of points is held in memory at a time, so arbitrarily large collections
+        can be exported. Positions are given relative to the returned origin, in its coordinate system,
+        and heights are absolute elevations, as the lowest elevation is not known up front. Nodata cells
+        are skipped. No normals are written, as estimating them requires the whole point cloud.
+        """
 
-        # Shift 0.25 to the right to account for decentricity of datapoints
-        # TODO: Make shift amount dependant on tiff metadata
-        x += 0.25
-        X = np.matmul(np.ones((x.shape[1], 1)), x)
+        assert len(tiffs) > 0, "At least one TiffFile is required"
+        world_origin = tiffs[0].get_bounding_coordinates()[0]
 
-        z = np.flip(np.linspace(0, ((data.shape[1] - 1) / 2), num = data.shape[1])).reshape((-1, 1))
+        with Instrumentation.span("pc.export", path=path, tiles=len(tiffs)) as span, \
+                PointCloudWriter(path, dtype=dtype) as writer:
+            for tiff in tiffs:
+                origin = tiff.get_bounding_coordinates()[0]
+                transformer = None
+                if origin.proj_string != world_origin.proj_string:
+                    transformer = Coordinate.get_transformer(origin.proj_string, world_origin.proj_string,
+                                                             always_xy=True)
+                transform = tiff.get_local_transform(resolution)
 
-        # Shift 0.25 down to account for decentricity of datapoints
-        # TODO: Make shift amount dependant on tiff metadata
-        z += 0.25
-        Z = np.matmul(z, np.ones((1, z.shape[0])))
+                for window, data in tiff.iter_windows(band=1, window_size=window_size, resolution=resolution):
+                    grid = np.empty(data.shape + (3,), dtype=np.float64)
+                    TiffPc._window_points(window, data, transform, grid)
+                    points = grid.reshape((-1, 3))
 
-        XYZ = np.dstack((X, data, Z))
+                    points = points[TiffPc.validHeights(points[:, 1], tiff.nodata)]
 
-        # Retrieve the x,z coordinate of the tiff
-        origin_coord = tiff.get_bounding_coordinates()[0]
+                    # Place the points relative to the common origin
+                    if transformer is None:
+                        points[:, 0] += origin.x - world_origin.x
+                        points[:, 2] += origin.y - world_origin.y
+                    else:
+                        x, y = transformer.transform(points[:, 0] + origin.x, points[:, 2] + origin.y)
+                        points[:, 0] = x - world_origin.x
+                        points[:, 2] = y - world_origin.y
+                    writer.write(points)
+            span["points"] = writer.count
 
-       
-        return TiffPc(XYZ.reshape((-1, 3)), origin_coord,
-                      origin_height, normal_plane_orient=normal_plane_orient,
-                      downsample_voxel_size = downsample_voxel_size)
+        return world_origin
 
-    
-    def __init__(self, point_coords, world_origin, origin_height, normal_plane_orient = False, downsample_voxel_size = 0) -> None:
+    def __init__(self, point_coords, world_origin, origin_height, normal_plane_orient = False, downsample_voxel_size = 0,
+                 normals = None) -> None:
         """
         Initializes a TiffPc object.
 
@@ -81,41 +316,97 @@ class TiffPc(TiffSolid):
         Defaults to False
         downsample_voxel_size (int, optional): Strength of the voxel downsampling
         for the points. Defaults to 0
+        normals (np.ndarray, optional): Precomputed normals of the points. If given, no
+        normal estimation or orientation is run. Defaults to None
+
+        Note:
+        With precomputed normals and without downsampling, the point cloud keeps the given
+        arrays without copying them into Open3D.
         """
+        self.world_origin = world_origin
+        self.origin_height = origin_height
+        if normals is not None and downsample_voxel_size <= 0:
+            self._set_arrays({"points": point_coords, "normals": normals})
+            return
+
         # Pass the point_coords to Open3D.o3d.geometry.PointCloud
         pcd = o3d.geometry.PointCloud()
         pcd.points = o3d.utility.Vector3dVector(point_coords)
+        if normals is not None:
+            pcd.normals = o3d.utility.Vector3dVector(normals)
 
         # Downsample if needed
         if downsample_voxel_size > 0:
-            pcd = pcd.voxel_down_sample(voxel_size=downsample_voxel_size)
-            
-
-        # TODO: Evaluate wether the trivial approach is sufficient for mesh creation
-        pcd.estimate_normals()
-        if normal_plane_orient:
-            try:
-                pcd.orient_normals_consistent_tangent_plane(100)
-            except:
-                print("\033[93m[Warning] Normal orientation failed.",
-                    "SolidPc can still be used, but might have wrongly aligned point normals!\033[0m")
-        else:
-            pcd.orient_normals_to_align_with_direction((0,1,0))
+            with Instrumentation.span("pc.downsample", points=len(pcd.points)) as span:
+                pcd = pcd.voxel_down_sample(voxel_size=downsample_voxel_size)
+                if normals is not None:
+                    pcd.normalize_normals()
+                span["downsampled_points"] = len(pcd.points)
+
+        if normals is None:
+            # TODO: Evaluate wether the trivial approach is sufficient for mesh creation
+            with Instrumentation.span("pc.normals", mode="knn", points=len(pcd.points)):
+                pcd.estimate_normals()
+            with Instrumentation.span("pc.orient", tangent_plane=normal_plane_orient, points=len(pcd.points)):
+                if normal_plane_orient:
+                    try:
+                        pcd.orient_normals_consistent_tangent_plane(100)
+                    except Exception:
+                        logger.warning("Normal orientation failed. "
+                                       "TiffPc can still be used, but might have wrongly aligned point normals")
+                else:
+                    pcd.orient_normals_to_align_with_direction((0,1,0))
 
-        
-    
         self.data = pcd
-        self.world_origin = world_origin
-        self.origin_height = origin_height
     
+    @staticmethod
+    def _legacy_arrays(data) -> dict:
+        """
+        Provides the geometry of an Open3D point cloud as named NumPy arrays.
+
+        Returns:
+        dict: Views of the points and normals.
+        """
+        arrays = {"points": np.asarray(data.points)}
+        if data.has_normals():
+            arrays["normals"] = np.asarray(data.normals)
+        return arrays
+
+    @staticmethod
+    def _to_legacy(arrays) -> o3d.geometry.PointCloud:
+        """
+        Creates an Open3D point cloud of named NumPy geometry arrays.
+
+        Returns:
+        o3d.geometry.PointCloud: The point cloud, holding a copy of the arrays.
+        """
+        pcd = o3d.geometry.PointCloud()
+        pcd.points = o3d.utility.Vector3dVector(arrays["points"])
+        if "normals" in arrays:
+            pcd.normals = o3d.utility.Vector3dVector(arrays["normals"])
+        return pcd
+
     def save(self, path: str) -> None:
         """
         Saves the point cloud representation to a specified path.
 
         Args:
         path (str): The path where the point cloud representation will be saved.
+
+        Note:
+        PLY and PCD files are written straight from the arrays of the point cloud, through
+        Open3D tensors sharing their memory.
         """
-        o3d.io.write_point_cloud(path, self.data)
+        arrays = self._get_arrays()
+        with Instrumentation.span("pc.save", path=path, points=len(arrays["points"])):
+            if self._arrays is not None and path.lower().endswith((".ply", ".pcd")):
+                pcd = o3d.t.geometry.PointCloud()
+                pcd.point.positions = TiffSolid._tensor(arrays["points"])
+                if "normals" in arrays:
+                    pcd.point.normals = TiffSolid._tensor(arrays["normals"])
+                o3d.t.io.write_point_cloud(path, pcd)
+            else:
+                o3d.io.write_point_cloud(path, self.data)
     
     def union(self, other: TiffSolid) -> TiffSolid:
         """
@@ -128,16 +419,11 @@ class TiffPc(TiffSolid):
         TiffSolid: The result of merging the solids.
         """
         
-        # Assert matching origin coordinate projection
-        same_proj = self.world_origin.proj_string == other.world_origin.proj_string
-        assert same_proj, "TiffSolids from different coordinate systems can't be combined"
-
-        # Get offset of TiffSolids
-        offset = other.world_origin.to_numpy() - self.world_origin.to_numpy()
-        offset_height = other.origin_height - self.origin_height
-
-        # Apply offset to other tile
-        other.translate((offset[0, 0], offset_height ,offset[1, 0]))
+        points = len(self._stored_arrays()["points"]) + len(other._stored_arrays()["points"])
+        with Instrumentation.span("solid.union", points=points):
+            # Bring other tile into the coordinate system of this tile and apply its offset
+            other.reproject(self.world_origin.proj_string)
+            other.translate(self._offset_to(other.world_origin, other.origin_height))
 
-        # Merge geometries
-        self.data += other.data
\ No newline at end of file
+            # Merge geometries
+            self._append(other)
\ No newline at end of file
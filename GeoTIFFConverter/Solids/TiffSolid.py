@@ -4,6 +4,9 @@
 import numpy as np
 import open3d as o3d
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from ..Coordinate import Coordinate
+from ..Instrumentation import Instrumentation
 
 class TiffSolid(ABC):
     """
@@ -11,9 +14,272 @@ class TiffSolid(ABC):
 
     This abstract class defines solid representations of tiff data,
     intended to be implemented by subclasses for different types of solids.
+
+    The geometry is held either as named NumPy arrays or as a legacy Open3D geometry. Solids
+    built from arrays keep them as they are, without copying, and create the Open3D geometry
+    only when it is accessed through data, e.g. by the renderer. From then on, the Open3D
+    geometry holds the geometry and the arrays are views of it. Arrays the solid did not
+    allocate itself, e.g. those of the caller or memory-mapped ones, are never modified; the
+    first transformation applied to them writes into new arrays.
+
+    Transformations are not applied right away but accumulated into a single pending 4x4
+    matrix. It is applied in one pass when the geometry is accessed, e.g. to save, render or
+    merge the solid.
     """
 
-    data = None # Contains the solid specific data
+    _data = None # The legacy Open3D geometry, or None while the arrays hold the geometry
+    _arrays = None # The named geometry arrays, or None while the Open3D geometry holds the geometry
+    _pending = None # The 4x4 transformation not yet applied to the geometry, or None
+    _owned = False # Whether the solid allocated its arrays itself, so they may be transformed in place
+    _centroid = None # The mean of the stored positions, without the pending transformation, or None
+    _position_keys = () # Names of the geometry arrays holding positions
+    _normal_keys = () # Names of the geometry arrays holding unit normals
+    _index_keys = {} # Names of the geometry arrays holding indices, mapped to the array they index
+
+    @property
+    def data(self):
+        """
+        The legacy Open3D geometry of the solid, created from its arrays on first access.
+
+        Note:
+        Pending transformations are applied before the geometry is returned. Assigning a geometry
+        replaces the geometry of the solid together with the transformations still pending on the
+        old geometry, so the assigned geometry is taken as it is.
+        """
+        self._flush()
+        if self._data is None and self._arrays is not None:
+            self._data = self._to_legacy(self._arrays)
+            self._arrays = None
+        # The returned geometry may be modified in place
+        self._centroid = None
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+        self._arrays = None
+        self._pending = None
+        self._centroid = None
+
+    def _get_arrays(self) -> dict:
+        """
+        Provides the geometry of the solid as named NumPy arrays, applying pending transformations.
+
+        Returns:
+        dict: The geometry arrays of the solid, or views of its Open3D geometry.
+        """
+        self._flush()
+        return self._stored_arrays()
+
+    def _stored_arrays(self) -> dict:
+        """
+        Provides the stored geometry arrays, without the pending transformation.
+        """
+        if self._arrays is not None:
+            return self._arrays
+        return self._legacy_arrays(self._data)
+
+    def _set_arrays(self, arrays, owned=False) -> None:
+        """
+        Replaces the geometry of the solid with named NumPy arrays, which are used without copying.
+        Unless the solid owns them, they are not modified.
+        """
+        self._arrays = arrays
+        self._owned = owned
+        self._data = None
+        self._pending = None
+        self._centroid = None
+
+    @classmethod
+    def _from_arrays(cls, arrays, world_origin, origin_height, owned=False) -> 'TiffSolid':
+        """
+        Creates a solid from named NumPy geometry arrays, as provided by _get_arrays.
+
+        Args:
+        arrays (dict): The geometry arrays of the solid. They are used without copying.
+        world_origin (Coordinate): The real-world 2d coordinate of the origin point.
+        origin_height (float): The real-world height of the origin point.
+        owned (bool, optional): Wether the arrays are allocated for the solid alone, so they may be
+        modified in place. Otherwise they are left unchanged. Defaults to False.
+
+        Returns:
+        TiffSolid: The created solid.
+        """
+        solid = cls.__new__(cls)
+        solid._set_arrays(arrays, owned)
+        solid.world_origin = world_origin
+        solid.origin_height = origin_height
+        return solid
+
+    def _append(self, other) -> None:
+        """
+        Appends the geometry of another solid, which must already be placed relative to the origin of this solid.
+
+        Args:
+        other (TiffSolid): The other solid. Arrays only one of the solids holds are dropped.
+
+        Note:
+        Pending transformations of both solids are applied while their geometry is copied into
+        the merged arrays. The other solid is not modified.
+        """
+        a, b = self._stored_arrays(), other._stored_arrays()
+        merged = {}
+        for key in a:
+            if key not in b:
+                continue
+            out = np.empty((len(a[key]) + len(b[key]),) + a[key].shape[1:], dtype=a[key].dtype)
+            self._transform_array(key, a[key], self._pending, out[:len(a[key])])
+            if key in self._index_keys:
+                np.add(b[key], len(a[self._index_keys[key]]), out=out[len(a[key]):])
+            else:
+                self._transform_array(key, b[key], other._pending, out[len(a[key]):])
+            merged[key] = out
+        self._set_arrays(merged, owned=True)
+
+    @staticmethod
+    def _is_uniform_scale(A) -> bool:
+        """
+        Whether a 3x3 matrix is a positive multiple of the identity.
+        """
+        scale = np.cbrt(np.linalg.det(A))
+        return scale > 0 and np.allclose(A, scale * np.eye(3))
+
+    @staticmethod
+    def _tensor(array):
+        """
+        Wraps a NumPy array in an Open3D tensor sharing its memory.
+        """
+        return o3d.core.Tensor.from_numpy(np.ascontiguousarray(array))
+
+    @classmethod
+    def union_many(cls, solids, workers=None) -> 'TiffSolid':
+        """
+        Merges many solids into a new solid in a single pass.
+
+        Args:
+        solids (list): The solids to merge. The first solid defines the origin of the result. Arrays only
+        some of the solids hold, e.g. normals, are dropped.
+        workers (int, optional): The number of threads filling the merged geometry. Defaults to None,
+        which lets the executor choose.
+
+        Returns:
+        TiffSolid: A new solid containing the geometry of all solids.
+
+        Note:
+        The offsets of all solids are computed up front and the merged geometry is allocated once,
+        so merging N solids costs a single concatenation instead of N growing ones. Solids from other
+        coordinate systems are reprojected into the coordinate system of the first solid. Pending
+        transformations are applied while the geometry is copied. The given solids are not modified.
+        """
+
+        assert len(solids) > 0, "At least one solid is required"
+        base = solids[0]
+
+        with Instrumentation.span("solid.union", solids=len(solids)) as span:
+            # Bring all solids into the coordinate system of the base solid
+            target = base.world_origin.proj_string
+            aligned = [(s._stored_arrays(), s.world_origin) if s.world_origin.proj_string == target
+                       else s._reprojected_arrays(target) for s in solids]
+            parts = [arrays for arrays, _ in aligned]
+
+            # Combine the pending transformation of every solid with its offset
+            transforms = []
+            for (_, origin), s in zip(aligned, solids):
+                T = np.eye(4)
+                T[:3, 3] = base._offset_to(origin, s.origin_height)
+                pending = s._pending if s.world_origin.proj_string == target else None
+                transforms.append(T @ pending if pending is not None else T)
+
+            # Compute the position of every solid within the merged arrays
+            # Arrays only some of the solids hold, e.g. normals, are dropped
+            keys = [key for key in parts[0] if all(key in p for p in parts)]
+            starts = {key: np.cumsum([0] + [len(p[key]) for p in parts]) for key in keys}
+            merged = {key: np.empty((starts[key][-1],) + parts[0][key].shape[1:], dtype=parts[0][key].dtype)
+                      for key in keys}
+
+            def fill(i):
+                for key in keys:
+                    array = parts[i][key]
+                    out = merged[key][starts[key][i]:starts[key][i + 1]]
+                    if key in cls._index_keys:
+                        np.add(array, starts[cls._index_keys[key]][i], out=out)
+                    else:
+                        base._transform_array(key, array, transforms[i], out)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(fill, range(len(solids))))
+            span["points"] = len(merged[cls._position_keys[0]])
+
+        return cls._from_arrays(merged, base.world_origin, base.origin_height, owned=True)
+
+    def _offset_to(self, world_origin, origin_height) -> np.ndarray:
+        """
+        Computes the translation that places geometry of another origin relative to the origin of this solid.
+
+        Args:
+        world_origin (Coordinate): The real-world 2d coordinate of the other origin, in the coordinate
+        system of this solid.
+        origin_height (float): The real-world height of the other origin.
+
+        Returns:
+        np.ndarray: The (x, y, z) translation vector.
+        """
+
+        offset = world_origin.to_numpy() - self.world_origin.to_numpy()
+        offset_height = origin_height - self.origin_height
+        return np.array([offset[0, 0], offset_height, offset[1, 0]])
+
+    def _reprojected_arrays(self, target_proj):
+        """
+        Computes the geometry arrays of the solid in another coordinate system.
+
+        Args:
+        target_proj (str or CRS): The target projection.
+
+        Returns:
+        tuple: A (arrays, world_origin) pair with the geometry arrays, as provided by _get_arrays, and
+        the real-world origin they are relative to in the target projection. The arrays of the solid
+        are returned as they are if it already uses the target projection.
+        """
+
+        arrays = self._get_arrays()
+        if self.world_origin.proj_string == target_proj:
+            return arrays, self.world_origin
+
+        # World positions are (origin.x + x, origin.y + z), always given in easting, northing order
+        transformer = Coordinate.get_transformer(self.world_origin.proj_string, target_proj, always_xy=True)
+        ox, oy = self.world_origin.x, self.world_origin.y
+        nx, ny = transformer.transform(ox, oy)
+
+        arrays = dict(arrays)
+        for key in self._position_keys:
+            positions = arrays[key]
+            x, y = transformer.transform(positions[:, 0] + ox, positions[:, 2] + oy)
+            out = positions.copy()
+            out[:, 0] = x - nx
+            out[:, 2] = y - ny
+            arrays[key] = out
+
+        return arrays, Coordinate((nx, ny), target_proj)
+
+    def reproject(self, target_proj) -> None:
+        """
+        Reprojects the solid into another coordinate system.
+
+        Args:
+        target_proj (str or CRS): The target projection (e.g., 'epsg:32632').
+
+        Note:
+        All positions are transformed in a single batch. The world origin is moved to the
+        reprojected origin, so local coordinates stay small. Heights are kept as they are, and
+        normals are not rotated by the (typically sub-degree) grid convergence.
+        """
+
+        if self.world_origin.proj_string == target_proj:
+            return
+        arrays, world_origin = self._reprojected_arrays(target_proj)
+        self._set_arrays(arrays)
+        self.world_origin = world_origin
 
     @staticmethod
     def render_multiple(geometries, render_options=None) -> None:
@@ -63,7 +329,9 @@ class TiffSolid(ABC):
         Args:
         translation_vec (np.ndarray): The translation vector to move the solid.
         """
-        self.data.translate(translation_vec)
+        T = np.eye(4)
+        T[:3, 3] = translation_vec
+        self._apply_matrix(T)
     
     def scale(self, scale_factor: float) -> None:
         """
@@ -75,7 +343,8 @@ class TiffSolid(ABC):
         Note: This scale is origin-preserving and might change the
         center of mass
         """
-        self.data.scale(scale_factor, center=(0, 0, 0))
+        T = np.diag([scale_factor, scale_factor, scale_factor, 1.0])
+        self._apply_matrix(T)
 
     def rotate(self, rotation_vec: np.ndarray) -> None:
         """
@@ -83,9 +352,19 @@ class TiffSolid(ABC):
 
         Args:
         rotation_vec (np.ndarray): A 3d vector that encodes rotation in the x,y,z axes.
+
+        Note: The solid is rotated about its center
         """
-        R = self.data.get_rotation_matrix_from_xyz(rotation_vec)
-        self.data.rotate(R)
+        # Rotate about the (transformed) center, as Open3D does
+        if self._centroid is None:
+            self._centroid = self._stored_arrays()[self._position_keys[0]].mean(axis=0)
+        center = self._centroid
+        if self._pending is not None:
+            center = self._pending[:3, :3] @ center + self._pending[:3, 3]
+        T = np.eye(4)
+        T[:3, :3] = o3d.geometry.get_rotation_matrix_from_xyz(rotation_vec)
+        T[:3, 3] = center - T[:3, :3] @ center
+        self._apply_matrix(T)
 
     def transform(self, transf_mat: np.ndarray) -> None:
         """
@@ -94,7 +373,68 @@ class TiffSolid(ABC):
         Args:
         transf_mat (np.ndarray): A 4x4 homogeneous transformation matrix.
         """
-        self.data.transform(transf_mat)
+        self._apply_matrix(np.asarray(transf_mat, dtype=np.float64))
+
+    def _apply_matrix(self, T) -> None:
+        """
+        Adds a 4x4 affine transformation to the pending transformation of the solid.
+
+        Args:
+        T (np.ndarray): The 4x4 homogeneous transformation matrix.
+        """
+        self._pending = T if self._pending is None else T @ self._pending
+
+    def _flush(self) -> None:
+        """
+        Applies the pending transformation to the positions and normals of the solid, in place if
+        the solid owns its arrays and into new arrays otherwise.
+        """
+        if self._pending is None:
+            return
+        T, self._pending = self._pending, None
+        if self._centroid is not None:
+            # The mean of affinely transformed positions is the transformed mean
+            self._centroid = T[:3, :3] @ self._centroid + T[:3, 3]
+        if self._arrays is None:
+            # Open3D transforms normals without normalizing them
+            self._data.transform(T)
+            self._data.normalize_normals()
+            return
+        arrays = self._arrays if self._owned else dict(self._arrays)
+        for key, array in self._arrays.items():
+            if key in self._position_keys or key in self._normal_keys:
+                arrays[key] = array if self._owned else np.empty_like(array)
+                self._transform_array(key, array, T, arrays[key])
+        self._arrays, self._owned = arrays, True
+
+    def _transform_array(self, key, array, T, out) -> None:
+        """
+        Writes a geometry array, transformed by a 4x4 affine transformation, to an output array.
+
+        Args:
+        key (str): The name of the geometry array, which determines how it is transformed.
+        array (np.ndarray): The geometry array.
+        T (np.ndarray): The 4x4 homogeneous transformation matrix, or None for the identity.
+        out (np.ndarray): The output array, which may be the geometry array itself.
+        """
+        if T is None or (key not in self._position_keys and key not in self._normal_keys):
+            if out is not array:
+                out[:] = array
+            return
+
+        A, t = T[:3, :3], T[:3, 3]
+        if key in self._position_keys:
+            if np.array_equal(A, np.eye(3)):
+                np.add(array, t, out=out)
+            else:
+                out[:] = array @ A.T + t
+        elif not TiffSolid._is_uniform_scale(A):
+            out[:] = array @ A.T
+            length = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, length, out=out, where=length > 0)
+        elif out is not array:
+            # Translations and uniform scales keep normals as they are
+            out[:] = array
 
     @abstractmethod
     def union(self, other: 'TiffSolid') -> 'TiffSolid':
@@ -109,6 +449,34 @@ class TiffSolid(ABC):
         """
         pass
 
+    @staticmethod
+    @abstractmethod
+    def _legacy_arrays(data) -> dict:
+        """
+        Provides the geometry of a legacy Open3D geometry as named NumPy arrays.
+
+        Args:
+        data: The Open3D geometry.
+
+        Returns:
+        dict: Views of the geometry arrays.
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def _to_legacy(arrays):
+        """
+        Creates the legacy Open3D geometry of named NumPy geometry arrays.
+
+        Args:
+        arrays (dict): The geometry arrays.
+
+        Returns:
+        The Open3D geometry, holding a copy of the arrays.
+        """
+        pass
+
     @abstractmethod
     def save(self, path: str) -> None:
         """
@@ -1,4 +1,8 @@
 from .TiffMesh import TiffMesh
 from .TiffPc import TiffPc
 from .TiffSolid import TiffSolid
+from .RtinMesher import RtinMesher
+from .PointCloudWriter import PointCloudWriter
+from .SolidCache import SolidCache
+from .MosaicStore import MosaicStore
 from .RenderOptions import RenderOptions
\ No newline at end of file
@@ -0,0 +1,204 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import math
+import numpy as np
+
+class StreamingHistogram:
+    """
+    A mergeable summary of a stream of values: moments, extrema, a histogram and quantiles.
+
+    Values are counted in bins of width 2^exponent, aligned to multiples of the width. Whenever
+    the values span more than max_bins bins, pairs of bins are merged and the width doubles, so
+    the memory stays bounded while the bins always cover every value seen. Summaries of parts
+    of a stream are merged into the summary of the whole stream; the moments are merged exactly
+    and the histogram at the coarser width of both parts. Quantiles are interpolated within the
+    bins, which bounds their error by the bin width.
+    """
+
+    def __init__(self, max_bins=16384, min_exponent=-20):
+        """
+        Initialize an empty StreamingHistogram object.
+
+        Args:
+        max_bins (int, optional): The maximum number of bins. Defaults to 16384.
+        min_exponent (int, optional): The exponent of the finest bin width. Defaults to -20.
+        """
+
+        assert max_bins >= 2, "At least two bins are required"
+        self.max_bins = max_bins
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # The sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+        self.exponent = min_exponent
+        self.start = 0 # The bin index of counts[0], in multiples of the bin width
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, values):
+        """
+        Add values to the summary.
+
+        Args:
+        values (np.ndarray): The values. Non-finite values are ignored.
+
+        Returns:
+        StreamingHistogram: The summary itself.
+        """
+
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+
+        mean = values.mean()
+        self._add_moments(len(values), mean, np.square(values - mean).sum(), values.min(), values.max())
+
+        # Place the values at the bin width the extended range requires
+        exponent = max(self.exponent, self._exponent_for(self.min, self.max))
+        self._insert(np.floor(values * 2.0 ** -exponent).astype(np.int64), None, exponent)
+        return self
+
+    def merge(self, other):
+        """
+        Merge the summary of other values into this one.
+
+        Args:
+        other (StreamingHistogram): The summary of the other values.
+
+        Returns:
+        StreamingHistogram: The summary itself.
+        """
+
+        if other.count == 0:
+            return self
+        self._add_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self._insert(other.start + np.arange(len(other.counts)), other.counts, other.exponent)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count > 0 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def width(self):
+        """
+        The width of the bins.
+        """
+
+        return 2.0 ** self.exponent
+
+    def quantile(self, q):
+        """
+        Estimate quantiles of the values.
+
+        Args:
+        q (float or np.ndarray): The quantiles in [0, 1].
+
+        Returns:
+        float or np.ndarray: The estimates, interpolated linearly within the bins. Their error is
+        at most the bin width.
+        """
+
+        assert self.count > 0, "The summary is empty"
+        q = np.asarray(q, dtype=np.float64)
+        cumulative = np.cumsum(self.counts)
+        rank = q * self.count
+
+        # The bin holding every rank, and the fraction of its values up to the rank
+        i = np.minimum(np.searchsorted(cumulative, rank, side="left"), len(self.counts) - 1)
+        before = np.where(i > 0, cumulative[i - 1], 0)
+        fraction = (rank - before) / np.maximum(self.counts[i], 1)
+
+        estimate = (self.start + i + np.clip(fraction, 0, 1)) * self.width
+        estimate = np.clip(estimate, self.min, self.max)
+        return float(estimate) if estimate.ndim == 0 else estimate
+
+    def histogram(self, bins=None, range=None):
+        """
+        Get the histogram of the values.
+
+        Args:
+        bins (int or np.ndarray, optional): The number of equal bins or the bin edges. If none is
+        given, the bins of the summary are returned. Defaults to None.
+        range (tuple, optional): The (lower, upper) range of equal bins. If none is given, the range
+        of the values is used. Defaults to None.
+
+        Returns:
+        tuple: The (counts, edges) of the histogram. Bins of the summary are assigned to the
+        requested bin their center falls into.
+        """
+
+        edges = (self.start + np.arange(len(self.counts) + 1)) * self.width
+        if bins is None:
+            return self.counts.copy(), edges
+        if range is None:
+            range = (self.min, self.max) if self.count > 0 else (0, 1)
+        centers = (edges[:-1] + edges[1:]) / 2
+        counts, edges = np.histogram(np.clip(centers, *range), bins=bins, range=range, weights=self.counts)
+        return counts.astype(np.int64), edges
+
+    def _add_moments(self, count, mean, m2, minimum, maximum):
+        """
+        Merge the moments of other values, by the parallel algorithm of Chan et al.
+        """
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min, self.max = min(self.min, minimum), max(self.max, maximum)
+
+    def _exponent_for(self, lower, upper):
+        """
+        The finest exponent whose bins cover a range of values.
+        """
+
+        if upper <= lower:
+            return self.exponent
+        return math.ceil(math.log2((upper - lower) / (self.max_bins - 1)))
+
+    def _insert(self, indices, weights, exponent):
+        """
+        Count bin indices given at a bin width, coarsening the bins as necessary.
+        """
+
+        if exponent < self.exponent:
+            indices = indices // 2 ** (self.exponent - exponent)
+            exponent = self.exponent
+        else:
+            self._coarsen(exponent - self.exponent)
+
+        lower, upper = indices.min(), indices.max()
+        if len(self.counts) > 0:
+            lower, upper = min(lower, self.start), max(upper, self.start + len(self.counts) - 1)
+
+        # Merge pairs of bins until the range fits, at most a few times due to the alignment
+        while upper - lower + 1 > self.max_bins:
+            self._coarsen(1)
+            indices = indices // 2
+            lower, upper = lower // 2, upper // 2
+
+        counts = np.bincount(indices - lower, weights=weights, minlength=upper - lower + 1).astype(np.int64)
+        counts[self.start - lower:self.start - lower + len(self.counts)] += self.counts
+        self.start, self.counts = int(lower), counts
+
+    def _coarsen(self, steps):
+        """
+        Merge bins 2^steps at a time.
+        """
+
+        if steps <= 0:
+            return
+        self.exponent += steps
+        if len(self.counts) > 0:
+            indices = (self.start + np.arange(len(self.counts))) // 2 ** steps
+            start = self.start // 2 ** steps
+            self.counts = np.bincount(indices - start, weights=self.counts).astype(np.int64)
+            self.start = start
@@ -5,58 +5,506 @@ import rasterio
 from matplotlib import pyplot as plt
 from rasterio.merge import merge
 import rasterio.plot
-import rasterio as rio
-import io
+from rasterio.windows import Window
+from rasterio.transform import Affine
+from rasterio.io import MemoryFile
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.warp import calculate_default_transform, transform_bounds
+import os
+import tempfile
+import itertools
+import threading
+import weakref
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import math
-import pyproj
-from .Coordinate import Coordinate
+from .Coordinate import CoordinateArray
+from .DatasetPool import DatasetPool
+from .Instrumentation import Instrumentation
 
 class TiffFile:
     """
     A class for handling GeoTIFF files and performing various operations on them.
     """
+
+    pool = DatasetPool() # Shared pool of open datasets
+    _keys = itertools.count() # Unique keys of the instances in the pool
+    HEADER_KEYS = ("width", "height", "count", "bounds", "crs", "transform", "nodata", "dtypes", "block_shapes")
+
     @staticmethod
-    def fromCollection(paths):
+    def fromCollection(paths, lazy=False, workers=1, progress=None):
         """
         Create a list of TiffFile instances from a list of file paths.
 
         Args:
         paths (list): A list of file paths to GeoTIFF files.
+        lazy (bool, optional): Wether only the headers should be read. The datasets of lazy
+        instances are opened once pixel data is requested. Defaults to False.
+        workers (int, optional): The number of threads reading the files concurrently. Defaults to 1.
+        progress (callable, optional): A callback progress(count, total) that is called
+        whenever a file has been read. Defaults to None.
 
         Returns:
-        List[TiffFile]: A list of TiffFile instances.
+        List[TiffFile]: A list of TiffFile instances in the order of the given paths.
         """
 
-        out = []
-        i = 0
-        for p in paths:
-            print(f"\033[94mReading tiff resource {i+1}/{len(paths)}\033[0m", end='\r')
-            out.append(TiffFile(p))
-            i += 1
-        print("")
+        total = len(paths)
+        count = 0
+
+        def load(path):
+            return TiffFile(path, lazy=lazy)
+
+        def report():
+            nonlocal count
+            count += 1
+            if progress is not None:
+                progress(count, total)
+
+        if workers <= 1:
+            out = []
+            for p in paths:
+                out.append(load(p))
+                report()
+            return out
+
+        out = [None] * total
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(load, p): i for i, p in enumerate(paths)}
+            for future in as_completed(futures):
+                out[futures[future]] = future.result()
+                report()
         return out
     
     
-    def __init__(self, path):
+    @staticmethod
+    def mosaic(tiffs, bounds=None, res=None, nodata=None, in_memory=True, path=None,
+               resampling=Resampling.bilinear, crs=None):
+        """
+        Merge a list of TiffFile instances into a single raster.
+
+        Args:
+        tiffs (list): A list of TiffFile instances.
+        bounds (tuple, optional): The (left, bottom, right, top) bounds of the mosaic. If none are
+        given, the union of all bounds is used. Defaults to None.
+        res (tuple, optional): The (x, y) resolution of the mosaic. If none is given, the resolution
+        of the first TiffFile is used. Defaults to None.
+        nodata (float, optional): The nodata value of the mosaic. If none is given, the first nodata value
+        of the TiffFiles is used. If no TiffFile declares one, NaN is used for floating point data and
+        the lowest (or, unsigned, the highest) value of the data type for integer data. Defaults to None.
+        in_memory (bool, optional): Wether the mosaic is kept in memory. Otherwise it is backed by a
+        temporary file, which is removed once the returned TiffFile is garbage collected. Defaults to True.
+        path (str, optional): A path the mosaic is written to instead. Defaults to None.
+        resampling (Resampling, optional): The resampling method used to warp TiffFiles from other
+        coordinate systems. Defaults to Resampling.bilinear.
+        crs (str or CRS, optional): The coordinate reference system of the mosaic. If none is given,
+        the one of the first TiffFile is used. Defaults to None.
+
+        Returns:
+        TiffFile: The mosaic, covering the requested bounds without seams or overlap.
+
+        Note:
+        Only TiffFiles intersecting the bounds are read, through their pooled datasets, which are
+        locked while merging. TiffFiles from other coordinate systems are warped on the fly, without
+        intermediate files. Building geometry once from the mosaic avoids duplicated edge points and
+        per-tile normal estimation and meshing.
+        """
+
+        assert len(tiffs) > 0, "At least one TiffFile is required"
+        crs = tiffs[0].get_proj() if crs is None else crs
+
+        if bounds is not None:
+            tiffs = [t for t in tiffs if TiffFile._intersects(t.get_bounds(crs), bounds)]
+            assert len(tiffs) > 0, "No TiffFile intersects the given bounds"
+
+        if nodata is None:
+            nodata = next((t.nodata for t in tiffs if t.nodata is not None), None)
+        if nodata is None:
+            # Without a nodata value, gaps would be filled with valid looking zeros
+            dtype = np.dtype(tiffs[0].dtypes[0])
+            if np.issubdtype(dtype, np.floating):
+                nodata = np.nan
+            else:
+                nodata = np.iinfo(dtype).min if np.issubdtype(dtype, np.signedinteger) else np.iinfo(dtype).max
+
+        with ExitStack() as stack:
+            # Read through the pooled datasets, locking every TiffFile once and in a fixed order,
+            # so merges sharing TiffFiles on other threads cannot deadlock
+            datasets = {}
+            for t in sorted(tiffs, key=lambda t: t._key):
+                if t._key not in datasets:
+                    datasets[t._key] = stack.enter_context(t._dataset())
+
+            # TiffFiles from other coordinate systems are warped on the fly while merging
+            sources = []
+            for t in tiffs:
+                dataset = datasets[t._key]
+                if t.get_proj() != crs:
+                    dataset = stack.enter_context(WarpedVRT(dataset, crs=crs, resampling=resampling))
+                sources.append(dataset)
+            with Instrumentation.span("tiff.mosaic", tiles=len(sources)) as span:
+                data, transform = merge(sources, bounds=bounds, res=res, nodata=nodata)
+                span["pixels"] = data.shape[1] * data.shape[2]
+
+        profile = {"driver": "GTiff", "count": data.shape[0], "height": data.shape[1], "width": data.shape[2],
+                   "dtype": data.dtype, "crs": crs, "transform": transform, "nodata": nodata,
+                   "tiled": True, "blockxsize": 256, "blockysize": 256}
+
+        return TiffFile._create(profile, lambda dst: dst.write(data), in_memory, path)
+
+    def reproject(self, target_proj, res=None, resampling=Resampling.bilinear, window_size=(1024, 1024),
+                  in_memory=True, path=None):
+        """
+        Warp the GeoTIFF into another coordinate reference system.
+
+        Args:
+        target_proj (str or CRS): The target projection (e.g., 'epsg:32632').
+        res (tuple, optional): The (x, y) resolution of the result. If none is given, a resolution
+        resembling the native one is chosen. Defaults to None.
+        resampling (Resampling, optional): The resampling method. Defaults to Resampling.bilinear.
+        window_size (tuple, optional): The (rows, cols) size of the windows the result is computed in.
+        Defaults to (1024, 1024).
+        in_memory (bool, optional): Wether the result is kept in memory, see mosaic. Defaults to True.
+        path (str, optional): A path the result is written to instead. Defaults to None.
+
+        Returns:
+        TiffFile: The reprojected GeoTIFF.
+
+        Note:
+        The result is warped window by window, so only the source pixels needed for one output
+        window are held in memory at a time.
+        """
+
+        transform, width, height = calculate_default_transform(self.crs, target_proj, self.width, self.height,
+                                                               *self.bounds, resolution=res)
+        nodata = self.nodata
+        if nodata is None and np.issubdtype(np.dtype(self.dtypes[0]), np.floating):
+            nodata = np.nan
+
+        profile = {"driver": "GTiff", "count": self.count, "height": height, "width": width,
+                   "dtype": self.dtypes[0], "crs": target_proj, "transform": transform, "nodata": nodata,
+                   "tiled": True, "blockxsize": 256, "blockysize": 256}
+
+        def write(dst):
+            with self._dataset() as dataset, WarpedVRT(dataset, crs=target_proj, transform=transform,
+                                                       width=width, height=height, nodata=nodata,
+                                                       resampling=resampling) as vrt:
+                rows, cols = window_size
+                for row_off in range(0, height, rows):
+                    for col_off in range(0, width, cols):
+                        window = Window(col_off, row_off, min(cols, width - col_off), min(rows, height - row_off))
+                        dst.write(vrt.read(window=window), window=window)
+
+        with Instrumentation.span("tiff.reproject", path=self.path, pixels=width * height):
+            return TiffFile._create(profile, write, in_memory, path)
+
+    @staticmethod
+    def _create(profile, write, in_memory=True, path=None):
+        """
+        Create a new GeoTIFF and open it as a TiffFile.
+
+        Args:
+        profile (dict): The rasterio profile of the new GeoTIFF.
+        write (callable): A callback write(dataset) filling the opened dataset.
+        in_memory (bool, optional): Wether the GeoTIFF is kept in memory. Otherwise it is backed by a
+        temporary file, which is removed once the returned TiffFile is garbage collected. Defaults to True.
+        path (str, optional): A path the GeoTIFF is written to instead. Defaults to None.
+
+        Returns:
+        TiffFile: The created GeoTIFF.
+        """
+
+        if path is None and in_memory:
+            memfile = MemoryFile()
+            with memfile.open(**profile) as dst:
+                write(dst)
+            out = TiffFile(memfile.name)
+            out._memfile = memfile # The GeoTIFF lives as long as the TiffFile
+            return out
+
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(suffix=".tif")
+            os.close(fd)
+        with rasterio.open(path, "w", **profile) as dst:
+            write(dst)
+        out = TiffFile(path)
+        if temporary:
+            weakref.finalize(out, TiffFile._remove_temporary, out._key, path)
+        return out
+
+    @staticmethod
+    def _intersects(a, b):
+        """
+        Check wether two (left, bottom, right, top) bounds overlap.
+        """
+
+        return a[0] < b[2] and a[2] > b[0] and a[1] < b[3] and a[3] > b[1]
+
+    @staticmethod
+    def _remove_temporary(key, path):
+        """
+        Close the dataset of a garbage collected TiffFile and remove its temporary file.
+        """
+
+        TiffFile.pool.close(key)
+        os.remove(path)
+
+    def __init__(self, path, lazy=False, header=None):
         """
         Initialize a TiffFile instance from a file path.
 
         Args:
         path (str): Path to the GeoTIFF file.
+        lazy (bool, optional): Wether only the header should be read. The dataset is opened
+        once pixel data is requested. Defaults to False.
+        header (dict, optional): The metadata of the file by TiffFile.HEADER_KEYS, e.g. as stored by
+        TileCatalog. If given, the file is not touched until pixel data is requested. Defaults to None.
+
+        Note:
+        Open datasets are managed by the shared TiffFile.pool, which closes least recently
+        used datasets once too many are open and reopens them when they are accessed again.
+        """
+
+        self.path = path
+        self._key = next(TiffFile._keys)
+        self._lock = threading.RLock()
+        weakref.finalize(self, TiffFile.pool.close, self._key)
+
+        if header is not None:
+            for key in TiffFile.HEADER_KEYS:
+                setattr(self, key, header[key])
+        elif lazy:
+            with rasterio.open(path) as dataset:
+                self._read_header(dataset)
+        else:
+            with self._dataset() as dataset:
+                self._read_header(dataset)
+
+    def _read_header(self, dataset):
+        """
+        Store the metadata of a dataset that is needed without accessing pixel data.
+
+        Args:
+        dataset (rasterio.DatasetReader): The opened dataset.
+        """
+
+        for key in TiffFile.HEADER_KEYS:
+            setattr(self, key, getattr(dataset, key))
+
+    @property
+    def tiff(self):
+        """
+        The underlying rasterio dataset, opened on access if it is not open.
+
+        Note:
+        The dataset might be closed by the pool once other datasets are accessed. Prefer the
+        methods of this class, which keep the dataset open while they use it.
+        """
+
+        return TiffFile.pool.get(self._key, self.path)
+
+    @contextmanager
+    def _dataset(self):
+        """
+        Context manager providing the underlying dataset, protected from eviction and concurrent reads.
+
+        Yields:
+        rasterio.DatasetReader: The open dataset.
+        """
+
+        with self._lock, TiffFile.pool.pinned(self._key, self.path) as dataset:
+            yield dataset
+
+    def close(self):
+        """
+        Close the underlying dataset. It is reopened transparently if the TiffFile is used again.
         """
 
-        self.tiff = rasterio.open(path)
+        TiffFile.pool.close(self._key)
 
-    def to_numpy(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def to_numpy(self, band=None, resolution=None):
         """
         Read the GeoTIFF data as a NumPy array.
 
+        Args:
+        band (int, optional): The (1-based) band to read. If none is given, all bands
+        are read. Defaults to None.
+        resolution (float, optional): The target ground resolution, see get_decimation. If none
+        is given, the native resolution is used. Defaults to None.
+
         Returns:
         np.array: A NumPy array containing the GeoTIFF data.
         """
 
-        return self.tiff.read()
+        if resolution is None:
+            with Instrumentation.span("tiff.read", path=self.path), self._dataset() as dataset:
+                return dataset.read(band)
+
+        # Assemble the decimated raster from its windows
+        bands = [band] if band is not None else range(1, self.count + 1)
+        out = None
+        for i, b in enumerate(bands):
+            for window, data in self.iter_windows(band=b, resolution=resolution):
+                if out is None:
+                    out = np.empty((len(bands),) + self.get_shape(resolution), dtype=data.dtype)
+                out[i][window.toslices()] = data
+        return out[0] if band is not None else out
+
+    def iter_windows(self, band=1, window_size=None, resolution=None):
+        """
+        Iterate over a band of the GeoTIFF in windows aligned to the file's native block layout.
+
+        Args:
+        band (int, optional): The (1-based) band to read. Defaults to 1.
+        window_size (tuple, optional): The (rows, cols) size of a window. It is rounded up to a
+        multiple of the native block shape. If none is given, the native blocks are used. Defaults to None.
+        resolution (float, optional): The target ground resolution, see get_decimation. If none
+        is given, the native resolution is used. Defaults to None.
+
+        Yields:
+        tuple: A (rasterio.windows.Window, np.array) pair containing the window and its band data.
+        The window is given in the grid of the requested resolution, see get_shape.
+
+        Note:
+        Only a single window is held in memory at a time, which bounds the memory used for
+        reading by the window size instead of the raster size. Decimated windows are read through
+        the file's overviews where available, so only the pixels needed for the resolution are read.
+        """
+
+        for window in self.get_windows(band, window_size, resolution):
+            yield window, self.read_window(window, band=band, resolution=resolution)
+
+    def get_windows(self, band=1, window_size=None, resolution=None):
+        """
+        Get the windows iter_windows reads, without reading them.
+
+        Args:
+        band (int, optional): The (1-based) band whose block layout is used. Defaults to 1.
+        window_size (tuple, optional): The (rows, cols) size of a window, see iter_windows. Defaults to None.
+        resolution (float, optional): The target ground resolution, see get_decimation. Defaults to None.
+
+        Returns:
+        list: The rasterio.windows.Window objects in row-major order, given in the grid of the
+        requested resolution.
+        """
+
+        height, width = self.height, self.width
+        block_rows, block_cols = self.block_shapes[band - 1]
+        block_rows, block_cols = min(block_rows, height), min(block_cols, width)
+
+        rows, cols = block_rows, block_cols
+        if window_size is not None:
+            rows = math.ceil(window_size[0] / block_rows) * block_rows
+            cols = math.ceil(window_size[1] / block_cols) * block_cols
+
+        # Align windows to whole decimated pixels
+        dec_rows, dec_cols = self.get_decimation(resolution)
+        rows = math.ceil(rows / dec_rows) * dec_rows
+        cols = math.ceil(cols / dec_cols) * dec_cols
+
+        windows = []
+        for row_off in range(0, height, rows):
+            for col_off in range(0, width, cols):
+                window = Window(col_off, row_off, min(cols, width - col_off), min(rows, height - row_off))
+                windows.append(Window(col_off // dec_cols, row_off // dec_rows,
+                                      math.ceil(window.width / dec_cols), math.ceil(window.height / dec_rows)))
+        return windows
+
+    def read_window(self, window, band=1, resolution=None):
+        """
+        Read a window of a band of the GeoTIFF.
+
+        Args:
+        window (rasterio.windows.Window): The window, given in the grid of the requested resolution.
+        band (int, optional): The (1-based) band to read. Defaults to 1.
+        resolution (float, optional): The target ground resolution, see get_decimation. If none
+        is given, the native resolution is used. Defaults to None.
+
+        Returns:
+        np.array: The band data of the window.
+        """
+
+        dec_rows, dec_cols = self.get_decimation(resolution)
+        row_off, col_off = window.row_off * dec_rows, window.col_off * dec_cols
+        source = Window(col_off, row_off, min(window.width * dec_cols, self.width - col_off),
+                        min(window.height * dec_rows, self.height - row_off))
+
+        with self._dataset() as dataset:
+            if source.height % dec_rows == 0 and source.width % dec_cols == 0:
+                return dataset.read(band, window=source, out_shape=(window.height, window.width),
+                                    resampling=Resampling.average)
+            # Ragged windows at the raster edge are averaged over the available pixels only
+            return self._decimate(dataset.read(band, window=source), dec_rows, dec_cols)
+
+    def _decimate(self, data, dec_rows, dec_cols):
+        """
+        Average blocks of pixels, ignoring nodata and pixels beyond the edge of the data.
+
+        Args:
+        data (np.array): A (rows, cols) array of pixels.
+        dec_rows (int): The number of rows averaged into one pixel.
+        dec_cols (int): The number of columns averaged into one pixel.
+
+        Returns:
+        np.array: The (ceil(rows / dec_rows), ceil(cols / dec_cols)) array of averages, nodata
+        where no valid pixel is available.
+        """
+
+        rows, cols = data.shape
+        out_rows, out_cols = math.ceil(rows / dec_rows), math.ceil(cols / dec_cols)
+
+        padded = np.full((out_rows * dec_rows, out_cols * dec_cols), np.nan)
+        padded[:rows, :cols] = data
+        if self.nodata is not None:
+            padded[padded == self.nodata] = np.nan
+
+        blocks = padded.reshape((out_rows, dec_rows, out_cols, dec_cols))
+        count = np.count_nonzero(~np.isnan(blocks), axis=(1, 3))
+        out = np.nansum(blocks, axis=(1, 3)) / np.maximum(count, 1)
+        out[count == 0] = self.nodata if self.nodata is not None else np.nan
+        return out.astype(data.dtype)
+
+    def get_decimation(self, resolution=None):
+        """
+        Get the integer factors by which the raster is decimated to reach a target ground resolution.
+
+        Args:
+        resolution (float, optional): The target ground resolution in the units of the coordinate
+        reference system. If none is given, the native resolution is used. Defaults to None.
+
+        Returns:
+        tuple: The (rows, cols) decimation factors, at least 1. The resulting resolution is the
+        coarsest multiple of the native resolution that does not exceed the target.
+        """
+
+        if resolution is None:
+            return 1, 1
+
+        res_x, res_y = abs(self.transform.a), abs(self.transform.e)
+        return (max(1, math.floor(resolution / res_y + 1e-9)),
+                max(1, math.floor(resolution / res_x + 1e-9)))
+
+    def get_shape(self, resolution=None):
+        """
+        Get the (rows, cols) shape of the raster at a target ground resolution.
+
+        Args:
+        resolution (float, optional): The target ground resolution, see get_decimation. Defaults to None.
+
+        Returns:
+        tuple: The (rows, cols) shape of the decimated raster.
+        """
+
+        dec_rows, dec_cols = self.get_decimation(resolution)
+        return math.ceil(self.height / dec_rows), math.ceil(self.width / dec_cols)
 
     def visualize(self):
         """
@@ -66,7 +514,8 @@ class TiffFile:
         plt.figure: The Matplotlib figure object showing the GeoTIFF.
         """
 
-        rasterio.plot.show(self.tiff, title="GeoTIFF visualisation")
+        with self._dataset() as dataset:
+            rasterio.plot.show(dataset, title="GeoTIFF visualisation")
         return plt.gcf()
     
     def get_bounding_coordinates(self, target_format=""):
@@ -81,12 +530,49 @@ class TiffFile:
         tuple: A tuple containing Coordinate instances for the bounding box.
         """
 
-        x1, y1 = self.tiff.bounds.left, self.tiff.bounds.bottom
-        x2, y2 = self.tiff.bounds.right, self.tiff.bounds.top
-        bbox = Coordinate((x1, y1), self.get_proj()), Coordinate((x2, y2), self.get_proj())
+        corners = CoordinateArray((self.bounds.left, self.bounds.right),
+                                  (self.bounds.bottom, self.bounds.top), self.get_proj())
         if target_format != "":
-            bbox = bbox[0].convert(target_format), bbox[1].convert(target_format)
-        return bbox
+            corners = corners.convert(target_format)
+        return corners[0], corners[1]
+
+    def get_local_transform(self, resolution=None):
+        """
+        Get the affine transformation from pixel (col, row) positions to local (x, y) coordinates.
+
+        Args:
+        resolution (float, optional): The target ground resolution of the pixel grid, see
+        get_decimation. Defaults to None.
+
+        Returns:
+        Affine: The transformation, relative to the bottom-left corner of the bounding box.
+
+        Note:
+        Decimated pixels are placed on a regular grid with the spacing of the decimated resolution.
+        If the raster size is not a multiple of the decimation, the last row and column average
+        fewer source pixels than the others but keep their place on the grid, so their centers lie
+        up to one source pixel beyond the pixels they average, e.g. outside the bounding box.
+        """
+
+        bounds = self.bounds
+        dec_rows, dec_cols = self.get_decimation(resolution)
+        return Affine.translation(-bounds.left, -bounds.bottom) @ self.transform @ Affine.scale(dec_cols, dec_rows)
+
+    def get_bounds(self, target_proj=None):
+        """
+        Get the (left, bottom, right, top) bounds of the GeoTIFF.
+
+        Args:
+        target_proj (str or CRS, optional): The projection of the bounds. If none is given, the
+        projection stored in the TIFF file is used. Defaults to None.
+
+        Returns:
+        tuple: The bounds, enclosing the whole raster in the target projection.
+        """
+
+        if target_proj is None or self.crs == target_proj:
+            return tuple(self.bounds)
+        return transform_bounds(self.crs, target_proj, *self.bounds)
 
     def get_proj(self):
         """
@@ -96,7 +582,7 @@ class TiffFile:
         CRS: The coordinate reference system of the GeoTIFF.
         """
 
-        return self.tiff.crs
+        return self.crs
 
     def __str__(self):
         """
@@ -110,7 +596,7 @@ class TiffFile:
         out = "GeoData with"
         out += f"\n Spacial bounding box:\n  Bottom-Left: {bbox[0]}"
         out += f"\n  Top-Right: {bbox[1]}"
-        out += f"\n Number of Bands: {self.tiff.count}"
-        out += f"\n Raster Size: {self.tiff.width, self.tiff.height}"
+        out += f"\n Number of Bands: {self.count}"
+        out += f"\n Raster Size: {self.width, self.height}"
         out += f"\n Coordinate Reference: {self.get_proj()}"
         return out
\ No newline at end of file
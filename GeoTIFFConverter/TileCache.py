@@ -0,0 +1,115 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import threading
+import tempfile
+from collections import OrderedDict
+
+class TileCache:
+    """
+    A least-recently-used cache of tiles on disk.
+
+    Every tile is stored as a single file in the cache directory. Once the total size of
+    the cached files exceeds max_bytes, the least recently used tiles are removed. The
+    recency of the tiles is kept in the modification times of their files, so it
+    survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize a TileCache object.
+
+        Args:
+        directory (str): The directory the tiles are stored in. It is created if it does not exist.
+        max_bytes (int, optional): The maximum total size of the cached tiles. Defaults to 256 MiB.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Maps tile names to file sizes, least recently used first
+        self._entries = OrderedDict()
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+        self._size = sum(self._entries.values())
+
+    def get(self, name):
+        """
+        Retrieve a tile from the cache.
+
+        Args:
+        name (str): The file name of the tile.
+
+        Returns:
+        bytes: The content of the tile, or None if it is not cached.
+        """
+
+        with self._lock:
+            if name not in self._entries:
+                return None
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as file:
+                    content = file.read()
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed by another process sharing the directory
+                self._size -= self._entries.pop(name)
+                return None
+            self._entries.move_to_end(name)
+            return content
+
+    def put(self, name, content):
+        """
+        Store a tile in the cache, evicting least recently used tiles if necessary.
+
+        Args:
+        name (str): The file name of the tile.
+        content (bytes): The content of the tile.
+        """
+
+        # Write to a temporary file first, so readers never see partial tiles
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+
+        with self._lock:
+            os.replace(tmp, os.path.join(self.directory, name))
+            self._size += len(content) - self._entries.pop(name, 0)
+            self._entries[name] = len(content)
+            self._evict()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        The total size of the cached tiles in bytes.
+        """
+
+        return self._size
+
+    def _evict(self):
+        """
+        Remove least recently used tiles until the cache fits its size limit.
+        """
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
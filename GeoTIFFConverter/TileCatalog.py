@@ -0,0 +1,368 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import glob
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import rasterio
+from rasterio.coords import BoundingBox
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.warp import transform_bounds
+from .TiffFile import TiffFile
+from .Coordinate import Coordinate
+from .Instrumentation import Instrumentation
+
+class TileCatalog:
+    """
+    A spatial index over the headers of a collection of GeoTIFF tiles.
+
+    The headers of all tiles (bounds, coordinate reference system, resolution, data type and
+    nodata value) are read once and can be persisted in a compact .npz index. An STR-tree
+    (an R-tree packed by sort-tile-recursive) over the footprints of the tiles answers queries
+    by bounding box or point. Queries return TiffFiles of the intersecting tiles only, which
+    are built from the stored headers without opening any file.
+    """
+
+    def __init__(self, records, crs=None, capacity=16):
+        """
+        Initialize a TileCatalog object from tile headers. Use the from* factories to scan tiles.
+
+        Args:
+        records (list): The headers of the tiles, as dicts produced by TileCatalog._scan.
+        crs (str or CRS, optional): The coordinate reference system of the footprints. If none is
+        given, the one of the first tile is used. Defaults to None.
+        capacity (int, optional): The maximum number of children of a node of the tree. Defaults to 16.
+        """
+
+        if crs is None:
+            crs = records[0]["crs"] if len(records) > 0 else "EPSG:4326"
+        self.crs = CRS.from_user_input(crs)
+        self.capacity = capacity
+
+        # Store the headers column-wise, coordinate reference systems as indices into a table
+        self._crs_table = list(dict.fromkeys(r["crs"] for r in records))
+        index = {wkt: i for i, wkt in enumerate(self._crs_table)}
+        self._tiles = {
+            "path": np.array([r["path"] for r in records], dtype=str),
+            "bounds": np.array([r["bounds"] for r in records], dtype=np.float64).reshape((-1, 4)),
+            "transform": np.array([r["transform"] for r in records], dtype=np.float64).reshape((-1, 6)),
+            "shape": np.array([r["shape"] for r in records], dtype=np.int64).reshape((-1, 3)),
+            "block": np.array([r["block"] for r in records], dtype=np.int64).reshape((-1, 2)),
+            "dtype": np.array([r["dtype"] for r in records], dtype=str),
+            "nodata": np.array([np.nan if r["nodata"] is None else r["nodata"] for r in records], dtype=np.float64),
+            "has_nodata": np.array([r["nodata"] is not None for r in records], dtype=bool),
+            "crs": np.array([index[r["crs"]] for r in records], dtype=np.int32),
+            "mtime": np.array([r["mtime"] for r in records], dtype=np.int64),
+            "size": np.array([r["size"] for r in records], dtype=np.int64),
+        }
+        self._footprints = self._compute_footprints()
+        self._build_tree()
+
+    @staticmethod
+    def fromPaths(paths, index_path=None, crs=None, workers=8, capacity=16, rescan=(), previous=None):
+        """
+        Create a TileCatalog of GeoTIFF tiles.
+
+        Args:
+        paths (list): The paths of the tiles.
+        index_path (str, optional): The path of the persisted index. Tiles an existing index holds
+        with an unchanged modification time and size are not scanned again. The catalog is saved
+        to the path afterwards. Defaults to None, which neither reads nor writes an index.
+        crs (str or CRS, optional): The coordinate reference system of the footprints. If none is
+        given, the one of the first tile is used. Defaults to None.
+        workers (int, optional): The number of threads reading headers concurrently. Defaults to 8.
+        capacity (int, optional): The maximum number of children of a node of the tree. Defaults to 16.
+        rescan (list, optional): Paths of tiles that are scanned again even if the index holds them
+        unchanged, e.g. because their content is known to have changed. Defaults to ().
+        previous (TileCatalog, optional): A catalog whose tiles are not scanned again if unchanged,
+        like those of an existing index, without saving the new catalog. Defaults to None.
+
+        Returns:
+        TileCatalog: The catalog of the tiles.
+        """
+
+        paths = [os.path.abspath(p) for p in paths]
+        rescan = {os.path.abspath(p) for p in rescan}
+        if index_path is not None and os.path.exists(index_path):
+            previous = TileCatalog.load(index_path)
+        known = {str(p): i for i, p in enumerate(previous._tiles["path"])} if previous is not None else {}
+
+        def record(path):
+            stat = os.stat(path)
+            i = known.get(path) if path not in rescan else None
+            if i is not None and previous._tiles["mtime"][i] == stat.st_mtime_ns \
+                    and previous._tiles["size"][i] == stat.st_size:
+                return previous._record(i)
+            Instrumentation.count("catalog.scanned")
+            return TileCatalog._scan(path, stat)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            records = list(executor.map(record, paths))
+
+        catalog = TileCatalog(records, crs, capacity)
+        if index_path is not None:
+            catalog.save(index_path)
+        return catalog
+
+    @staticmethod
+    def fromDirectory(directory, index_path=None, patterns=("*.tif", "*.tiff"), **kwargs):
+        """
+        Create a TileCatalog of all GeoTIFF tiles in a directory and its subdirectories.
+
+        Args:
+        directory (str): The directory.
+        index_path (str, optional): The path of the persisted index, see fromPaths. Defaults to None.
+        patterns (tuple, optional): The file name patterns of the tiles. Defaults to ("*.tif", "*.tiff").
+        **kwargs: Further arguments of fromPaths.
+
+        Returns:
+        TileCatalog: The catalog of the tiles.
+        """
+
+        paths = set()
+        for pattern in patterns:
+            paths.update(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+        return TileCatalog.fromPaths(sorted(paths), index_path, **kwargs)
+
+    @staticmethod
+    def fromTileList(path, index_path=None, **kwargs):
+        """
+        Create a TileCatalog of the GeoTIFF tiles listed in a text file, one path per line.
+
+        Args:
+        path (str): The path of the file, see BatchConverter.readTileList.
+        index_path (str, optional): The path of the persisted index, see fromPaths. Defaults to None.
+        **kwargs: Further arguments of fromPaths.
+
+        Returns:
+        TileCatalog: The catalog of the tiles.
+        """
+
+        from .BatchConverter import BatchConverter
+        return TileCatalog.fromPaths(BatchConverter.readTileList(path), index_path, **kwargs)
+
+    @staticmethod
+    def load(path):
+        """
+        Load a TileCatalog persisted with save.
+
+        Args:
+        path (str): The path of the index.
+
+        Returns:
+        TileCatalog: The catalog.
+        """
+
+        catalog = TileCatalog.__new__(TileCatalog)
+        with np.load(path) as index:
+            catalog.crs = CRS.from_user_input(str(index["catalog_crs"]))
+            catalog.capacity = int(index["capacity"])
+            catalog._crs_table = [str(wkt) for wkt in index["crs_table"]]
+            catalog._tiles = {key[len("tile_"):]: index[key] for key in index.files if key.startswith("tile_")}
+            catalog._footprints = index["footprints"]
+            catalog._order = index["order"]
+            catalog._node_bounds = index["node_bounds"]
+            catalog._node_children = index["node_children"]
+            catalog._level_offsets = index["level_offsets"]
+        return catalog
+
+    def save(self, path):
+        """
+        Persist the catalog, replacing the index file atomically.
+
+        Args:
+        path (str): The path of the index.
+        """
+
+        arrays = {f"tile_{key}": array for key, array in self._tiles.items()}
+        arrays.update(catalog_crs=np.array(self.crs.to_wkt()), capacity=np.array(self.capacity),
+                      crs_table=np.array(self._crs_table, dtype=str), footprints=self._footprints,
+                      order=self._order, node_bounds=self._node_bounds, node_children=self._node_children,
+                      level_offsets=self._level_offsets)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(tmp, path)
+
+    def query(self, bbox, crs=None):
+        """
+        Find the tiles intersecting a bounding box.
+
+        Args:
+        bbox (tuple): The (left, bottom, right, top) bounding box.
+        crs (str or CRS, optional): The coordinate reference system of the bounding box. If none is
+        given, the one of the catalog is used. Defaults to None.
+
+        Returns:
+        list: TiffFiles of the tiles whose footprints overlap the bounding box, in catalog order.
+        """
+
+        if crs is not None and CRS.from_user_input(crs) != self.crs:
+            bbox = transform_bounds(crs, self.crs, *bbox)
+        return [self._tiff(i) for i in self._search(np.asarray(bbox, dtype=np.float64), inclusive=False)]
+
+    def query_point(self, x, y, crs=None):
+        """
+        Find the tiles containing a point.
+
+        Args:
+        x (float): The x coordinate (e.g. easting or longitude) of the point.
+        y (float): The y coordinate (e.g. northing or latitude) of the point.
+        crs (str or CRS, optional): The coordinate reference system of the point, with the axes in
+        (x, y) order. If none is given, the one of the catalog is used. Defaults to None.
+
+        Returns:
+        list: TiffFiles of the tiles whose footprints contain the point, including their edges.
+        """
+
+        if crs is not None and CRS.from_user_input(crs) != self.crs:
+            x, y = Coordinate.get_transformer(crs, self.crs, always_xy=True).transform(x, y)
+        return [self._tiff(i) for i in self._search(np.array([x, y, x, y], dtype=np.float64), inclusive=True)]
+
+    def __len__(self):
+        return len(self._tiles["path"])
+
+    @staticmethod
+    def _scan(path, stat):
+        """
+        Read the header of a tile.
+
+        Returns:
+        dict: The header of the tile.
+        """
+
+        with rasterio.open(path) as dataset:
+            return {"path": path, "bounds": tuple(dataset.bounds), "transform": tuple(dataset.transform)[:6],
+                    "shape": (dataset.width, dataset.height, dataset.count), "block": dataset.block_shapes[0],
+                    "dtype": dataset.dtypes[0], "nodata": dataset.nodata, "crs": dataset.crs.to_wkt(),
+                    "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _record(self, i):
+        """
+        The header of a tile of the catalog, as produced by _scan.
+        """
+
+        t = self._tiles
+        return {"path": str(t["path"][i]), "bounds": tuple(t["bounds"][i]), "transform": tuple(t["transform"][i]),
+                "shape": tuple(t["shape"][i]), "block": tuple(t["block"][i]), "dtype": str(t["dtype"][i]),
+                "nodata": float(t["nodata"][i]) if t["has_nodata"][i] else None,
+                "crs": self._crs_table[t["crs"][i]], "mtime": int(t["mtime"][i]), "size": int(t["size"][i])}
+
+    def _tiff(self, i):
+        """
+        Create the TiffFile of a tile from its stored header, without opening the file.
+        """
+
+        t = self._tiles
+        width, height, count = (int(v) for v in t["shape"][i])
+        header = {"width": width, "height": height, "count": count,
+                  "bounds": BoundingBox(*t["bounds"][i]),
+                  "crs": CRS.from_user_input(self._crs_table[t["crs"][i]]),
+                  "transform": Affine(*t["transform"][i]),
+                  "nodata": float(t["nodata"][i]) if t["has_nodata"][i] else None,
+                  "dtypes": (str(t["dtype"][i]),) * count,
+                  "block_shapes": [tuple(int(v) for v in t["block"][i])] * count}
+        return TiffFile(str(t["path"][i]), header=header)
+
+    def _compute_footprints(self):
+        """
+        Compute the bounds of every tile in the coordinate reference system of the catalog.
+        """
+
+        footprints = self._tiles["bounds"].copy()
+        for i, wkt in enumerate(self._crs_table):
+            crs = CRS.from_user_input(wkt)
+            if crs == self.crs:
+                continue
+            for j in np.flatnonzero(self._tiles["crs"] == i):
+                footprints[j] = transform_bounds(crs, self.crs, *footprints[j])
+        return footprints
+
+    @staticmethod
+    def _str_order(boxes, capacity):
+        """
+        Order boxes by sort-tile-recursive: into vertical slices by x, and by y within every slice.
+
+        Returns:
+        np.ndarray: The permutation of the boxes.
+        """
+
+        n = len(boxes)
+        slices = math.ceil(math.sqrt(math.ceil(n / capacity)))
+        per_slice = max(slices, 1) * capacity
+        cx, cy = boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]
+
+        order = np.argsort(cx, kind="stable")
+        for start in range(0, n, per_slice):
+            part = order[start:start + per_slice]
+            order[start:start + per_slice] = part[np.argsort(cy[part], kind="stable")]
+        return order
+
+    def _build_tree(self):
+        """
+        Pack the footprints bottom-up into an STR-tree.
+
+        Note:
+        Every level is stored as a block of node bounds and (start, end) ranges of children in
+        the level below. The lowest level holds the footprints in the order self._order.
+        """
+
+        capacity = self.capacity
+        self._order = TileCatalog._str_order(self._footprints, capacity)
+        level = self._footprints[self._order]
+
+        bounds, children = [], []
+        while len(level) > 0 and (len(bounds) == 0 or len(level) > 1):
+            starts = np.arange(0, len(level), capacity)
+            ranges = np.stack((starts, np.minimum(starts + capacity, len(level))), axis=1)
+            parents = np.concatenate((np.minimum.reduceat(level[:, :2], starts),
+                                      np.maximum.reduceat(level[:, 2:], starts)), axis=1)
+
+            order = TileCatalog._str_order(parents, capacity)
+            bounds.append(parents[order])
+            children.append(ranges[order])
+            level = parents[order]
+
+        self._node_bounds = np.concatenate(bounds) if len(bounds) > 0 else np.empty((0, 4))
+        self._node_children = np.concatenate(children) if len(children) > 0 else np.empty((0, 2), dtype=np.int64)
+        self._level_offsets = np.cumsum([0] + [len(b) for b in bounds])
+
+    def _search(self, box, inclusive):
+        """
+        Walk the tree top-down, following the nodes overlapping a box.
+
+        Returns:
+        np.ndarray: The sorted indices of the tiles whose footprints overlap the box.
+        """
+
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in reversed(range(len(self._level_offsets) - 1)):
+            offset = self._level_offsets[level]
+            hit = nodes[TileCatalog._overlaps(self._node_bounds[offset + nodes], box, inclusive)]
+            start, end = self._node_children[offset + hit].T
+            lengths = end - start
+            # Concatenate the child ranges of all hit nodes
+            nodes = np.repeat(start - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+        leaves = self._footprints[self._order[nodes]]
+        return np.sort(self._order[nodes[TileCatalog._overlaps(leaves, box, inclusive)]])
+
+    @staticmethod
+    def _overlaps(boxes, box, inclusive):
+        """
+        Check which (left, bottom, right, top) boxes overlap a box, or also touch it if inclusive.
+        """
+
+        if inclusive:
+            return (boxes[:, 0] <= box[2]) & (boxes[:, 2] >= box[0]) & (boxes[:, 1] <= box[3]) & (boxes[:, 3] >= box[1])
+        return (boxes[:, 0] < box[2]) & (boxes[:, 2] > box[0]) & (boxes[:, 1] < box[3]) & (boxes[:, 3] > box[1])
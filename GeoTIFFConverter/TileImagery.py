@@ -0,0 +1,210 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import os
+import math
+import hashlib
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from owslib.wms import WebMapService
+from .TileCache import TileCache
+from .Instrumentation import Instrumentation
+
+class TileImagery:
+    """
+    A tiled layer of aerial imagery in the epsg:4326 (lat-long) projection.
+
+    Bounding boxes are split into the tiles of a fixed grid. At zoom level z, a tile spans
+    180 / 2^z degrees in both directions. Tiles are fetched concurrently, stored in an
+    on-disk TileCache and stitched into the requested image, so repeated or overlapping
+    requests only fetch the tiles that are not cached yet.
+    """
+
+    def __init__(self, fetch=None, cache_dir=None, max_cache_bytes=256 * 1024 * 1024, tile_size=256,
+                 max_zoom=18, workers=8, url="https://gibs.earthdata.nasa.gov/wms/epsg4326/best/wms.cgi?",
+                 layer="BlueMarble_NextGeneration", time="2021-09-21"):
+        """
+        Initialize a TileImagery object.
+
+        Args:
+        fetch (callable, optional): A backend fetch(bbox, size) returning the encoded image of the
+        (min_lon, min_lat, max_lon, max_lat) bbox with the (width, height) size. If none is given,
+        the tiles are requested from the WMS service at url. Defaults to None.
+        cache_dir (str, optional): The directory tiles are cached in. If none is given, a directory in
+        the user's cache directory is used. Defaults to None.
+        max_cache_bytes (int, optional): The maximum size of the tile cache. Defaults to 256 MiB.
+        tile_size (int, optional): The width and height of a tile in pixels. Defaults to 256.
+        max_zoom (int, optional): The finest zoom level of the tile grid. Defaults to 18.
+        workers (int, optional): The number of tiles fetched concurrently. Defaults to 8.
+        url (str, optional): The URL of the WMS service. Defaults to NASA GIBS.
+        layer (str, optional): The WMS layer. Defaults to "BlueMarble_NextGeneration".
+        time (str, optional): The time of the WMS data. Defaults to "2021-09-21".
+        """
+
+        self.tile_size = tile_size
+        self.max_zoom = max_zoom
+        self.workers = workers
+        self.url, self.layer, self.time = url, layer, time
+        self._fetch = fetch if fetch is not None else self._fetch_wms
+        self._wms = None
+        self._wms_lock = threading.Lock()
+
+        if cache_dir is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+            # Tiles of different sources must not share a directory
+            source = hashlib.sha1(f"{url}|{layer}|{time}|{tile_size}".encode()).hexdigest()[:16]
+            cache_dir = os.path.join(cache_home, "geo_tiff_converter", "tiles", source)
+        self.cache = TileCache(cache_dir, max_cache_bytes)
+
+    def get_image(self, bbox, size=(1200, 600)):
+        """
+        Retrieve the imagery of a bounding box.
+
+        Args:
+        bbox (tuple): The (min_lon, min_lat, max_lon, max_lat) bounding box.
+        size (tuple, optional): The (width, height) of the image in pixels. Defaults to (1200, 600).
+
+        Returns:
+        np.array: The imagery of the bounding box as an RGBA numpy array of shape (height, width, 4).
+        """
+
+        min_lon, min_lat, max_lon, max_lat = bbox
+        assert min_lon < max_lon and min_lat < max_lat, "Bounding box is empty"
+
+        zoom = self.get_zoom(max_lon - min_lon, size[0])
+        degrees = self.get_tile_degrees(zoom)
+        col0, row0 = self.get_tile(min_lon, max_lat, zoom)
+        col1, row1 = self.get_tile(max_lon, min_lat, zoom)
+
+        tiles = [(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+        images = self.get_tiles(zoom, tiles)
+
+        # Stitch the tiles and crop them to the bounding box
+        t = self.tile_size
+        canvas = Image.new("RGBA", ((col1 - col0 + 1) * t, (row1 - row0 + 1) * t))
+        for (row, col), image in zip(tiles, images):
+            canvas.paste(image, ((col - col0) * t, (row - row0) * t))
+
+        px = t / degrees
+        left = (min_lon + 180 - col0 * degrees) * px
+        top = (90 - max_lat - row0 * degrees) * px
+        right = (max_lon + 180 - col0 * degrees) * px
+        bottom = (90 - min_lat - row0 * degrees) * px
+        image = canvas.resize(size, Image.BILINEAR, box=(left, top, right, bottom))
+        return np.array(image)
+
+    def get_tiles(self, zoom, tiles):
+        """
+        Retrieve tiles of a zoom level, fetching those that are not cached concurrently.
+
+        Args:
+        zoom (int): The zoom level.
+        tiles (list): The (row, col) indices of the tiles.
+
+        Returns:
+        list: The tiles as RGBA PIL images, in the order of the given indices.
+        """
+
+        contents = [self.cache.get(self._name(zoom, row, col)) for row, col in tiles]
+        missing = [i for i, content in enumerate(contents) if content is None]
+
+        def fetch(i):
+            row, col = tiles[i]
+            content = self._fetch(self.get_tile_bbox(zoom, row, col), (self.tile_size, self.tile_size))
+            self.cache.put(self._name(zoom, row, col), content)
+            return content
+
+        Instrumentation.count("tiles.cached", len(tiles) - len(missing))
+        Instrumentation.count("tiles.fetched", len(missing))
+        if len(missing) > 0:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for i, content in zip(missing, executor.map(fetch, missing)):
+                    contents[i] = content
+
+        return [Image.open(BytesIO(content)).convert("RGBA") for content in contents]
+
+    def get_zoom(self, degrees, pixels):
+        """
+        Get the coarsest zoom level providing a required resolution.
+
+        Args:
+        degrees (float): The longitudinal extent of an image.
+        pixels (int): The width of the image in pixels.
+
+        Returns:
+        int: The zoom level, at most max_zoom.
+        """
+
+        zoom = math.ceil(math.log2(max(pixels * 180 / (degrees * self.tile_size), 1)))
+        return min(zoom, self.max_zoom)
+
+    def get_tile_degrees(self, zoom):
+        """
+        Get the extent of a tile in degrees.
+
+        Args:
+        zoom (int): The zoom level.
+
+        Returns:
+        float: The extent of a tile at the zoom level in both directions.
+        """
+
+        return 180 / 2 ** zoom
+
+    def get_tile(self, lon, lat, zoom):
+        """
+        Get the tile containing a position.
+
+        Args:
+        lon (float): The longitude of the position.
+        lat (float): The latitude of the position.
+        zoom (int): The zoom level.
+
+        Returns:
+        tuple: The (col, row) index of the tile, counted from (-180, 90).
+        """
+
+        degrees = self.get_tile_degrees(zoom)
+        col = min(int((lon + 180) // degrees), 2 ** (zoom + 1) - 1)
+        row = min(int((90 - lat) // degrees), 2 ** zoom - 1)
+        return col, row
+
+    def get_tile_bbox(self, zoom, row, col):
+        """
+        Get the bounding box of a tile.
+
+        Args:
+        zoom (int): The zoom level.
+        row (int): The row of the tile.
+        col (int): The column of the tile.
+
+        Returns:
+        tuple: The (min_lon, min_lat, max_lon, max_lat) bounding box of the tile.
+        """
+
+        degrees = self.get_tile_degrees(zoom)
+        return (-180 + col * degrees, 90 - (row + 1) * degrees,
+                -180 + (col + 1) * degrees, 90 - row * degrees)
+
+    def _name(self, zoom, row, col):
+        return f"{zoom}_{row}_{col}.png"
+
+    def _fetch_wms(self, bbox, size):
+        """
+        Fetch an image from the WMS service, connecting to it on first use.
+        """
+
+        with self._wms_lock:
+            if self._wms is None:
+                self._wms = WebMapService(self.url, version="1.1.1")
+        resp = self._wms.getmap(layers=[self.layer],  # Layers
+                                srs="epsg:4326",  # Map projection
+                                bbox=bbox,  # Bounds
+                                size=size,  # Image size
+                                time=self.time,  # Time of data
+                                format="image/png",  # Image format
+                                transparent=True)  # Nodata transparency
+        return resp.read()
@@ -1,5 +1,19 @@
+import logging
+
+# The package is silent unless the application configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+from .Instrumentation import Instrumentation
 from .TiffFile import TiffFile
+from .TileCatalog import TileCatalog
+from .StreamingHistogram import StreamingHistogram
+from .RasterStatistics import RasterStatistics
+from .DatasetPool import DatasetPool
 from .MeshUtil import MeshUtil
 from .Cartographer import Cartographer
+from .TileCache import TileCache
+from .TileImagery import TileImagery
+from .Geocoder import Geocoder
+from .BatchConverter import BatchConverter
 from .Coordinate import *
 from . import Solids
\ No newline at end of file
@@ -0,0 +1,69 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+class SyntheticDem:
+    """
+    A class that provides static methods to generate deterministic synthetic elevation models.
+    """
+
+    @staticmethod
+    def elevation(rows, cols, seed=0):
+        """
+        Compute the synthetic elevation at pixel positions.
+
+        Args:
+        rows (np.ndarray): The row positions.
+        cols (np.ndarray): The column positions, broadcastable against rows.
+        seed (int, optional): Selects the terrain. Defaults to 0.
+
+        Returns:
+        np.ndarray: The elevation in meters, a mix of rolling hills, ridges and fine roughness.
+
+        Note:
+        The elevation only depends on the pixel position and the seed, so every part of a model
+        can be computed on its own and models of different sizes share their common area.
+        """
+
+        rng = np.random.default_rng(seed)
+        phases = rng.random(6) * 2 * np.pi
+        hills = 40 * np.sin(rows / 97 + phases[0]) * np.cos(cols / 113 + phases[1])
+        ridges = 15 * np.abs(np.sin((rows + cols) / 41 + phases[2]))
+        roughness = 2 * np.sin(rows / 3.1 + phases[3]) * np.sin(cols / 2.7 + phases[4])
+        return (500 + hills + ridges + roughness + 0.5 * np.sin(rows * cols / 7 + phases[5])).astype("float32")
+
+    @staticmethod
+    def write(path, width, height, left=2600000.0, top=1200000.0, res=0.5, seed=0, block=256, chunk_rows=1024):
+        """
+        Write a synthetic elevation model to a tiled GeoTIFF file.
+
+        Args:
+        path (str): The path of the GeoTIFF.
+        width (int): The number of columns.
+        height (int): The number of rows.
+        left (float, optional): The easting of the left edge, in EPSG:2056. Defaults to 2600000.0.
+        top (float, optional): The northing of the top edge, in EPSG:2056. Defaults to 1200000.0.
+        res (float, optional): The ground resolution in meters. Defaults to 0.5.
+        seed (int, optional): Selects the terrain, see elevation. Defaults to 0.
+        block (int, optional): The size of the GeoTIFF's square blocks. Defaults to 256.
+        chunk_rows (int, optional): The number of rows generated at once. Defaults to 1024.
+
+        Note:
+        The model is generated in chunks of rows, so even very large models are written with
+        bounded memory.
+        """
+
+        profile = {"driver": "GTiff", "width": width, "height": height, "count": 1, "dtype": "float32",
+                   "crs": "EPSG:2056", "nodata": -9999.0, "transform": from_origin(left, top, res, res),
+                   "tiled": True, "blockxsize": block, "blockysize": block, "BIGTIFF": "IF_SAFER"}
+
+        cols = np.arange(width)[np.newaxis, :]
+        with rasterio.open(path, "w", **profile) as dst:
+            for row_off in range(0, height, chunk_rows):
+                rows = np.arange(row_off, min(row_off + chunk_rows, height))[:, np.newaxis]
+                data = SyntheticDem.elevation(rows, cols, seed)
+                dst.write(data, 1, window=Window(0, row_off, width, len(rows)))
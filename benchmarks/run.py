@@ -0,0 +1,204 @@
+# Author: Sven Pfiffner
+# Created: October 2026
+#
+# Benchmarks the stages of the conversion pipeline on synthetic elevation models.
+#
+# Every stage runs in a fresh subprocess, so its peak memory is not inflated by earlier stages.
+# Usage:
+#   python -m benchmarks.run --sizes 256 1024 --out results.json
+#   python -m benchmarks.run --baseline benchmarks/baseline.json
+#
+# benchmarks/baseline.json is the committed reference, recorded with
+#   python -m benchmarks.run --threshold 0.25 --out benchmarks/baseline.json
+# It stores its tolerated regression, which --threshold overrides. Timings only compare on the
+# machine the baseline was recorded on, so CI compares the memory of the stages only (--memory-only).
+# Rerecord it on the reference machine whenever a stage is intentionally made slower or larger.
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+
+STAGES = ["to_numpy", "pc_from_tiff", "union", "mesh_from_pc", "save"]
+
+
+def peak_rss_mb():
+    """
+    The peak resident set size of the current process in MiB.
+    """
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def dem_path(workdir, size, seed=0):
+    """
+    The path of a synthetic elevation model, generating it if it does not exist yet.
+    """
+
+    from .SyntheticDem import SyntheticDem
+
+    path = os.path.join(workdir, f"dem_{size}_{seed}.tif")
+    if not os.path.exists(path):
+        # Neighbouring models are placed next to each other, so they can be merged
+        SyntheticDem.write(path + ".tmp", size, size, left=2600000.0 + seed * size * 0.5, seed=seed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def run_stage(stage, size, workdir):
+    """
+    Set up and time a single stage in the current process.
+
+    Returns:
+    dict: The duration of the stage, the peak memory after the imports, after setting up the
+    stage and after running it, and rss_mb, how far running the stage raised the peak memory.
+    """
+
+    import GeoTIFFConverter as tiff
+    import_rss = peak_rss_mb()
+
+    path = dem_path(workdir, size)
+    if stage == "to_numpy":
+        file = tiff.TiffFile(path)
+        run = file.to_numpy
+    elif stage == "pc_from_tiff":
+        file = tiff.TiffFile(path)
+        run = lambda: tiff.Solids.TiffPc.fromTiffFile(file)
+    elif stage == "union":
+        a = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path))
+        b = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(dem_path(workdir, size, seed=1)))
+        run = lambda: a.union(b)
+    elif stage == "mesh_from_pc":
+        pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path))
+        run = lambda: tiff.Solids.TiffMesh.fromTiffPc(pc)
+    elif stage == "save":
+        pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path))
+        out = os.path.join(workdir, f"save_{size}.ply")
+        run = lambda: pc.save(out)
+    else:
+        raise ValueError(f"Unknown stage {stage}")
+
+    setup_rss = peak_rss_mb()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    peak_rss = peak_rss_mb()
+    return {"seconds": seconds, "import_rss_mb": import_rss, "setup_rss_mb": setup_rss,
+            "peak_rss_mb": peak_rss, "rss_mb": peak_rss - setup_rss}
+
+
+def measure(stage, size, workdir, repeat=1):
+    """
+    Measure a stage in fresh subprocesses.
+
+    Returns:
+    dict: The fastest duration and the highest peak memory of all repetitions. rss_mb is the
+    growth of the peak memory while the stage ran, beyond the imports and the inputs set up for
+    it, which dominate the peak of small models.
+    """
+
+    runs = []
+    for _ in range(repeat):
+        cmd = [sys.executable, "-m", "benchmarks.run", "--stage", stage, "--sizes", str(size), "--workdir", workdir]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    return {"stage": stage, "size": size, "seconds": min(r["seconds"] for r in runs),
+            "setup_rss_mb": max(r["setup_rss_mb"] for r in runs),
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+            "rss_mb": max(r["rss_mb"] for r in runs)}
+
+
+def compare(results, baseline, threshold=0.25, min_seconds=0.05, min_rss_mb=8.0, memory_only=False):
+    """
+    Compare benchmark results against a baseline.
+
+    Args:
+    results (dict): The benchmark results.
+    baseline (dict): The baseline results.
+    threshold (float, optional): The relative slowdown or memory growth tolerated. Defaults to 0.25.
+    min_seconds (float, optional): Absolute slowdown tolerated for very fast stages, to ignore noise.
+    Defaults to 0.05.
+    min_rss_mb (float, optional): Absolute memory growth tolerated, to ignore allocator noise. Defaults to 8.0.
+    memory_only (bool, optional): Wether only the memory is compared, e.g. on other hardware than
+    the baseline was recorded on. Defaults to False.
+
+    Returns:
+    list: A description of every regressed stage, empty if nothing regressed.
+    """
+
+    reference = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results["results"]:
+        base = reference.get((r["stage"], r["size"]))
+        if base is None:
+            continue
+        name = f"{r['stage']}@{r['size']}"
+        if not memory_only and r["seconds"] > base["seconds"] * (1 + threshold) + min_seconds:
+            regressions.append(f"{name}: {r['seconds']:.3f} s vs. {base['seconds']:.3f} s")
+        if r["rss_mb"] > base["rss_mb"] * (1 + threshold) + min_rss_mb:
+            regressions.append(f"{name}: {r['rss_mb']:.1f} MiB vs. {base['rss_mb']:.1f} MiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GeoTIFFConverter pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, 1024],
+                        help="Widths and heights of the synthetic models in pixels")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="Stages to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per stage, the fastest is reported")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "geo_tiff_converter_bench"),
+                        help="Directory holding the synthetic models")
+    parser.add_argument("--out", help="Path the results are written to as json")
+    parser.add_argument("--baseline", help="Results to compare against, regressions fail the run")
+    parser.add_argument("--threshold", type=float,
+                        help="Tolerated relative regression, the one of the baseline or 0.25 by default")
+    parser.add_argument("--memory-only", action="store_true",
+                        help="Only compare the memory against the baseline, not the timings")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+
+    if args.stage is not None:
+        # Child process measuring a single stage
+        print(json.dumps(run_stage(args.stage, args.sizes[0], args.workdir)))
+        return 0
+
+    results = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                        "machine": platform.machine()}, "threshold": args.threshold or 0.25, "results": []}
+    for size in args.sizes:
+        # Generate the models up front, so their generation is not measured
+        dem_path(args.workdir, size)
+        if "union" in args.stages:
+            dem_path(args.workdir, size, seed=1)
+        for stage in args.stages:
+            result = measure(stage, size, args.workdir, args.repeat)
+            results["results"].append(result)
+            print(f"{stage:>14}@{size:<6} {result['seconds']:9.3f} s {result['rss_mb']:9.1f} MiB")
+
+    if args.out is not None:
+        with open(args.out, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        threshold = args.threshold if args.threshold is not None else baseline.get("threshold", 0.25)
+        regressions = compare(results, baseline, threshold, memory_only=args.memory_only)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# Batch conversion of GeoTIFF tiles
+#
+# Converts every tile listed in a text file (one path per line) in parallel and records the
+# completed tiles in a manifest, so an interrupted run resumes where it stopped.
+# Usage:
+#   python convert.py data/tiffdata.csv out/ --format ply --resolution 2 --merge merged.ply
+
+import argparse
+import logging
+import sys
+import GeoTIFFConverter as tiff
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert GeoTIFF tiles to point clouds or meshes")
+    parser.add_argument("tiles", help="Text file listing the GeoTIFF tiles, one path per line")
+    parser.add_argument("output_dir", help="Directory the converted tiles and the manifest are written to")
+    formats = tiff.BatchConverter.POINT_FORMATS + tiff.BatchConverter.MESH_FORMATS
+    parser.add_argument("--format", default="ply", choices=formats,
+                        help="Output format, point clouds for pcd/ply and meshes for obj/glb")
+    parser.add_argument("--workers", type=int, help="Number of worker processes, every core by default")
+    parser.add_argument("--manifest", help="Path of the manifest, manifest.jsonl in the output directory by default")
+    parser.add_argument("--resolution", type=float, help="Target ground resolution of the geometry")
+    parser.add_argument("--method", choices=["grid", "adaptive", "poisson"], help="Meshing method of obj/glb")
+    parser.add_argument("--max-error", type=float, help="Maximum vertical error of the adaptive meshing method")
+    parser.add_argument("--normal-mode", choices=["knn", "gradient"], help="Normal computation of pcd/ply")
+    parser.add_argument("--merge", help="Path the merged geometry of all tiles is written to")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    params = {"resolution": args.resolution}
+    if args.format in tiff.BatchConverter.MESH_FORMATS:
+        params.update({k: v for k, v in (("method", args.method), ("max_error", args.max_error)) if v is not None})
+    elif args.normal_mode is not None:
+        params["normal_mode"] = args.normal_mode
+
+    converter = tiff.BatchConverter(args.output_dir, format=args.format, workers=args.workers,
+                                    manifest=args.manifest, **params)
+
+    def progress(count, total):
+        logging.info("Completed %d/%d tiles", count, total)
+
+    records = converter.run(tiff.BatchConverter.readTileList(args.tiles), merge=args.merge, progress=progress)
+    failed = [r for r in records if r["status"] != "done"]
+    for r in failed:
+        logging.error("%s: %s", r["tile"], r["error"])
+    return 1 if len(failed) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
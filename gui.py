@@ -1,24 +1,50 @@
 import GeoTIFFConverter as tiff
 import gradio as gr
+import os
+import tempfile
+
+# Uploads get new paths on every upload, so sources are identified by their content
+solid_cache = tiff.Solids.SolidCache(os.path.join(tempfile.gettempdir(), "geo_tiff_converter_solids"),
+                                     hash_content=True)
 
 def visualize_tif(tiff_raw):
     data = tiff.TiffFile(tiff_raw[0])
     return data.visualize()
 
-def generate_mesh(tiff_raw, downsample, add_base, height):
-    # TODO: Implement with new solid system
-    pass
+def generate_mesh(tiff_raw, downsample, height):
+    # Merge all inputs into one raster and read it at the requested ground resolution
+    files = [tiff.TiffFile(path, lazy=True) for path in tiff_raw]
+    resolution = downsample if downsample > 0 else None
+    if len(files) == 1:
+        mesh = solid_cache.fromTiffFile(tiff.Solids.TiffMesh, files[0], method="grid", resolution=resolution)
+    else:
+        # Merge at the native resolution, so several files are decimated like a single one
+        mesh = tiff.Solids.TiffMesh.fromTiffFile(tiff.TiffFile.mosaic(files), method="grid", resolution=resolution)
+
+    mesh.translate((0, height or 0, 0))
+
+    path = os.path.join(tempfile.mkdtemp(), "mesh.obj")
+    mesh.save(path)
+    return path
+
+def plot_characteristics(tiff_raw):
+    # Statistics are computed window by window, so large files are never loaded at once
+    stats = tiff.RasterStatistics.fromTiffFiles([tiff.TiffFile(tiff_raw, lazy=True)])
+    return [stats.plot_elevation(), stats.plot_hypsometry(), stats.plot_slope(), stats.plot_aspect()]
 
 def retrieve_geo_data(tiff_raw):
     # Read bounding coordinates from TIFF
     data = tiff.TiffFile(tiff_raw)
     box_coords = data.get_bounding_coordinates()
 
-    # Retrieve address of bbox center
+    # Convert corners and bbox center to latlong in one go
     center_coord = tiff.Coordinate.get_midpoint(box_coords[0], box_coords[1])
-    address = tiff.Cartographer.coord_to_address(center_coord.as_latlong())
+    bottom_left, top_right, center_coord = tiff.CoordinateArray.fromCoordinates([*box_coords, center_coord]).as_latlong()
+
+    # Retrieve address of bbox center
+    address = tiff.Cartographer.coord_to_address(center_coord)
 
-    location_text = f"Region is bound by (lat, lon)\n   Bottom-Left: {box_coords[0].as_latlong().to_numpy().T}\n    Top-Right: {box_coords[1].as_latlong().to_numpy().T}\nin the EPSG:4326 system"
+    location_text = f"Region is bound by (lat, lon)\n   Bottom-Left: {bottom_left.to_numpy().T}\n    Top-Right: {top_right.to_numpy().T}\nin the EPSG:4326 system"
     location_text += f"\n\nThis corresponds rougly to {address}"
     return [location_text, "World"]
 
@@ -40,10 +66,8 @@ with gr.Blocks() as demo:
                 visualization_output = gr.Plot()
             #Mesh site
             with gr.Column():
-                voxel_downsampling = gr.Slider(label="Downsampling strength", minimum=0, maximum=50, value=20, step=1)
-                with gr.Row():
-                    lowest_height = gr.Number(label="Height of lowest vertex", minimum=0)
-                    include_base = gr.Radio(label="Add base to mesh", choices=["True", "False"], value="False")
+                voxel_downsampling = gr.Slider(label="Downsampling strength (ground resolution in m)", minimum=0, maximum=50, value=20, step=1)
+                lowest_height = gr.Number(label="Height of lowest vertex", minimum=0)
                 mesh_button = gr.Button("Generate Mesh")
                 mesh_output = gr.Model3D()
 
@@ -57,11 +81,11 @@ with gr.Blocks() as demo:
             with gr.Column():
                 data_analysis_plots_button = gr.Button("Plot characteristics")
                 with gr.Row():
-                    gr.Plot()
-                    gr.Plot()
+                    elevation_plot = gr.Plot()
+                    hypsometry_plot = gr.Plot()
                 with gr.Row():
-                    gr.Plot()
-                    gr.Plot()
+                    slope_plot = gr.Plot()
+                    aspect_plot = gr.Plot()
             with gr.Column():
                 data_analysis_geo_button = gr.Button("Retrieve Geo-Information")
                 data_analysis_geo_text = gr.Textbox(label="Location", lines=5)
@@ -73,7 +97,8 @@ with gr.Blocks() as demo:
 
 
     visualization_button.click(fn=visualize_tif, inputs=[input_tiffs_elevation], outputs=visualization_output)
-    mesh_button.click(fn=generate_mesh, inputs=[input_tiffs_elevation, voxel_downsampling, include_base, lowest_height], outputs=mesh_output)
+    mesh_button.click(fn=generate_mesh, inputs=[input_tiffs_elevation, voxel_downsampling, lowest_height], outputs=mesh_output)
+    data_analysis_plots_button.click(fn=plot_characteristics, inputs=[input_tiff_analysis], outputs=[elevation_plot, hypsometry_plot, slope_plot, aspect_plot])
     data_analysis_geo_button.click(fn=retrieve_geo_data, inputs=[input_tiff_analysis], outputs=[data_analysis_geo_text, data_analysis_geo_image])
     data_analysis_meta_button.click(fn=retrieve_meta_data, inputs=[input_tiff_analysis], outputs=data_analysis_meta_text)
 
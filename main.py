@@ -10,10 +10,8 @@ def files_to_mesh():
     file3 = tiff.TiffFile("data/input/3.tif")
     file4 = tiff.TiffFile("data/input/4.tif")
 
-    pcd = tiff.Solids.TiffPc.fromTiffFile(file1)
-    pcd.union(tiff.Solids.TiffPc.fromTiffFile(file2))
-    pcd.union(tiff.Solids.TiffPc.fromTiffFile(file3))
-    pcd.union(tiff.Solids.TiffPc.fromTiffFile(file4))
+    pcd = tiff.Solids.TiffPc.union_many([tiff.Solids.TiffPc.fromTiffFile(f)
+                                         for f in (file1, file2, file3, file4)])
 
     mesh = tiff.Solids.TiffMesh.fromTiffPc(pcd)
     return mesh
@@ -26,21 +24,16 @@ mesh.render(render_options=options)
 
 
 # Load csv resource into TiffFile objects
+# For large collections, prefer the batch converter, which converts tiles in parallel and resumes
+# interrupted runs: python convert.py data/tiffdata.csv out/ --format pcd --merge davos_pcd.pcd
 """
 with open("data/tiffdata.csv") as file:
     paths = [line.rstrip() for line in file]
 tiff_collection = tiff.TiffFile.fromCollection(paths)
 
 # Merge to pointcloud
-start = time.time()
-pcd = tiff.Solids.TiffPc.fromTiffFile(tiff_collection[0], downsample_voxel_size=50)
-end = time.time()
-print(f"\033[94mMerge will take approximately {len(tiff_collection) * int(end - start)}s\033[0m")
-for i in range(1, len(tiff_collection)):
-    print(f"\033[94mMerging {i+1}/{len(tiff_collection)}\033[0m", end='\r')
-    appendix = tiff.Solids.TiffPc.fromTiffFile(tiff_collection[i], downsample_voxel_size=50 )
-    pcd.union(appendix)
-print("")
+pcd = tiff.Solids.TiffPc.union_many([tiff.Solids.TiffPc.fromTiffFile(t, downsample_voxel_size=50)
+                                     for t in tiff_collection])
 pcd.save("davos_pcd.pcd")
 pcd.render()
 """
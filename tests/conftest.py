@@ -0,0 +1,41 @@
+# Shared fixtures providing synthetic GeoTIFF files
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+
+def write_dem(path, width, height, left=2600000.0, top=1200000.0, res=0.5,
+              nodata=None, block=16, seed=0, crs="EPSG:2056"):
+    """
+    Write a deterministic synthetic elevation model to a GeoTIFF file.
+
+    Returns:
+    np.array: The elevation data written to the file.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.mgrid[0:height, 0:width]
+    data = (500 + 10 * np.sin(rows / 7) + 5 * np.cos(cols / 5)
+            + rng.random((height, width))).astype("float32")
+
+    profile = {"driver": "GTiff", "width": width, "height": height, "count": 1,
+               "dtype": "float32", "crs": crs, "nodata": nodata,
+               "transform": from_origin(left, top, res, res)}
+    if block is not None:
+        profile.update(tiled=True, blockxsize=block, blockysize=block)
+
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return data
+
+
+@pytest.fixture
+def dem(tmp_path):
+    """
+    Factory fixture creating synthetic elevation GeoTIFFs in a temporary directory.
+    """
+    def make(name="dem.tif", width=40, height=30, **kwargs):
+        path = str(tmp_path / name)
+        data = write_dem(path, width, height, **kwargs)
+        return path, data
+    return make
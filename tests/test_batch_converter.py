@@ -0,0 +1,69 @@
+# Tests for the BatchConverter class in BatchConverter.py
+import json
+import os
+import numpy as np
+import open3d as o3d
+import GeoTIFFConverter as tiff
+
+def make_tiles(dem, tmp_path):
+    paths = [dem(f"{i}.tif", width=10, height=10, left=2600000.0 + 5 * i, seed=i)[0] for i in range(3)]
+    listing = tmp_path / "tiles.csv"
+    listing.write_text("# tiles\n" + "\n".join(os.path.basename(p) for p in paths) + "\n")
+    return paths, str(listing)
+
+
+def test_convert_and_merge(dem, tmp_path):
+    paths, listing = make_tiles(dem, tmp_path)
+    assert tiff.BatchConverter.readTileList(listing) == paths
+
+    converter = tiff.BatchConverter(str(tmp_path / "out"), format="ply", workers=2, normal_mode="gradient")
+    records = converter.run(paths, merge=str(tmp_path / "merged.ply"))
+
+    assert [r["tile"] for r in records] == paths
+    assert all(r["status"] == "done" and os.path.exists(r["output"]) for r in records)
+    assert records[1]["world_origin"][0] == 2600005.0
+
+    merged = np.asarray(o3d.io.read_point_cloud(str(tmp_path / "merged.ply")).points)
+    assert len(merged) == 300
+    assert np.isclose(merged[:, 0].max(), 14.75)
+
+
+def test_resume_skips_completed_tiles(dem, tmp_path):
+    paths, _ = make_tiles(dem, tmp_path)
+    converter = tiff.BatchConverter(str(tmp_path / "out"), format="obj", workers=2, method="grid")
+    converter.run(paths[:2])
+
+    # A crash while writing leaves a partial line behind, which is ignored
+    with open(converter.manifest, "a") as file:
+        file.write('{"tile": "')
+
+    records = converter.run(paths)
+    with open(converter.manifest) as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 4
+    assert lines[2] == '{"tile": "'
+    assert json.loads(lines[-1])["tile"] == paths[2]
+    assert len(o3d.io.read_triangle_mesh(records[2]["output"]).triangles) == 2 * 9 * 9
+
+
+def test_failed_tiles_are_retried(dem, tmp_path):
+    paths, _ = make_tiles(dem, tmp_path)
+    missing = str(tmp_path / "missing.tif")
+    converter = tiff.BatchConverter(str(tmp_path / "out"), format="pcd", workers=1)
+
+    records = converter.run([paths[0], missing], merge=str(tmp_path / "merged.pcd"))
+    assert records[1]["status"] == "failed"
+    assert not os.path.exists(tmp_path / "merged.pcd")
+    assert missing not in converter.completed()
+
+
+def test_changed_parameters_convert_tiles_again(dem, tmp_path):
+    paths, _ = make_tiles(dem, tmp_path)
+    tiff.BatchConverter(str(tmp_path / "out"), format="ply", workers=2).run(paths)
+
+    converter = tiff.BatchConverter(str(tmp_path / "out"), format="ply", workers=2, resolution=1.0)
+    assert converter.completed() == {}
+    records = converter.run(paths, merge=str(tmp_path / "merged.ply"))
+    assert len(o3d.io.read_point_cloud(records[0]["output"]).points) == 25
+    assert len(o3d.io.read_point_cloud(str(tmp_path / "merged.ply")).points) == 3 * 25
+    assert set(converter.completed()) == set(paths)
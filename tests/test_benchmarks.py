@@ -0,0 +1,41 @@
+# Tests for the benchmark helpers in benchmarks/
+import json
+import os
+import numpy as np
+import rasterio
+from benchmarks.SyntheticDem import SyntheticDem
+from benchmarks.run import STAGES, compare
+
+def test_synthetic_dem_is_deterministic(tmp_path):
+    SyntheticDem.write(str(tmp_path / "a.tif"), 300, 200, chunk_rows=64)
+    SyntheticDem.write(str(tmp_path / "b.tif"), 100, 100)
+    with rasterio.open(tmp_path / "a.tif") as a, rasterio.open(tmp_path / "b.tif") as b:
+        # Models of different sizes share their common area
+        assert np.array_equal(a.read(1)[:100, :100], b.read(1))
+        assert a.crs == "EPSG:2056"
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"stage": "save", "size": 256, "seconds": 1.0, "rss_mb": 100.0}]}
+    same = {"results": [{"stage": "save", "size": 256, "seconds": 1.1, "rss_mb": 105.0}]}
+    slow = {"results": [{"stage": "save", "size": 256, "seconds": 2.0, "rss_mb": 200.0},
+                        {"stage": "save", "size": 512, "seconds": 9.0, "rss_mb": 900.0}]}
+
+    assert compare(same, baseline, threshold=0.25) == []
+    assert len(compare(slow, baseline, threshold=0.25)) == 2
+
+
+def test_committed_baseline_covers_every_stage():
+    with open(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "baseline.json")) as file:
+        baseline = json.load(file)
+    assert baseline["threshold"] > 0
+    assert {(r["stage"], r["size"]) for r in baseline["results"]} >= {(s, 256) for s in STAGES}
+
+
+def test_compare_memory_only_ignores_timings():
+    baseline = {"results": [{"stage": "save", "size": 256, "seconds": 1.0, "rss_mb": 100.0}]}
+    slow = {"results": [{"stage": "save", "size": 256, "seconds": 2.0, "rss_mb": 105.0}]}
+    large = {"results": [{"stage": "save", "size": 256, "seconds": 1.0, "rss_mb": 200.0}]}
+
+    assert compare(slow, baseline, memory_only=True) == []
+    assert len(compare(large, baseline, memory_only=True)) == 1
@@ -0,0 +1,46 @@
+# Tests for the Coordinate classes in Coordinate.py
+import numpy as np
+import GeoTIFFConverter as tiff
+
+def test_transformer_is_cached():
+    t1 = tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326")
+    t2 = tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326")
+    t3 = tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326", always_xy=True)
+    assert t1 is t2
+    assert t1 is not t3
+
+def test_transformer_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(tiff.Coordinate, "max_transformers", 2)
+    t1 = tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326")
+    tiff.Coordinate.get_transformer("epsg:2056", "epsg:3857")
+    assert tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326") is t1
+
+    # The least recently used transformer is dropped
+    tiff.Coordinate.get_transformer("epsg:2056", "epsg:21781")
+    assert len(tiff.Coordinate._transformers.cache) == 2
+    assert tiff.Coordinate.get_transformer("epsg:2056", "epsg:4326") is t1
+    assert ("epsg:2056", "epsg:3857", False) not in tiff.Coordinate._transformers.cache
+
+def test_convert_same_projection():
+    coord = tiff.Coordinate((1.0, 2.0), "epsg:2056").convert("epsg:2056")
+    assert isinstance(coord, tiff.Coordinate)
+    assert (coord.x, coord.y) == (1.0, 2.0)
+
+def test_coordinate_array_matches_coordinate():
+    coords = [tiff.Coordinate((2600000 + i * 1000, 1200000 + i * 500), "epsg:2056") for i in range(5)]
+    array = tiff.CoordinateArray.fromCoordinates(coords).as_latlong()
+
+    assert len(array) == 5
+    assert array.to_numpy().shape == (2, 5)
+    for i, coord in enumerate(coords):
+        expected = coord.as_latlong()
+        assert np.isclose(array[i].x, expected.x) and np.isclose(array[i].y, expected.y)
+    assert len(array[1:3]) == 2
+
+def test_bounding_coordinates_conversion(dem):
+    path, _ = dem("bbox.tif", 20, 10)
+    bottom_left, top_right = tiff.TiffFile(path).get_bounding_coordinates("epsg:4326")
+    assert bottom_left.proj_string == "epsg:4326"
+    # Lat-long axis order, Switzerland lies north-east of (45, 5)
+    assert 45 < bottom_left.x < top_right.x < 48
+    assert 5 < bottom_left.y < top_right.y < 11
@@ -1,5 +1,6 @@
 # Tests for the TiffFile class in geo_tiff.py
 import GeoTIFFConverter as tiff
+import numpy as np
 
 def test_read_tiff():
     data = tiff.TiffFile("tests/1.tif") 
@@ -14,3 +15,170 @@ def test_tiff_from_collection():
     merged_data = tiff.TiffFile.fromCollection(paths)
 
 
+def test_iter_windows_covers_raster(dem):
+    path, data = dem(width=40, height=30)
+    tiff_file = tiff.TiffFile(path)
+
+    out = np.full(data.shape, np.nan, dtype=data.dtype)
+    for window, chunk in tiff_file.iter_windows():
+        assert chunk.shape == (window.height, window.width)
+        assert window.height <= 16 and window.width <= 16
+        out[window.toslices()] = chunk
+    assert np.array_equal(out, data)
+
+
+def test_iter_windows_rounds_to_blocks(dem):
+    path, data = dem(width=40, height=30)
+    windows = [w for w, _ in tiff.TiffFile(path).iter_windows(window_size=(20, 20))]
+    assert windows[0].height == 30 and windows[0].width == 32
+    assert len(windows) == 2
+
+
+def test_to_numpy_single_band(dem):
+    path, data = dem()
+    assert np.array_equal(tiff.TiffFile(path).to_numpy(band=1), data)
+
+
+def test_lazy_tiff_reads_header_only(dem):
+    path, data = dem(width=40, height=30)
+    lazy = tiff.TiffFile(path, lazy=True)
+
+    assert lazy._key not in tiff.TiffFile.pool
+    assert (lazy.width, lazy.height) == (40, 30)
+    assert lazy.get_bounding_coordinates()[0].x == 2600000.0
+    assert lazy._key not in tiff.TiffFile.pool
+
+    assert np.array_equal(lazy.to_numpy(band=1), data)
+
+
+def test_parallel_collection_keeps_order(dem):
+    paths = [dem(f"{i}.tif", width=10 + i, height=10)[0] for i in range(6)]
+    reported = []
+
+    collection = tiff.TiffFile.fromCollection(paths, lazy=True, workers=3,
+                                              progress=lambda count, total: reported.append((count, total)))
+
+    assert [t.path for t in collection] == paths
+    assert [t.width for t in collection] == [10 + i for i in range(6)]
+    assert reported == [(i + 1, 6) for i in range(6)]
+
+
+def test_context_manager_closes_dataset(dem):
+    path, data = dem()
+    with tiff.TiffFile(path) as tiff_file:
+        assert tiff_file._key in tiff.TiffFile.pool
+    assert tiff_file._key not in tiff.TiffFile.pool
+
+    # Closed files are reopened transparently
+    assert np.array_equal(tiff_file.to_numpy(band=1), data)
+
+
+def test_pool_bounds_open_datasets(dem):
+    pool = tiff.TiffFile.pool
+    max_open = pool.max_open
+    pool.resize(2)
+    try:
+        dems = [dem(f"{i}.tif", seed=i) for i in range(5)]
+        files = [tiff.TiffFile(path) for path, _ in dems]
+        assert len(pool) == 2
+
+        for tiff_file, (_, data) in zip(files, dems):
+            assert np.array_equal(tiff_file.to_numpy(band=1), data)
+            assert len(pool) <= 2
+    finally:
+        pool.resize(max_open)
+
+
+def test_pool_defers_closing_datasets_in_use(dem):
+    pool = tiff.TiffFile.pool
+    path, _ = dem()
+    with pool.pinned("reader", path) as dataset:
+        pool.close("reader")
+        assert not dataset.closed
+        assert dataset.read(1).shape == (30, 40)
+    assert dataset.closed and "reader" not in pool
+
+
+def test_mosaic_merges_tiles(dem):
+    # 2x2 tiles of 10x10 pixels at 0.5 resolution
+    tiles, parts = [], {}
+    for i in range(2):
+        for j in range(2):
+            path, data = dem(f"{i}{j}.tif", width=10, height=10, left=2600000.0 + 5 * j,
+                             top=1200000.0 - 5 * i, seed=2 * i + j)
+            tiles.append(tiff.TiffFile(path))
+            parts[i, j] = data
+    expected = np.block([[parts[0, 0], parts[0, 1]], [parts[1, 0], parts[1, 1]]])
+
+    mosaic = tiff.TiffFile.mosaic(tiles)
+    assert np.array_equal(mosaic.to_numpy(band=1), expected)
+    assert mosaic.get_bounding_coordinates()[0].x == 2600000.0
+
+    subset = tiff.TiffFile.mosaic(tiles, bounds=(2600002.5, 1199992.5, 2600007.5, 1199997.5), in_memory=False)
+    assert np.array_equal(subset.to_numpy(band=1), expected[5:15, 5:15])
+
+
+def test_mosaic_reads_through_pool(dem):
+    pool = tiff.TiffFile.pool
+    tiles = [tiff.TiffFile(dem(f"{j}.tif", width=10, height=10, left=2600000.0 + 5 * j, seed=j)[0], lazy=True)
+             for j in range(2)]
+    assert not any(t._key in pool for t in tiles)
+
+    # The same TiffFile may be passed twice
+    tiff.TiffFile.mosaic(tiles + tiles[:1])
+    assert all(t._key in pool for t in tiles)
+    assert not any(t._key in pool._pins for t in tiles)
+
+
+def test_mosaic_fills_gaps_with_nodata(dem):
+    a = tiff.TiffFile(dem("a.tif", width=10, height=10, nodata=-9999.0)[0])
+    b = tiff.TiffFile(dem("b.tif", width=10, height=10, left=2600010.0, nodata=-9999.0)[0])
+
+    mosaic = tiff.TiffFile.mosaic([a, b])
+    assert mosaic.width == 30
+    assert (mosaic.to_numpy(band=1)[:, 10:20] == -9999.0).all()
+
+    pc = tiff.Solids.TiffPc.fromTiffFile(mosaic)
+    assert len(pc.data.points) == 200
+
+
+def test_mosaic_without_nodata_leaves_gaps_invalid(dem):
+    a = tiff.TiffFile(dem("a.tif", width=10, height=10)[0])
+    b = tiff.TiffFile(dem("b.tif", width=10, height=10, left=2600010.0)[0])
+
+    mosaic = tiff.TiffFile.mosaic([a, b])
+    assert np.isnan(mosaic.nodata)
+    assert np.isnan(mosaic.to_numpy(band=1)[:, 10:20]).all()
+    assert len(tiff.Solids.TiffPc.fromTiffFile(mosaic).data.points) == 200
+
+
+def test_reproject_raster(dem):
+    path, data = dem(width=60, height=50)
+    source = tiff.TiffFile(path)
+
+    warped = source.reproject("EPSG:32632", window_size=(16, 16))
+    assert warped.get_proj() == "EPSG:32632"
+
+    values = warped.to_numpy(band=1)
+    valid = ~np.isnan(values)
+    assert valid.mean() > 0.5
+    assert data.min() - 1e-3 <= values[valid].min() and values[valid].max() <= data.max() + 1e-3
+
+    # The windowed result matches warping in a single window
+    single = source.reproject("EPSG:32632", window_size=(4096, 4096)).to_numpy(band=1)
+    assert np.array_equal(values, single, equal_nan=True)
+
+
+def test_mosaic_mixed_crs(dem):
+    a = tiff.TiffFile(dem("a.tif", width=20, height=20)[0])
+    path, data = dem("b.tif", width=20, height=20, left=2600010.0, seed=1)
+    b = tiff.TiffFile(path).reproject("EPSG:32632")
+
+    mosaic = tiff.TiffFile.mosaic([a, b])
+    assert mosaic.get_proj() == a.get_proj()
+    assert np.isclose(mosaic.get_bounds()[0], 2600000.0)
+
+    values = mosaic.to_numpy(band=1)
+    assert np.array_equal(values[:, :20], a.to_numpy(band=1))
+    # The warped tile lands next to the first one, close to its original values
+    assert np.nanmean(np.abs(values[2:-2, 22:38] - data[2:-2, 2:18])) < 2.0
@@ -0,0 +1,58 @@
+# Tests for the Geocoder class in Geocoder.py
+import time
+import pytest
+import GeoTIFFConverter as tiff
+
+class FakeBackend:
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, lat, lon):
+        self.requests.append((time.monotonic(), lat, lon))
+        return f"{lat:.2f} N {lon:.2f} E"
+
+
+def test_batch_deduplicates_and_caches(tmp_path):
+    backend = FakeBackend()
+    path = str(tmp_path / "addresses.json")
+    geocoder = tiff.Geocoder(reverse=backend, cache_path=path, min_interval=0)
+
+    coords = [tiff.Coordinate((46.0, 8.0), "epsg:4326"),
+              tiff.Coordinate((46.00001, 8.00001), "epsg:4326"),  # Rounds to the first coordinate
+              tiff.Coordinate((47.0, 9.0), "epsg:4326")]
+    addresses = geocoder.reverse_many(coords)
+    assert addresses == ["46.00 N 8.00 E", "46.00 N 8.00 E", "47.00 N 9.00 E"]
+    assert len(backend.requests) == 2
+
+    # Repeats are served from the persisted cache
+    again = tiff.Geocoder(reverse=backend, cache_path=path, min_interval=0)
+    assert again.reverse_many(tiff.CoordinateArray.fromCoordinates(coords)) == addresses
+    assert len(backend.requests) == 2
+
+
+def test_requests_are_rate_limited(tmp_path):
+    backend = FakeBackend()
+    geocoder = tiff.Geocoder(reverse=backend, cache_path=str(tmp_path / "a.json"), min_interval=0.05)
+    geocoder.reverse_many([tiff.Coordinate((46.0 + i, 8.0), "epsg:4326") for i in range(3)])
+
+    times = [t for t, _, _ in backend.requests]
+    assert all(b - a >= 0.05 - 1e-3 for a, b in zip(times, times[1:]))
+
+
+def test_failed_batches_keep_found_addresses(tmp_path):
+    path = str(tmp_path / "addresses.json")
+    coords = [tiff.Coordinate((46.0 + i, 8.0), "epsg:4326") for i in range(3)]
+
+    def failing(lat, lon):
+        if lat == 48.0:
+            raise TimeoutError()
+        return None if lat == 47.0 else "found"
+
+    with pytest.raises(TimeoutError):
+        tiff.Geocoder(reverse=failing, cache_path=path, min_interval=0).reverse_many(coords)
+
+    # The address found before the failure is persisted, the missing one is requested again
+    backend = FakeBackend()
+    addresses = tiff.Geocoder(reverse=backend, cache_path=path, min_interval=0).reverse_many(coords)
+    assert addresses == ["found", "47.00 N 8.00 E", "48.00 N 8.00 E"]
+    assert [lat for _, lat, _ in backend.requests] == [47.0, 48.0]
@@ -0,0 +1,39 @@
+# Tests for the Instrumentation class in Instrumentation.py
+import pytest
+import GeoTIFFConverter as tiff
+
+def test_spans_record_pipeline_stages(dem):
+    path, _ = dem(width=20, height=15)
+    with tiff.Instrumentation.record() as records:
+        pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), downsample_voxel_size=0.6)
+
+    names = [r["name"] for r in records]
+    assert names == ["pc.points", "pc.downsample", "pc.normals", "pc.orient"]
+    assert records[0]["points"] == 300
+    assert records[1]["downsampled_points"] == len(pc.data.points)
+    for r in records:
+        assert r["seconds"] >= 0 and r["parent"] is None
+        assert r["peak_rss_mb"] is None or r["peak_rss_mb"] > 0
+
+
+def test_spans_nest_and_report_errors():
+    with tiff.Instrumentation.record() as records:
+        with pytest.raises(ValueError):
+            with tiff.Instrumentation.span("outer"):
+                with tiff.Instrumentation.span("inner", tiles=2) as span:
+                    span["triangles"] = 5
+                raise ValueError("failed")
+
+    inner, outer = records
+    assert inner["parent"] == "outer" and inner["tiles"] == 2 and inner["triangles"] == 5
+    assert "ValueError" in outer["error"]
+
+
+def test_silent_by_default(dem, capsys):
+    path, _ = dem(width=20, height=15)
+    before = tiff.Instrumentation.counters.get("pool.opened", 0)
+    tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_plane_orient=True)
+
+    captured = capsys.readouterr()
+    assert captured.out == "" and captured.err == ""
+    assert tiff.Instrumentation.counters["pool.opened"] > before
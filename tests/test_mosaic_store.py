@@ -0,0 +1,142 @@
+# Tests for the MosaicStore class in Solids/MosaicStore.py
+import os
+import pytest
+import numpy as np
+import GeoTIFFConverter as tiff
+
+
+def tile_grid(dem, rows=2, cols=3, size=10):
+    """
+    Write a grid of adjacent tiles, returning their paths in row-major order.
+    """
+    return [dem(f"tile_{r}_{c}.tif", width=size, height=size, res=1.0, seed=r * cols + c, nodata=-9999.0,
+                left=2600000.0 + c * size, top=1200000.0 - r * size)[0]
+            for r in range(rows) for c in range(cols)]
+
+
+def world_arrays(solid):
+    """
+    The arrays of a solid with absolute coordinates, with the vertices sorted.
+    """
+    arrays = dict(solid._get_arrays())
+    key = "vertices" if "vertices" in arrays else "points"
+    vertices = arrays[key] + (solid.world_origin.x, solid.origin_height, solid.world_origin.y)
+    order = np.lexsort(vertices.T)
+    arrays[key] = vertices[order]
+    for normals in ("normals", "vertex_normals"):
+        if normals in arrays:
+            arrays[normals] = arrays[normals][order]
+    return arrays
+
+
+def test_exported_mesh_matches_mesh_of_mosaic(dem, tmp_path):
+    paths = tile_grid(dem)
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), chunk_size=9)
+    store.add(paths)
+    mesh = store.export(str(tmp_path / "mosaic.ply"))
+
+    reference = tiff.Solids.TiffMesh.fromTiffFile(tiff.TiffFile.mosaic([tiff.TiffFile(p) for p in paths]),
+                                                   method="grid")
+    exported, expected = world_arrays(mesh), world_arrays(reference)
+    assert np.allclose(exported["vertices"], expected["vertices"])
+    assert len(exported["triangles"]) == len(expected["triangles"])
+    assert os.path.exists(tmp_path / "mosaic.ply")
+
+
+def test_exported_point_cloud_matches_point_cloud_of_mosaic(dem, tmp_path):
+    paths = tile_grid(dem)
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), solid="pc", chunk_size=9)
+    store.add(paths)
+
+    reference = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile.mosaic([tiff.TiffFile(p) for p in paths]),
+                                                 normal_mode="gradient")
+    exported, expected = world_arrays(store.export()), world_arrays(reference)
+    assert np.allclose(exported["points"], expected["points"])
+
+    # Normals only differ on the outer border of the mosaic, where they point up
+    inner = (exported["points"][:, 0] > 2600001) & (exported["points"][:, 0] < 2600029) \
+        & (exported["points"][:, 2] > 1199981) & (exported["points"][:, 2] < 1199999)
+    assert np.allclose(exported["normals"][inner], expected["normals"][inner])
+
+
+def test_replacing_a_tile_rebuilds_the_chunks_it_touches(dem, tmp_path):
+    paths = tile_grid(dem)
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), method="adaptive", chunk_size=9, hash_content=True)
+    everything = store.add(paths)
+
+    # Rewrite the top-left tile with other heights, but the same size and modification time
+    stat = os.stat(paths[0])
+    dem("tile_0_0.tif", width=10, height=10, res=1.0, seed=42, nodata=-9999.0)
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(paths[0]).st_size == stat.st_size
+
+    # Identifying tiles by modification time and size misses the rewrite
+    assert tiff.Solids.MosaicStore(str(tmp_path / "store")).add([paths[0]]) == []
+
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), hash_content=True)
+    rebuilt = store.add([paths[0]])
+    assert 0 < len(rebuilt) < len(everything)
+    assert all(i <= 1 and j <= 1 for i, j in rebuilt)
+    assert store.add([paths[0]]) == []
+
+    fresh = tiff.Solids.MosaicStore(str(tmp_path / "fresh"), method="adaptive", chunk_size=9)
+    fresh.add(paths)
+    updated, expected = world_arrays(store.export()), world_arrays(fresh.export())
+    assert np.allclose(updated["vertices"], expected["vertices"])
+    assert len(updated["triangles"]) == len(expected["triangles"])
+
+
+def test_removing_tiles(dem, tmp_path):
+    paths = tile_grid(dem)
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), solid="pc", chunk_size=9)
+    store.add(paths)
+    store.remove(paths[3:])
+
+    points = world_arrays(store.export())["points"]
+    assert len(points) == 3 * 100
+    assert points[:, 2].min() > 1199990
+
+
+def test_failed_update_is_repeated(dem, tmp_path, monkeypatch):
+    paths = tile_grid(dem)
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), solid="pc", chunk_size=9)
+    build_chunk = tiff.Solids.MosaicStore._build_chunk
+    calls = []
+
+    def failing_build_chunk(self, catalog, chunk):
+        calls.append(chunk)
+        if len(calls) == 1:
+            raise OSError("Disk full")
+        return build_chunk(self, catalog, chunk)
+
+    monkeypatch.setattr(tiff.Solids.MosaicStore, "_build_chunk", failing_build_chunk)
+    with pytest.raises(OSError):
+        store.add(paths)
+    assert not os.path.exists(tmp_path / "store" / "catalog.npz")
+
+    # The store does not record the failed update, so adding the tiles again rebuilds every chunk
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), solid="pc", chunk_size=9)
+    assert calls[0] in store.add(paths)
+    fresh = tiff.Solids.MosaicStore(str(tmp_path / "fresh"), solid="pc", chunk_size=9)
+    fresh.add(paths)
+    assert np.allclose(world_arrays(store.export())["points"], world_arrays(fresh.export())["points"])
+
+
+def test_chunks_ignore_mosaics_a_pixel_off(dem, tmp_path, monkeypatch):
+    paths = tile_grid(dem)
+    fresh = tiff.Solids.MosaicStore(str(tmp_path / "fresh"), chunk_size=9)
+    fresh.add(paths)
+
+    # Mosaics a row and column larger than the requested bounds, as rounding them to pixels may yield
+    mosaic = tiff.TiffFile.mosaic
+
+    def larger_mosaic(tiffs, bounds=None, res=None, **kwargs):
+        left, bottom, right, top = bounds
+        return mosaic(tiffs, bounds=(left, bottom - res[1], right + res[0], top), res=res, **kwargs)
+
+    monkeypatch.setattr(tiff.TiffFile, "mosaic", staticmethod(larger_mosaic))
+    store = tiff.Solids.MosaicStore(str(tmp_path / "store"), chunk_size=9)
+    store.add(paths)
+    updated, expected = world_arrays(store.export()), world_arrays(fresh.export())
+    assert np.allclose(updated["vertices"], expected["vertices"])
+    assert len(updated["triangles"]) == len(expected["triangles"])
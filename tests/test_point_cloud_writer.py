@@ -0,0 +1,37 @@
+# Tests for the PointCloudWriter class in Solids/PointCloudWriter.py
+import numpy as np
+import open3d as o3d
+import pytest
+import GeoTIFFConverter as tiff
+
+@pytest.mark.parametrize("extension", [".ply", ".pcd"])
+def test_chunks_round_trip(tmp_path, extension):
+    rng = np.random.default_rng(0)
+    points, normals = rng.random((1000, 3)), rng.random((1000, 3))
+    path = str(tmp_path / f"cloud{extension}")
+
+    with tiff.Solids.PointCloudWriter(path, normals=True) as writer:
+        for i in range(0, 1000, 300):
+            writer.write(points[i:i + 300], normals[i:i + 300])
+    assert writer.count == 1000
+
+    pcd = o3d.io.read_point_cloud(path)
+    assert np.allclose(np.asarray(pcd.points), points, atol=1e-6)
+    assert np.allclose(np.asarray(pcd.normals), normals, atol=1e-6)
+
+
+def test_export_stream_matches_union(dem, tmp_path):
+    a = tiff.TiffFile(dem("a.tif", width=20, height=20, nodata=-9999.0)[0])
+    b = tiff.TiffFile(dem("b.tif", width=20, height=20, left=2600010.0, nodata=-9999.0, seed=1)[0])
+
+    path = str(tmp_path / "stream.ply")
+    origin = tiff.Solids.TiffPc.exportStream([a, b], path, window_size=(16, 16))
+    assert origin.x == 2600000.0
+
+    streamed = np.asarray(o3d.io.read_point_cloud(path).points)
+    merged = tiff.Solids.TiffPc.union_many([tiff.Solids.TiffPc.fromTiffFile(t) for t in (a, b)])
+    expected = np.asarray(merged.data.points) + (0, merged.origin_height, 0)
+
+    order = lambda p: p[np.lexsort((p[:, 2], p[:, 0]))]
+    assert streamed.shape == expected.shape
+    assert np.allclose(order(streamed), order(expected), atol=1e-3)
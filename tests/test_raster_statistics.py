@@ -0,0 +1,37 @@
+# Tests for the RasterStatistics class in RasterStatistics.py
+import numpy as np
+import rasterio
+import GeoTIFFConverter as tiff
+
+
+def test_statistics_match_whole_raster(dem):
+    path, data = dem(width=70, height=45, nodata=-9999.0, block=16)
+    data = data.astype(np.float64)
+    data[10:14, 20:25] = np.nan
+    with rasterio.open(path, "r+") as dst:
+        dst.write(np.where(np.isnan(data), -9999.0, data).astype("float32"), 1)
+
+    stats = tiff.RasterStatistics.fromTiffFiles([tiff.TiffFile(path)], workers=4)
+
+    elevation = data[np.isfinite(data)]
+    assert stats.elevation.count == len(elevation)
+    assert np.isclose(stats.elevation.mean, elevation.mean()) and np.isclose(stats.elevation.std, elevation.std())
+    assert abs(stats.elevation.quantile(0.5) - np.median(elevation)) < 0.01
+
+    # Windows are read with a halo, so the gradients match those of the whole raster
+    gx, gy = np.gradient(data, axis=1) / 0.5, np.gradient(data, axis=0) / -0.5
+    slope = np.degrees(np.arctan(np.hypot(gx, gy)))
+    aspect = np.degrees(np.arctan2(-gx, -gy)) % 360
+    assert stats.slope.count == np.isfinite(slope).sum()
+    assert np.isclose(stats.slope.mean, np.nanmean(slope))
+    assert np.isclose(stats.aspect.mean, np.nanmean(aspect))
+
+
+def test_statistics_of_several_files_are_merged(dem):
+    paths = [dem(f"{i}.tif", width=30, height=20, seed=i, left=2600000.0 + 15 * i)[0] for i in range(3)]
+    stats = tiff.RasterStatistics.fromTiffFiles([tiff.TiffFile(p) for p in paths], window_size=(32, 32))
+    single = [tiff.RasterStatistics.fromTiffFiles([tiff.TiffFile(p)]) for p in paths]
+
+    assert stats.elevation.count == 3 * 600
+    assert np.isclose(stats.elevation.mean, np.mean([s.elevation.mean for s in single]))
+    assert stats.summary()["slope"]["max"] == max(s.slope.max for s in single)
@@ -0,0 +1,87 @@
+# Tests for the RtinMesher class in Solids/RtinMesher.py
+import numpy as np
+import GeoTIFFConverter as tiff
+from GeoTIFFConverter.Solids import RtinMesher
+
+
+def interpolation_error(heights, cells, triangles):
+    """
+    Largest deviation between the triangulation and every grid cell it covers.
+    """
+    worst = 0
+    for tri in triangles:
+        (r0, c0), (r1, c1), (r2, c2) = cells[tri]
+        rr, cc = np.mgrid[min(r0, r1, r2):max(r0, r1, r2) + 1, min(c0, c1, c2):max(c0, c1, c2) + 1]
+        T = np.array([[r1 - r0, r2 - r0], [c1 - c0, c2 - c0]], dtype=float)
+        uv = np.linalg.solve(T, np.stack((rr.ravel() - r0, cc.ravel() - c0)))
+        inside = (uv >= -1e-9).all(axis=0) & (uv.sum(axis=0) <= 1 + 1e-9)
+        h0 = heights[r0, c0]
+        approx = h0 + uv[0] * (heights[r1, c1] - h0) + uv[1] * (heights[r2, c2] - h0)
+        worst = max(worst, np.abs(approx - heights[rr.ravel(), cc.ravel()])[inside].max())
+    return worst
+
+
+def signed_areas(cells, triangles):
+    p = cells[triangles].astype(float)
+    return ((p[:, 1, 1] - p[:, 0, 1]) * (p[:, 2, 0] - p[:, 0, 0])
+            - (p[:, 2, 1] - p[:, 0, 1]) * (p[:, 1, 0] - p[:, 0, 0]))
+
+
+def test_flat_grid_uses_two_triangles():
+    cells, triangles, error = RtinMesher.triangulate(np.zeros((17, 17)), np.ones((17, 17), dtype=bool), 0.1)
+    assert len(triangles) == 2
+    assert error == 0
+
+
+def test_error_bound_and_coverage():
+    rows, cols = np.mgrid[0:30, 0:41]
+    heights = 10 * np.sin(rows / 5) + np.cos(cols / 3)
+    valid = np.ones(heights.shape, dtype=bool)
+
+    cells, triangles, error = RtinMesher.triangulate(heights, valid, 0.5)
+    assert 0 < len(triangles) < 2 * 29 * 40
+    assert error <= 0.5
+    assert interpolation_error(heights, cells, triangles) <= error + 1e-9
+
+    # Triangles wind consistently and tile the raster exactly
+    areas = signed_areas(cells, triangles)
+    assert (areas > 0).all()
+    assert np.isclose(areas.sum() / 2, 29 * 40)
+
+
+def test_zero_error_reproduces_grid():
+    heights = np.random.default_rng(0).random((9, 12))
+    cells, triangles, error = RtinMesher.triangulate(heights, np.ones((9, 12), dtype=bool), 0)
+    assert len(cells) == 9 * 12
+    assert len(triangles) == 2 * 8 * 11
+
+
+def test_invalid_cells_are_skipped():
+    heights = np.zeros((20, 20))
+    valid = np.ones((20, 20), dtype=bool)
+    valid[5:9, 4:12] = False
+
+    cells, triangles, error = RtinMesher.triangulate(heights, valid, 1.0)
+    assert valid[cells[:, 0], cells[:, 1]].all()
+
+    # Everything but the quads touching the hole is covered, at most up to the hole's corners
+    area = signed_areas(cells, triangles).sum() / 2
+    assert 19 * 19 - 5 * 9 <= area <= 19 * 19 - 3 * 7
+
+
+def test_locked_cells_become_vertices():
+    cells, triangles, error = RtinMesher.triangulate(np.zeros((17, 17)), np.ones((17, 17), dtype=bool), 0.1,
+                                                     locked=np.eye(17, dtype=bool)[::-1] | (np.arange(17) == 0))
+    vertices = set(map(tuple, cells))
+    assert all((r, 16 - r) in vertices for r in range(17))
+    assert all((r, 0) in vertices for r in range(17))
+    assert np.isclose(signed_areas(cells, triangles).sum() / 2, 16 * 16)
+
+
+def test_adaptive_mesh_from_tiff_file(dem):
+    path, data = dem(width=40, height=30)
+    mesh, stats = tiff.Solids.TiffMesh.fromTiffFileAdaptive(tiff.TiffFile(path), max_error=2.0)
+
+    assert stats["triangle_count"] == len(mesh.data.triangles) < 2 * 29 * 39
+    assert stats["error"] <= 2.0
+    assert (np.asarray(mesh.data.vertex_normals)[:, 1] > 0).all()
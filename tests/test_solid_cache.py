@@ -0,0 +1,48 @@
+# Tests for the SolidCache class in Solids/SolidCache.py
+import os
+import numpy as np
+import GeoTIFFConverter as tiff
+
+def test_cache_hit_returns_stored_solid(dem, tmp_path, monkeypatch):
+    path, _ = dem(width=20, height=15)
+    cache = tiff.Solids.SolidCache(str(tmp_path / "cache"))
+    pc = cache.fromTiffFile(tiff.Solids.TiffPc, tiff.TiffFile(path), normal_mode="gradient")
+
+    # A hit must not build the solid again
+    def fail(*args, **kwargs):
+        raise AssertionError("Solid was rebuilt")
+    monkeypatch.setattr(tiff.Solids.TiffPc, "pointsFromTiffFile", staticmethod(fail))
+    cached = cache.fromTiffFile(tiff.Solids.TiffPc, tiff.TiffFile(path), normal_mode="gradient")
+
+    assert np.array_equal(np.asarray(cached.data.points), np.asarray(pc.data.points))
+    assert np.array_equal(np.asarray(cached.data.normals), np.asarray(pc.data.normals))
+    assert cached.origin_height == pc.origin_height
+    assert cached.world_origin.x == pc.world_origin.x
+    assert cached.world_origin.proj_string == "EPSG:2056"
+
+
+def test_cache_key_covers_parameters_and_source(dem, tmp_path):
+    path, _ = dem(width=20, height=15)
+    cache = tiff.Solids.SolidCache(str(tmp_path / "cache"))
+    full = cache.fromTiffFile(tiff.Solids.TiffMesh, tiff.TiffFile(path), method="grid")
+    coarse = cache.fromTiffFile(tiff.Solids.TiffMesh, tiff.TiffFile(path), method="grid", resolution=1.0)
+    assert len(coarse.data.vertices) < len(full.data.vertices)
+
+    # Rewriting the source invalidates its entries
+    dem(width=10, height=10)
+    os.utime(path, ns=(0, 0))
+    rewritten = cache.fromTiffFile(tiff.Solids.TiffMesh, tiff.TiffFile(path), method="grid")
+    assert len(rewritten.data.vertices) == 100
+
+
+def test_cache_evicts_least_recently_used(dem, tmp_path):
+    paths = [dem(f"{i}.tif", width=20, height=20, seed=i)[0] for i in range(3)]
+    cache = tiff.Solids.SolidCache(str(tmp_path / "cache"))
+    cache.fromTiffFile(tiff.Solids.TiffPc, tiff.TiffFile(paths[0]))
+    entry = cache.size
+
+    cache.max_bytes = 2 * entry
+    for p in paths[1:]:
+        cache.fromTiffFile(tiff.Solids.TiffPc, tiff.TiffFile(p))
+    assert cache.size <= 2 * entry
+    assert len(os.listdir(cache.directory)) == 2
@@ -0,0 +1,38 @@
+# Tests for the StreamingHistogram class in StreamingHistogram.py
+import numpy as np
+import GeoTIFFConverter as tiff
+
+
+def test_moments_and_quantiles():
+    values = np.random.default_rng(0).normal(500, 20, 100000)
+    h = tiff.StreamingHistogram(max_bins=1024).add(values)
+
+    assert h.count == len(values)
+    assert np.isclose(h.mean, values.mean()) and np.isclose(h.std, values.std())
+    assert h.min == values.min() and h.max == values.max()
+    assert len(h.counts) <= 1024 and h.counts.sum() == len(values)
+
+    q = [0, 0.01, 0.5, 0.99, 1]
+    assert np.all(np.abs(h.quantile(q) - np.quantile(values, q)) <= h.width)
+
+
+def test_merged_parts_match_the_whole_stream():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(0, 1, 1000), rng.normal(40, 2, 5000), np.full(10, 7.0), rng.uniform(-300, -200, 100)]
+    whole = tiff.StreamingHistogram(max_bins=256).add(np.concatenate(parts))
+
+    merged = tiff.StreamingHistogram(max_bins=256)
+    for part in parts:
+        merged.merge(tiff.StreamingHistogram(max_bins=256).add(part))
+
+    assert merged.count == whole.count
+    assert np.isclose(merged.mean, whole.mean) and np.isclose(merged.m2, whole.m2)
+    assert merged.exponent == whole.exponent
+    assert np.array_equal(merged.histogram()[0], whole.histogram()[0])
+
+
+def test_rebinned_histogram():
+    h = tiff.StreamingHistogram().add(np.array([0.5, 1.5, 1.6, 9.9, np.nan]))
+    counts, edges = h.histogram(bins=10, range=(0, 10))
+    assert np.array_equal(counts, [1, 2, 0, 0, 0, 0, 0, 0, 0, 1])
+    assert np.allclose(edges, np.arange(11))
@@ -0,0 +1,103 @@
+# Tests for the TiffMesh class in Solids/TiffMesh.py
+import numpy as np
+import GeoTIFFConverter as tiff
+
+
+def test_grid_triangles_full_grid():
+    triangles = tiff.Solids.TiffMesh.gridTriangles(np.ones((3, 4), dtype=bool))
+    assert triangles.shape == (2 * 2 * 3, 3)
+    assert triangles.max() == 11
+
+
+def test_grid_triangles_skip_invalid():
+    valid = np.ones((3, 3), dtype=bool)
+    valid[1, 1] = False
+    triangles = tiff.Solids.TiffMesh.gridTriangles(valid)
+
+    # Every quad touches the center cell, but each still has one triangle avoiding it
+    assert len(triangles) == 2
+    assert triangles.max() == 7
+
+
+def test_grid_mesh_from_tiff_file(dem):
+    path, data = dem(width=20, height=10, nodata=-9999.0)
+    mesh = tiff.Solids.TiffMesh.fromTiffFile(tiff.TiffFile(path), method="grid")
+
+    assert len(mesh.data.vertices) == 200
+    assert len(mesh.data.triangles) == 2 * 19 * 9
+    assert np.isclose(mesh.origin_height, data.min())
+
+    # Terrain normals point up
+    assert (np.asarray(mesh.data.vertex_normals)[:, 1] > 0).all()
+
+
+def test_union_many_offsets_triangles(dem):
+    meshes = [tiff.Solids.TiffMesh.fromTiffFile(
+                  tiff.TiffFile(dem(f"{i}.tif", width=6, height=5, top=1200000.0 - 2.5 * i, seed=i)[0]),
+                  method="grid")
+              for i in range(3)]
+    merged = tiff.Solids.TiffMesh.union_many(meshes)
+
+    vertices = np.asarray(merged.data.vertices)
+    triangles = np.asarray(merged.data.triangles)
+    assert vertices.shape == (3 * 30, 3)
+    assert triangles.shape == (3 * 40, 3)
+    assert triangles[-1].min() >= 60
+
+    # Tiles are stacked southwards, relative to the first tile's origin
+    assert np.isclose(vertices[60:, 2].max(), np.asarray(meshes[2].data.vertices)[:, 2].max() - 5.0)
+
+
+def boundary_edges(mesh):
+    triangles = np.asarray(mesh.data.triangles)
+    edges = np.sort(np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]])), axis=1)
+    edges, counts = np.unique(edges, axis=0, return_counts=True)
+    assert counts.max() <= 2
+    return edges[counts == 1]
+
+
+def test_tiled_grid_mesh_matches_global_mesh(dem):
+    path, _ = dem(width=45, height=38, nodata=-9999.0)
+    reference = tiff.Solids.TiffMesh.fromTiffFile(tiff.TiffFile(path), method="grid")
+    mesh = tiff.Solids.TiffMesh.fromTiffFileTiled(tiff.TiffFile(path), method="grid", chunk_size=(10, 16), workers=4)
+
+    assert np.allclose(np.asarray(mesh.data.vertices), np.asarray(reference.data.vertices))
+    assert len(mesh.data.triangles) == len(reference.data.triangles)
+    assert len(boundary_edges(mesh)) == 2 * (44 + 37)
+    assert np.isclose(mesh.origin_height, reference.origin_height)
+
+
+def test_tiled_adaptive_mesh_is_watertight_at_seams(dem):
+    path, _ = dem(width=45, height=38)
+    mesh = tiff.Solids.TiffMesh.fromTiffFileTiled(tiff.TiffFile(path), method="adaptive", chunk_size=(17, 17),
+                                                  max_error=2.0)
+    vertices = np.asarray(mesh.data.vertices)
+    assert len(vertices) < 45 * 38
+
+    # Open edges only run along the edge of the raster, never along the seams between chunks
+    ends = vertices[boundary_edges(mesh)]
+    x, z = ends[:, :, 0], ends[:, :, 2]
+    on_edge = ((np.isclose(x, vertices[:, 0].min()) | np.isclose(x, vertices[:, 0].max())).all(axis=1)
+               | (np.isclose(z, vertices[:, 2].min()) | np.isclose(z, vertices[:, 2].max())).all(axis=1))
+    assert on_edge.all()
+
+
+def test_tiled_poisson_mesh_covers_raster(dem):
+    path, _ = dem(width=40, height=30)
+    mesh = tiff.Solids.TiffMesh.fromTiffFileTiled(tiff.TiffFile(path), method="poisson", chunk_size=(17, 17),
+                                                  overlap=4, depth=6)
+    vertices = np.asarray(mesh.data.vertices)
+    assert len(mesh.data.triangles) > 0
+    assert vertices[:, 0].min() < 1.0 and vertices[:, 0].max() > 19.0
+
+
+def test_grid_mesh_is_array_backed(dem, tmp_path):
+    path, _ = dem(width=8, height=6)
+    mesh = tiff.Solids.TiffMesh.fromTiffFile(tiff.TiffFile(path), method="grid")
+    mesh.save(str(tmp_path / "mesh.obj"))
+    assert mesh._data is None
+
+    # Normals match Open3D's
+    normals = mesh._get_arrays()["vertex_normals"].copy()
+    mesh.data.compute_vertex_normals()
+    assert np.allclose(np.asarray(mesh.data.vertex_normals), normals, atol=0.05)
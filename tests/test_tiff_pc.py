@@ -0,0 +1,229 @@
+# Tests for the TiffPc class in Solids/TiffPc.py
+import numpy as np
+from rasterio.transform import Affine
+import open3d as o3d
+import GeoTIFFConverter as tiff
+
+
+def test_points_follow_affine_transform(dem):
+    path, data = dem(width=40, height=30, res=2.0)
+    points = tiff.Solids.TiffPc.pointsFromTiffFile(tiff.TiffFile(path)).reshape((30, 40, 3))
+
+    # Pixel centers relative to the bottom-left corner, in row-major raster order
+    assert np.allclose(points[0, :, 0], np.arange(40) * 2.0 + 1.0)
+    assert np.allclose(points[:, 0, 2], (30 - np.arange(30)) * 2.0 - 1.0)
+    assert np.array_equal(points[:, :, 1], data)
+
+
+def test_points_float32(dem):
+    path, data = dem(width=17, height=33)
+    points = tiff.Solids.TiffPc.pointsFromTiffFile(tiff.TiffFile(path), window_size=(16, 16), dtype=np.float32)
+
+    assert points.dtype == np.float32
+    assert points.shape == (17 * 33, 3)
+    assert np.array_equal(points[:, 1], data.ravel())
+
+
+def test_from_tiff_file_window_size_independent(dem):
+    path, data = dem(width=40, height=30)
+    tiff_file = tiff.TiffFile(path)
+
+    pc_blocks = tiff.Solids.TiffPc.fromTiffFile(tiff_file)
+    pc_whole = tiff.Solids.TiffPc.fromTiffFile(tiff_file, window_size=(30, 40))
+
+    assert np.isclose(pc_blocks.origin_height, data.min())
+    a = np.asarray(pc_blocks.data.points)
+    b = np.asarray(pc_whole.data.points)
+    assert np.allclose(a[np.lexsort(a.T)], b[np.lexsort(b.T)])
+
+
+def test_union_many_matches_union(dem):
+    tiles = [tiff.TiffFile(dem(f"{i}.tif", width=10, height=8, left=2600000.0 + 5 * i, seed=i)[0])
+             for i in range(4)]
+
+    merged = tiff.Solids.TiffPc.union_many([tiff.Solids.TiffPc.fromTiffFile(t) for t in tiles], workers=2)
+
+    chained = tiff.Solids.TiffPc.fromTiffFile(tiles[0])
+    for t in tiles[1:]:
+        chained.union(tiff.Solids.TiffPc.fromTiffFile(t))
+
+    assert np.allclose(np.asarray(merged.data.points), np.asarray(chained.data.points))
+    assert np.allclose(np.asarray(merged.data.normals), np.asarray(chained.data.normals))
+    assert merged.world_origin.x == 2600000.0
+
+
+def test_union_many_drops_arrays_not_all_solids_hold(dem):
+    tiles = [tiff.TiffFile(dem(f"{i}.tif", width=10, height=8, left=2600000.0 + 5 * i, seed=i)[0]) for i in range(2)]
+    with_normals = tiff.Solids.TiffPc.fromTiffFile(tiles[0])
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiles[1])
+    without_normals = tiff.Solids.TiffPc._from_arrays({"points": pc._get_arrays()["points"]}, pc.world_origin,
+                                                      pc.origin_height)
+
+    for solids in ([with_normals, without_normals], [without_normals, with_normals]):
+        merged = tiff.Solids.TiffPc.union_many(solids)
+        assert list(merged._get_arrays()) == ["points"]
+        assert len(merged._get_arrays()["points"]) == 160
+
+
+def test_resolution_reads_decimated_grid(dem):
+    path, data = dem(width=40, height=30, res=0.5)
+    tiff_file = tiff.TiffFile(path)
+
+    assert tiff_file.get_decimation(2.2) == (4, 4)
+    assert tiff_file.get_shape(2.0) == (8, 10)
+
+    points = tiff.Solids.TiffPc.pointsFromTiffFile(tiff_file, resolution=2.0).reshape((8, 10, 3))
+    assert np.allclose(points[0, :, 0], np.arange(10) * 2.0 + 1.0)
+    assert np.allclose(points[0, 0, 1], data[:4, :4].mean(), atol=1e-3)
+    assert np.allclose(points[-1, -1, 1], data[28:, 36:].mean(), atol=1e-3)
+    assert np.allclose(points[:, :, 1], tiff_file.to_numpy(band=1, resolution=2.0))
+
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiff_file, resolution=2.0)
+    assert len(pc.data.points) == 80
+
+
+def test_ragged_decimated_edge_stays_on_grid(dem):
+    path, data = dem(width=9, height=8, res=0.5)
+    tiff_file = tiff.TiffFile(path)
+
+    # The last column averages a single source column, but is placed at the regular spacing
+    points = tiff.Solids.TiffPc.pointsFromTiffFile(tiff_file, resolution=2.0).reshape((2, 3, 3))
+    assert np.allclose(points[0, :, 0], [1.0, 3.0, 5.0])
+    assert points[0, -1, 0] > tiff_file.bounds.right - tiff_file.bounds.left
+    assert np.allclose(points[0, -1, 1], data[:4, 8].mean(), atol=1e-3)
+
+
+def test_gradient_normals_of_inclined_plane():
+    # Elevation rises by 1 per column and falls by 2 per row on a 0.5 grid
+    rows, cols = np.mgrid[0:6, 0:5]
+    points = np.zeros((30, 3))
+    points[:, 1] = (cols - 2 * rows).ravel()
+    transform = Affine(0.5, 0, 0, 0, -0.5, 3)
+
+    normals = tiff.Solids.TiffPc.gradientNormals(points, np.ones(30, dtype=bool), (6, 5), transform, chunk_rows=2)
+
+    # dh/dx = 2, dh/dz = 4 as z decreases with the rows
+    expected = np.array([-2.0, 1.0, -4.0]) / np.sqrt(21)
+    assert np.allclose(normals, expected)
+
+
+def test_gradient_normals_point_up(dem):
+    path, data = dem(width=40, height=30)
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient")
+
+    normals = np.asarray(pc.data.normals)
+    assert normals.shape == (1200, 3)
+    assert (normals[:, 1] > 0).all()
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1)
+
+
+def test_union_many_reprojects(dem):
+    path, _ = dem(width=20, height=15)
+    base = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path))
+    other = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path))
+    other.reproject("EPSG:32632")
+    assert other.world_origin.proj_string == "EPSG:32632"
+
+    merged = tiff.Solids.TiffPc.union_many([base, other])
+    points = np.asarray(merged.data.points)
+    n = len(base.data.points)
+    # Both tiles coincide up to the accuracy of the datum transformation
+    assert np.allclose(points[:n], points[n:], atol=1e-2)
+
+
+def test_arrays_back_point_cloud_until_legacy_access(dem, tmp_path):
+    path, _ = dem(width=12, height=9)
+    points = tiff.Solids.TiffPc.pointsFromTiffFile(tiff.TiffFile(path))
+    normals = np.tile([0.0, 1.0, 0.0], (len(points), 1))
+    pc = tiff.Solids.TiffPc(points, None, 0.0, normals=normals)
+
+    # The given arrays are used without copying, but transformations write into new arrays
+    assert pc._get_arrays()["points"] is points
+    given = points.copy()
+    pc.translate((1.0, 2.0, 3.0))
+    moved = pc._get_arrays()["points"]
+    assert pc._data is None and moved is not points
+    assert np.array_equal(points, given) and np.allclose(moved, given + (1.0, 2.0, 3.0))
+    pc.save(str(tmp_path / "pc.ply"))
+
+    # Which the point cloud owns, so later transformations are applied in place
+    pc.rotate((0.0, np.pi / 2, 0.0))
+    assert pc._get_arrays()["points"] is moved
+
+    # The Open3D geometry is created on access and takes over the geometry
+    assert np.allclose(np.asarray(pc.data.points), moved)
+    assert np.allclose(np.asarray(pc.data.normals), normals)
+    assert pc._arrays is None
+
+    saved = tiff.Solids.TiffPc._legacy_arrays(o3d.io.read_point_cloud(str(tmp_path / "pc.ply")))
+    assert np.allclose(saved["points"][:, 1], np.asarray(pc.data.points)[:, 1])
+
+
+def test_transforms_are_deferred_and_applied_once(dem):
+    path, _ = dem(width=12, height=9)
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient")
+    points = pc._get_arrays()["points"].copy()
+    normals = pc._get_arrays()["normals"].copy()
+
+    pc.translate((1.0, 0.0, 0.0))
+    pc.scale(2.0)
+    pc.rotate((0.0, np.pi, 0.0))
+    pc.translate((0.0, 5.0, 0.0))
+    assert np.array_equal(pc._stored_arrays()["points"], points)
+
+    # Composed like Open3D applies the transformations one by one
+    reference = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+    reference.normals = o3d.utility.Vector3dVector(normals)
+    reference.translate((1.0, 0.0, 0.0))
+    reference.scale(2.0, center=(0, 0, 0))
+    reference.rotate(reference.get_rotation_matrix_from_xyz((0.0, np.pi, 0.0)))
+    reference.translate((0.0, 5.0, 0.0))
+
+    # A union applies the pending transformations while copying, leaving the other solid as it is
+    other = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient")
+    other.union(pc)
+    merged = other._get_arrays()
+    assert pc._pending is not None
+    assert np.allclose(merged["points"][len(points):], np.asarray(reference.points))
+    assert np.allclose(merged["normals"][len(points):], np.asarray(reference.normals))
+    assert np.allclose(pc._get_arrays()["points"], np.asarray(reference.points))
+    assert pc._pending is None
+
+
+def test_rotation_center_follows_transforms_and_unions(dem):
+    path, _ = dem(width=12, height=9)
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient")
+    reference = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(pc._get_arrays()["points"]))
+
+    # The center is computed once and moved along with the pending and applied transformations
+    for step in range(3):
+        pc.rotate((0.1, 0.2, 0.3))
+        reference.rotate(reference.get_rotation_matrix_from_xyz((0.1, 0.2, 0.3)))
+        pc.translate((1.0, 2.0, 3.0))
+        reference.translate((1.0, 2.0, 3.0))
+        if step == 1:
+            pc._flush()
+    assert np.allclose(pc._get_arrays()["points"], np.asarray(reference.points))
+
+    # A union changes the center
+    pc.union(tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient"))
+    reference = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(pc._get_arrays()["points"]))
+    pc.rotate((0.0, np.pi / 2, 0.0))
+    reference.rotate(reference.get_rotation_matrix_from_xyz((0.0, np.pi / 2, 0.0)))
+    assert np.allclose(pc._get_arrays()["points"], np.asarray(reference.points))
+
+
+def test_assigned_geometry_replaces_pending_transforms(dem):
+    path, _ = dem(width=12, height=9)
+    pc = tiff.Solids.TiffPc.fromTiffFile(tiff.TiffFile(path), normal_mode="gradient")
+    points = pc._get_arrays()["points"].copy()
+
+    # Reading the geometry applies the pending transformations
+    pc.translate((1.0, 2.0, 3.0))
+    assert np.allclose(np.asarray(pc.data.points), points + (1.0, 2.0, 3.0))
+
+    # Assigned geometry is taken as it is, without the transformations pending on the old geometry
+    pc.translate((1.0, 2.0, 3.0))
+    pc.data = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+    assert pc._pending is None
+    assert np.allclose(pc._get_arrays()["points"], points)
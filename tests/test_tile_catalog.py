@@ -0,0 +1,94 @@
+# Tests for the TileCatalog class in TileCatalog.py
+import os
+import numpy as np
+import GeoTIFFConverter as tiff
+
+
+def tile_grid(dem, rows=3, cols=4, size=10, res=1.0):
+    """
+    Write a grid of adjacent tiles, returning their paths in row-major order.
+    """
+    return [dem(f"tile_{r}_{c}.tif", width=size, height=size, res=res, seed=r * cols + c,
+                left=2600000.0 + c * size * res, top=1200000.0 - r * size * res)[0]
+            for r in range(rows) for c in range(cols)]
+
+
+def fake_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lower = rng.random((n, 2)) * 1000
+    upper = lower + rng.random((n, 2)) * 50
+    return [{"path": f"{i}.tif", "bounds": (lower[i, 0], lower[i, 1], upper[i, 0], upper[i, 1]),
+             "transform": (1.0, 0.0, lower[i, 0], 0.0, -1.0, upper[i, 1]), "shape": (10, 10, 1),
+             "block": (10, 10), "dtype": "float32", "nodata": None, "crs": "EPSG:2056", "mtime": 0, "size": 0}
+            for i in range(n)]
+
+
+def test_tree_matches_brute_force(tmp_path):
+    records = fake_records(500)
+    catalog = tiff.TileCatalog(records, capacity=4)
+    boxes = np.array([r["bounds"] for r in records])
+
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        x, y = rng.random(2) * 1000
+        query = np.array([x, y, x + 100, y + 80])
+        expected = np.flatnonzero((boxes[:, 0] < query[2]) & (boxes[:, 2] > query[0])
+                                  & (boxes[:, 1] < query[3]) & (boxes[:, 3] > query[1]))
+        assert np.array_equal(catalog._search(query, inclusive=False), expected)
+
+    # The persisted tree answers the same queries
+    catalog.save(str(tmp_path / "catalog.npz"))
+    loaded = tiff.TileCatalog.load(str(tmp_path / "catalog.npz"))
+    assert np.array_equal(loaded._search(query, inclusive=False), expected)
+
+
+def test_query_returns_intersecting_tiles(dem):
+    paths = tile_grid(dem)
+    catalog = tiff.TileCatalog.fromPaths(paths)
+    assert len(catalog) == 12
+
+    tiles = catalog.query((2600015.0, 1199975.0, 2600025.0, 1199985.0))
+    assert [os.path.basename(t.path) for t in tiles] == ["tile_1_1.tif", "tile_1_2.tif", "tile_2_1.tif", "tile_2_2.tif"]
+
+    # Points on a shared edge belong to both tiles
+    tiles = catalog.query_point(2600010.0, 1199995.0)
+    assert sorted(os.path.basename(t.path) for t in tiles) == ["tile_0_0.tif", "tile_0_1.tif"]
+
+    # Tiles are created from the stored header and read like opened ones
+    tile = catalog.query_point(2600035.0, 1199975.0)[0]
+    opened = tiff.TiffFile(tile.path)
+    assert tile.transform == opened.transform and tile.crs == opened.crs
+    assert np.array_equal(tile.to_numpy(), opened.to_numpy())
+
+
+def test_query_in_other_crs(dem):
+    catalog = tiff.TileCatalog.fromPaths(tile_grid(dem))
+    lon, lat = tiff.TiffFile(catalog.query_point(2600035.0, 1199975.0)[0].path).get_bounding_coordinates("epsg:4326")[0] \
+        .as_latlong().to_numpy()[::-1, 0]
+
+    # The bottom-left corner of tile_2_3, nudged into it
+    tiles = catalog.query_point(lon + 1e-6, lat + 1e-6, crs="EPSG:4326")
+    assert [os.path.basename(t.path) for t in tiles] == ["tile_2_3.tif"]
+
+
+def test_index_is_reused_for_unchanged_tiles(dem, tmp_path):
+    paths = tile_grid(dem, rows=2, cols=2)
+    index = str(tmp_path / "index" / "catalog.npz")
+    tiff.TileCatalog.fromPaths(paths, index_path=index)
+
+    tiff.Instrumentation.counters.pop("catalog.scanned", None)
+    tiff.TileCatalog.fromPaths(paths, index_path=index)
+    assert tiff.Instrumentation.counters.get("catalog.scanned", 0) == 0
+
+    # A rewritten tile is scanned again, with its new bounds
+    dem("tile_0_0.tif", width=20, height=10, res=1.0, left=2590000.0, top=1200000.0)
+    catalog = tiff.TileCatalog.fromPaths(paths, index_path=index)
+    assert tiff.Instrumentation.counters["catalog.scanned"] == 1
+    assert [os.path.basename(t.path) for t in catalog.query_point(2590015.0, 1199995.0)] == ["tile_0_0.tif"]
+
+
+def test_empty_catalog(tmp_path):
+    catalog = tiff.TileCatalog.fromDirectory(str(tmp_path), index_path=str(tmp_path / "catalog.npz"))
+    assert len(catalog) == 0
+    assert catalog.query((0, 0, 1, 1)) == [] and catalog.query_point(0, 0) == []
+    assert len(tiff.TileCatalog.load(str(tmp_path / "catalog.npz"))) == 0
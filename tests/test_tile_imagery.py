@@ -0,0 +1,68 @@
+# Tests for the TileImagery class in TileImagery.py and the TileCache class in TileCache.py
+import threading
+from io import BytesIO
+import numpy as np
+from PIL import Image
+import GeoTIFFConverter as tiff
+
+class FakeBackend:
+    """
+    Stand-in for a WMS server, rendering every pixel's longitude band as its red channel.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, bbox, size):
+        with self._lock:
+            self.calls += 1
+        lon = np.linspace(bbox[0], bbox[2], size[0], endpoint=False)
+        red = np.broadcast_to(((lon + 180) % 256).astype(np.uint8), (size[1], size[0]))
+        image = np.dstack((red, np.zeros_like(red), np.zeros_like(red), np.full_like(red, 255)))
+        out = BytesIO()
+        Image.fromarray(image, "RGBA").save(out, format="PNG")
+        return out.getvalue()
+
+
+def test_repeated_requests_use_cache(tmp_path):
+    backend = FakeBackend()
+    imagery = tiff.TileImagery(fetch=backend, cache_dir=str(tmp_path), tile_size=64)
+
+    bbox = (8.0, 46.0, 9.0, 46.5)
+    first = imagery.get_image(bbox, size=(120, 60))
+    assert first.shape == (60, 120, 4)
+    assert backend.calls > 0
+
+    calls = backend.calls
+    second = imagery.get_image(bbox, size=(120, 60))
+    assert backend.calls == calls
+    assert np.array_equal(first, second)
+
+    # A new layer on the same directory reuses the tiles on disk
+    again = tiff.TileImagery(fetch=backend, cache_dir=str(tmp_path), tile_size=64)
+    again.get_image(bbox, size=(120, 60))
+    assert backend.calls == calls
+
+
+def test_image_is_cropped_to_bbox(tmp_path):
+    imagery = tiff.TileImagery(fetch=FakeBackend(), cache_dir=str(tmp_path), tile_size=64)
+    image = imagery.get_image((10.0, 40.0, 50.0, 50.0), size=(80, 20))
+
+    # Red encodes the longitude, which grows from left to right across the tiles
+    red = image[10, :, 0].astype(float)
+    assert abs(red[0] - 190) <= 2 and abs(red[-1] - 229) <= 2
+    assert (np.diff(red) >= 0).all()
+
+
+def test_tile_cache_evicts_least_recently_used(tmp_path):
+    cache = tiff.TileCache(str(tmp_path), max_bytes=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") == b"a" * 100
+    cache.put("c", b"c" * 100)
+
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.size == 200
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "c"]